@@ -28,6 +28,8 @@ INSTALLED_APPS = [
     # App de recomendações (contém ML, endpoints e comandos)
     "recomendacoes.apps.RecomendacoesConfig",
     "favoritos",
+    # Jobs operacionais (validação, warmup pós-deploy)
+    "jobs",
 ]
 
 MIDDLEWARE = [
@@ -94,4 +96,66 @@ MEDIA_URL = '/media/'
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cache: memória local por padrão; defina ALUGAAI_CACHE_DIR para usar o backend
+# em arquivo (compartilhado entre processos/workers).
+if os.environ.get("ALUGAAI_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["ALUGAAI_CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "aluga-ai",
+        }
+    }
+
+# Recomendações (API /api/ml/)
+ML_CACHE_ALIAS = "default"
+ML_CATALOGUE_VERSION_TTL = 5  # segundos que a versão do catálogo fica em cache por processo
+ML_RESPONSE_CACHE_TIMEOUT = 300  # segundos; 0 desativa o cache de respostas
+ML_RESPONSE_CACHE_BUDGET_BUCKET = 50.0  # granularidade do orçamento na chave (0 = exato)
+ML_MODEL_RELOAD_CHECK_SECONDS = 5  # intervalo entre verificações do artefato do modelo (recarga após retreino)
+# segredo do POST /api/ml/warmup/ (header X-Warmup-Token); vazio = só staff
+ML_WARMUP_TOKEN = os.environ.get("ML_WARMUP_TOKEN", "")
+ML_RANKED_RESULTS_MAX = 200  # tamanho do ranking guardado para paginação por cursor
+ML_PERSONAL_RECS_MAX_AGE_SECONDS = 6 * 3600  # idade máxima das recomendações pessoais persistidas
+ML_ITEM_SIMILARITY_WEIGHT = 0.3  # peso da filtragem colaborativa item-item nas recomendações pessoais
+ML_ITEM_SIMILARITY_TOP_N = 50  # vizinhos guardados por propriedade
+ML_SIMILAR_K = 6  # imóveis semelhantes exibidos na página de detalhe
+ML_SIMILAR_REBUILD_SECONDS = 60  # intervalo mínimo entre reconstruções do índice k-NN
+ML_ALS_FACTORS = 32  # dimensão dos fatores latentes do recomendador ALS
+
+# Favoritos: recomputação das recomendações pessoais fica a cargo do worker
+# (python manage.py recommendation_worker)
+FAVORITOS_RECOMPUTE_DEBOUNCE_SECONDS = 5
+FAVORITOS_RECOMPUTE_POLL_SECONDS = 2
+FAVORITOS_RECOMMENDATIONS_LIMIT = 10
+
+# Listagem de propriedades: paginação por chave (criado_em, id)
+PROPRIEDADES_PAGE_SIZE = 24
+PROPRIEDADES_PAGE_SIZE_MAX = 100
+PROPRIEDADES_SEARCH_MAX_RESULTS = 1000  # resultados ranqueados considerados pela busca textual
+PROPRIEDADES_FACETS_CACHE_TIMEOUT = 300  # segundos; 0 desativa o cache das contagens de facetas
+PROPRIEDADES_FACET_PRICE_BOUNDS = (100, 200, 400, 800)  # limites das faixas de preço por noite
+PROPRIEDADES_FACET_MAX_CITIES = 20  # cidades exibidas na faceta (as de maior contagem)
+PROPRIEDADES_DETAIL_FRAGMENT_TIMEOUT = 600  # segundos; fragmentos do detalhe (chave inclui Propriedade.versao)
+PROPRIEDADES_REVIEWS_PAGE_SIZE = 10  # avaliações por página no detalhe
+
+# Imagens de propriedades: variantes WebP/JPEG geradas em segundo plano após o upload
+PROPRIEDADES_IMAGE_WIDTHS = (320, 640, 1280)  # larguras das variantes (px), sem ampliar o original
+PROPRIEDADES_IMAGE_WORKERS = 2  # threads do pool que gera as variantes
+PROPRIEDADES_IMAGE_ASYNC = True  # False: gera no próprio on_commit (síncrono)
+PROPRIEDADES_BLOB_CACHE_SECONDS = 365 * 24 * 3600  # Cache-Control dos blobs de imagem (nome = hash, imutável)
+
+# Uploads: os handlers padrão, calculando o SHA-256 enquanto o arquivo chega
+# (armazenamento de imagens endereçado por conteúdo, ver propriedades.blobs)
+FILE_UPLOAD_HANDLERS = [
+    "propriedades.uploadhandlers.HashingMemoryFileUploadHandler",
+    "propriedades.uploadhandlers.HashingTemporaryFileUploadHandler",
+]
+
 LOGIN_URL = 'usuarios:login'
\ No newline at end of file
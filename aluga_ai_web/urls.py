@@ -1,7 +1,10 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from propriedades.blobs import BLOB_DIR
+from propriedades.views import imagem_blob
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -15,4 +18,9 @@ urlpatterns = [
     path("mensagens/", include("mensagens.urls")),
 ] 
 
+if settings.DEBUG:
+    # blobs de imagem (nome = hash do conteúdo) saem com Cache-Control imutável; antes do static() genérico
+    urlpatterns.append(
+        re_path(rf"^{settings.MEDIA_URL.lstrip('/')}{BLOB_DIR}/(?P<path>.*)$", imagem_blob, name="imagem_blob")
+    )
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
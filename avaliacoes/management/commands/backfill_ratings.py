@@ -0,0 +1,64 @@
+"""
+Recalcula os agregados de avaliação de Propriedade (rating_sum, rating_count,
+rating_avg e o histograma rating_1..rating_5) a partir da tabela Avaliacao.
+Uso: python manage.py backfill_ratings [--chunk-size 2000]
+
+Usado para popular as linhas existentes e para corrigir divergências; no dia a
+dia os agregados são mantidos pelos signals de Avaliacao.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from avaliacoes.models import Avaliacao
+from propriedades.models import RATING_FIELDS, Propriedade
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os agregados de nota das propriedades a partir das avaliações'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        size = max(1, options['chunk_size'])
+        # uma consulta agrupada para todas as propriedades avaliadas
+        agg = {
+            row['propriedade_id']: row for row in Avaliacao.objects.filter(nota__gte=1, nota__lte=5)
+            .values('propriedade_id')
+            .annotate(
+                soma=Sum('nota'), total=Count('id'),
+                **{f'n{n}': Count('id', filter=Q(nota=n)) for n in range(1, 6)},
+            )
+            .order_by()
+        }
+        changed = 0
+        pendentes = []
+        fields = ['id', 'versao', *RATING_FIELDS]
+        for prop in Propriedade.objects.only(*fields).order_by('id').iterator(chunk_size=size):
+            row = agg.get(prop.pk)
+            novo = {
+                'rating_sum': row['soma'] if row else 0,
+                'rating_count': row['total'] if row else 0,
+                'rating_avg': row['soma'] / row['total'] if row else None,
+                **{f'rating_{n}': row[f'n{n}'] if row else 0 for n in range(1, 6)},
+            }
+            if all(getattr(prop, k) == v for k, v in novo.items()):
+                continue
+            for k, v in novo.items():
+                setattr(prop, k, v)
+            prop.versao += 1  # invalida os fragmentos em cache do detalhe
+            pendentes.append(prop)
+            if len(pendentes) >= size:
+                changed += self._flush(pendentes)
+                pendentes = []
+        changed += self._flush(pendentes)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Agregados recalculados: {changed} propriedade(s) atualizada(s), {len(agg)} com avaliações'
+        ))
+
+    def _flush(self, props):
+        if props:
+            with transaction.atomic():
+                Propriedade.objects.bulk_update(props, [*RATING_FIELDS, 'versao'])
+        return len(props)
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:44
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+def limitar_notas(apps, schema_editor):
+    # linhas antigas fora da faixa (nunca entraram nos agregados): rode backfill_ratings depois
+    Avaliacao = apps.get_model('avaliacoes', 'Avaliacao')
+    Avaliacao.objects.filter(nota__lt=1).update(nota=1)
+    Avaliacao.objects.filter(nota__gt=5).update(nota=5)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('avaliacoes', '0001_initial'),
+        ('propriedades', '0016_propriedade_origem_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='avaliacao',
+            name='nota',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.RunPython(limitar_notas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='avaliacao',
+            constraint=models.CheckConstraint(condition=models.Q(('nota__gte', 1), ('nota__lte', 5)), name='avaliacao_nota_1_5'),
+        ),
+    ]
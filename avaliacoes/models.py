@@ -1,3 +1,4 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
 from propriedades.models import Propriedade
@@ -5,9 +6,15 @@ from propriedades.models import Propriedade
 class Avaliacao(models.Model):
     autor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="avaliacoes_feitas")
     propriedade = models.ForeignKey(Propriedade, on_delete=models.CASCADE, related_name="avaliacoes")
-    nota = models.IntegerField()  # 1-5
+    nota = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])  # 1-5
     comentario = models.TextField(blank=True)
     criado_em = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # os agregados de Propriedade (histograma rating_1..rating_5) só aceitam notas de 1 a 5
+            models.CheckConstraint(condition=models.Q(nota__gte=1, nota__lte=5), name='avaliacao_nota_1_5'),
+        ]
+
     def __str__(self):
         return f"Avaliação {self.nota} - {self.autor}"
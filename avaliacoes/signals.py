@@ -0,0 +1,45 @@
+import logging
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from propriedades.models import Propriedade
+
+from .models import Avaliacao
+
+logger = logging.getLogger(__name__)
+
+
+def _aplicar(propriedade_id, nota, delta):
+    """Como Propriedade.aplicar_avaliacao, mas ignora (com aviso) notas fora de 1-5 em vez de levantar erro."""
+    try:
+        nota = int(nota)
+    except (TypeError, ValueError):
+        nota = None
+    if nota is None or not 1 <= nota <= 5:
+        logger.warning("Nota fora de 1-5 ignorada nos agregados da propriedade %s: %r", propriedade_id, nota)
+        return
+    Propriedade.aplicar_avaliacao(propriedade_id, nota, delta)
+
+
+@receiver(pre_save, sender=Avaliacao)
+def guardar_nota_anterior(sender, instance, **kwargs):
+    instance._nota_anterior = None
+    if instance.pk:
+        instance._nota_anterior = Avaliacao.objects.filter(pk=instance.pk).values_list('nota', flat=True).first()
+
+
+@receiver(post_save, sender=Avaliacao)
+def avaliacao_salva(sender, instance, created, **kwargs):
+    """Mantém os agregados de nota da propriedade (rating_sum/count/avg e histograma)."""
+    anterior = getattr(instance, '_nota_anterior', None)
+    if not created and anterior == instance.nota:
+        return
+    if anterior is not None:
+        _aplicar(instance.propriedade_id, anterior, -1)
+    _aplicar(instance.propriedade_id, instance.nota, 1)
+
+
+@receiver(post_delete, sender=Avaliacao)
+def avaliacao_removida(sender, instance, **kwargs):
+    _aplicar(instance.propriedade_id, instance.nota, -1)
@@ -1,3 +1,86 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from propriedades.models import Propriedade
+
+from .models import Avaliacao
+
+
+class AgregadosAvaliacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="dono", password="pass")
+        cls.hospede = User.objects.create_user(username="hospede", password="pass")
+        cls.prop = Propriedade.objects.create(owner=cls.owner, titulo="Casa avaliada", preco_por_noite="100.00")
+
+    def _avaliar(self, nota):
+        self.client.login(username="hospede", password="pass")
+        resp = self.client.post(reverse("avaliacoes:nova", args=[self.prop.pk]), {"nota": nota, "comentario": "ok"})
+        self.assertEqual(resp.status_code, 302)
+
+    def test_new_reviews_update_sum_count_average_and_histogram(self):
+        self._avaliar(5)
+        self._avaliar(4)
+        self._avaliar(5)
+        self.prop.refresh_from_db()
+        self.assertEqual((self.prop.rating_sum, self.prop.rating_count), (14, 3))
+        self.assertAlmostEqual(self.prop.rating_avg, 14 / 3)
+        self.assertEqual(
+            [(n, q) for n, q, _pct in self.prop.rating_histogram], [(5, 2), (4, 1), (3, 0), (2, 0), (1, 0)]
+        )
+
+    def test_edit_and_delete_keep_aggregates_consistent(self):
+        a = Avaliacao.objects.create(autor=self.hospede, propriedade=self.prop, nota=2)
+        a.nota = 4
+        a.save()
+        self.prop.refresh_from_db()
+        self.assertEqual((self.prop.rating_sum, self.prop.rating_2, self.prop.rating_4), (4, 0, 1))
+        a.delete()
+        self.prop.refresh_from_db()
+        self.assertEqual((self.prop.rating_sum, self.prop.rating_count, self.prop.rating_avg), (0, 0, None))
+
+    def test_stale_instance_save_keeps_aggregates(self):
+        stale = Propriedade.objects.get(pk=self.prop.pk)
+        self._avaliar(3)
+        stale.titulo = "Casa renomeada"
+        stale.save()
+        self.prop.refresh_from_db()
+        self.assertEqual((self.prop.titulo, self.prop.rating_count, self.prop.rating_3), ("Casa renomeada", 1, 1))
+
+    def test_out_of_range_score_rejected_by_model_and_ignored_by_signal(self):
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+
+        from .signals import avaliacao_salva
+
+        with self.assertRaises(ValidationError):
+            Avaliacao(autor=self.hospede, propriedade=self.prop, nota=6).full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Avaliacao.objects.create(autor=self.hospede, propriedade=self.prop, nota=0)
+        # instância fora da faixa (ex.: fixture sem constraint) não derruba o signal nem os agregados
+        avaliacao_salva(Avaliacao, Avaliacao(propriedade=self.prop, nota=9), created=True)
+        self.prop.refresh_from_db()
+        self.assertEqual((self.prop.rating_sum, self.prop.rating_count), (0, 0))
+
+    def test_backfill_recomputes_from_reviews(self):
+        Avaliacao.objects.bulk_create([  # sem signals: agregados ficam zerados
+            Avaliacao(autor=self.hospede, propriedade=self.prop, nota=n) for n in (1, 5, 5)
+        ])
+        Propriedade.objects.filter(pk=self.prop.pk).update(rating_2=7)
+        call_command("backfill_ratings", stdout=StringIO())
+        self.prop.refresh_from_db()
+        self.assertEqual((self.prop.rating_sum, self.prop.rating_count), (11, 3))
+        self.assertEqual((self.prop.rating_1, self.prop.rating_2, self.prop.rating_5), (1, 0, 2))
 
-# Create your tests here.
+    def test_listing_filters_by_min_rating(self):
+        outra = Propriedade.objects.create(owner=self.owner, titulo="Casa sem nota", preco_por_noite="90.00")
+        self._avaliar(4)
+        resp = self.client.get(reverse("propriedades:lista"), {"min_rating": "4"})
+        ids = [p.pk for p in resp.context["propriedades"]]
+        self.assertEqual(ids, [self.prop.pk])
+        self.assertNotIn(outra.pk, ids)
+        self.assertContains(resp, "★ 4,0 (1 avaliação)")
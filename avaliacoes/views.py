@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from .models import Avaliacao
 from propriedades.models import Propriedade
 from django.contrib import messages
+from django.db import transaction
 
 @login_required
 def nova_avaliacao(request, prop_id):
@@ -13,7 +14,9 @@ def nova_avaliacao(request, prop_id):
         if nota < 1 or nota > 5:
             messages.error(request, "Nota inválida.")
             return redirect("propriedades:detalhe", pk=prop.pk)
-        Avaliacao.objects.create(autor=request.user, propriedade=prop, nota=nota, comentario=comentario)
+        # a avaliação e os agregados da propriedade (signal, com F()) entram na mesma transação
+        with transaction.atomic():
+            Avaliacao.objects.create(autor=request.user, propriedade=prop, nota=nota, comentario=comentario)
         messages.success(request, "Avaliação publicada.")
         return redirect("propriedades:detalhe", pk=prop.pk)
     return render(request, "avaliacoes/nova.html", {"propriedade": prop})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Favorito, UserRecommendation
+from .models import Favorito, UserPreferenceProfile, UserRecommendation
 
 @admin.register(Favorito)
 class FavoritoAdmin(admin.ModelAdmin):
@@ -11,3 +11,8 @@ class UserRecommendationAdmin(admin.ModelAdmin):
     list_display = ('user', 'propriedade', 'score', 'predicted_price', 'generated_at', 'source')
     list_filter = ('source', 'generated_at')
     search_fields = ('user__username', 'propriedade__titulo')
+
+@admin.register(UserPreferenceProfile)
+class UserPreferenceProfileAdmin(admin.ModelAdmin):
+    list_display = ('user', 'favorites_count', 'price_sum', 'updated_at')
+    search_fields = ('user__username',)
@@ -0,0 +1,34 @@
+"""
+Worker local que executa as recomputações de recomendações pessoais agendadas
+pelos cliques em favoritos.
+Uso: python manage.py recommendation_worker [--once]
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from favoritos.tasks import run_due_recomputes
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de recomputação de recomendações pessoais (debounce por usuário)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Processa o que estiver vencido e sai')
+        parser.add_argument('--batch', type=int, default=50, help='Máximo de usuários por ciclo')
+
+    def handle(self, *args, **options):
+        poll = getattr(settings, 'FAVORITOS_RECOMPUTE_POLL_SECONDS', 2)
+        self.stdout.write(self.style.SUCCESS('Worker de recomendações iniciado.'))
+        try:
+            while True:
+                done = run_due_recomputes(limit=options['batch'])
+                if done:
+                    self.stdout.write(f'{done} usuário(s) recomputado(s)')
+                if options['once']:
+                    break
+                if done < options['batch']:
+                    time.sleep(poll)
+        except KeyboardInterrupt:
+            self.stdout.write('Worker encerrado.')
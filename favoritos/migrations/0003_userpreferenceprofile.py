@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_profiles(apps, schema_editor):
+    Favorito = apps.get_model('favoritos', 'Favorito')
+    UserPreferenceProfile = apps.get_model('favoritos', 'UserPreferenceProfile')
+    profiles = {}
+    for fav in Favorito.objects.select_related('propriedade').order_by('user_id').iterator(chunk_size=2000):
+        p = fav.propriedade
+        prof = profiles.setdefault(fav.user_id, {
+            'favorites_count': 0, 'price_sum': 0.0, 'type_counts': {}, 'city_counts': {}, 'amenity_counts': {},
+        })
+        prof['favorites_count'] += 1
+        prof['price_sum'] += float(p.preco_por_noite or 0)
+        prof['type_counts']['Apartamento'] = prof['type_counts'].get('Apartamento', 0) + 1
+        if p.city:
+            prof['city_counts'][p.city] = prof['city_counts'].get(p.city, 0) + 1
+        for a in (p.comodidades or []):
+            prof['amenity_counts'][a] = prof['amenity_counts'].get(a, 0) + 1
+    UserPreferenceProfile.objects.bulk_create(
+        [UserPreferenceProfile(user_id=uid, **data) for uid, data in profiles.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritos', '0002_userrecommendation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPreferenceProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('favorites_count', models.PositiveIntegerField(default=0)),
+                ('price_sum', models.FloatField(default=0.0)),
+                ('type_counts', models.JSONField(blank=True, default=dict)),
+                ('city_counts', models.JSONField(blank=True, default=dict)),
+                ('amenity_counts', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='perfil_preferencias', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Perfil de Preferências',
+                'verbose_name_plural': 'Perfis de Preferências',
+            },
+        ),
+        migrations.RunPython(backfill_profiles, migrations.RunPython.noop),
+    ]
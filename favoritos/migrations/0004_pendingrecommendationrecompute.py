@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritos', '0003_userpreferenceprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRecommendationRecompute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('due_at', models.DateTimeField(db_index=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recomputacao_pendente', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Recomputação Pendente',
+                'verbose_name_plural': 'Recomputações Pendentes',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritos', '0004_pendingrecommendationrecompute'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpreferenceprofile',
+            name='favorites_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userrecommendation',
+            name='reasons',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='UserRecommendationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(default='personal', max_length=30)),
+                ('favorites_version', models.PositiveIntegerField(default=0)),
+                ('model_version', models.CharField(blank=True, max_length=200)),
+                ('catalogue_version', models.BigIntegerField(default=0)),
+                ('limit', models.PositiveIntegerField(default=0)),
+                ('avg_price', models.FloatField(default=0.0)),
+                ('generated_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estados_recomendacao', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Estado de Recomendação',
+                'verbose_name_plural': 'Estados de Recomendação',
+                'unique_together': {('user', 'source')},
+            },
+        ),
+    ]
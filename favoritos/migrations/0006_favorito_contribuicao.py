@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:33
+
+from django.db import migrations, models
+
+
+def preencher_contribuicao(apps, schema_editor):
+    # cópia de UserPreferenceProfile.contribution na data desta migração; usa os valores atuais do imóvel
+    Favorito = apps.get_model('favoritos', 'Favorito')
+    for fav in Favorito.objects.select_related('propriedade').iterator(chunk_size=2000):
+        p = fav.propriedade
+        Favorito.objects.filter(pk=fav.pk).update(contribuicao={
+            'preco': float(p.preco_por_noite or 0),
+            'tipo': 'Apartamento',
+            'cidade': p.city or '',
+            'comodidades': list(p.comodidades or []),
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritos', '0005_recommendation_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorito',
+            name='contribuicao',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(preencher_contribuicao, migrations.RunPython.noop),
+    ]
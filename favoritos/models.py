@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from propriedades.models import Propriedade
 
@@ -7,6 +7,8 @@ class Favorito(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favoritos')
     propriedade = models.ForeignKey(Propriedade, on_delete=models.CASCADE, related_name='favoritado_por')
     criado_em = models.DateTimeField(auto_now_add=True)
+    # o que este favorito somou ao perfil (ver UserPreferenceProfile.contribution); é o que se subtrai depois
+    contribuicao = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         unique_together = ('user', 'propriedade')
@@ -29,6 +31,7 @@ class UserRecommendation(models.Model):
     predicted_price = models.DecimalField(max_digits=10, decimal_places=2)
     generated_at = models.DateTimeField(auto_now_add=True)
     source = models.CharField(max_length=30, default='personal')
+    reasons = models.JSONField(default=list, blank=True)
 
     class Meta:
         unique_together = ('user', 'propriedade', 'source')
@@ -41,3 +44,174 @@ class UserRecommendation(models.Model):
 
     def __str__(self):
         return f"Rec {self.user.username} -> {self.propriedade_id} ({self.score})"
+
+
+class UserRecommendationState(models.Model):
+    """Carimbo do último conjunto de `UserRecommendation` gerado para um usuário/fonte.
+
+    As linhas persistidas são reaproveitadas enquanto forem recentes e as versões
+    (favoritos do usuário, modelo de preço e catálogo) continuarem as mesmas.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='estados_recomendacao')
+    source = models.CharField(max_length=30, default='personal')
+    favorites_version = models.PositiveIntegerField(default=0)
+    model_version = models.CharField(max_length=200, blank=True)
+    catalogue_version = models.BigIntegerField(default=0)
+    limit = models.PositiveIntegerField(default=0)
+    avg_price = models.FloatField(default=0.0)
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'source')
+        verbose_name = 'Estado de Recomendação'
+        verbose_name_plural = 'Estados de Recomendação'
+
+    def __str__(self):
+        return f"Estado {self.user.username}/{self.source} @ {self.generated_at:%Y-%m-%d %H:%M}"
+
+    def is_fresh(self, favorites_version, model_version, catalogue_version, limit, max_age, now):
+        return (
+            self.favorites_version == favorites_version
+            and self.model_version == model_version
+            and self.catalogue_version == catalogue_version
+            and self.limit >= limit
+            and self.generated_at >= now - max_age
+        )
+
+
+class UserPreferenceProfile(models.Model):
+    """Perfil agregado dos favoritos de um usuário, mantido incrementalmente.
+
+    Cada favorito adicionado/removido soma/subtrai sua contribuição (tipo, cidade,
+    amenidades e preço), sem reler os demais favoritos. A contribuição somada fica
+    guardada em `Favorito.contribuicao`: a remoção subtrai exatamente ela, e uma
+    edição do imóvel favoritado troca a antiga pela nova (ver favoritos.signals).
+    O recommender pessoal lê este perfil em vez de varrer `Favorito`.
+    """
+    DEFAULT_TIPO = 'Apartamento'
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='perfil_preferencias')
+    favorites_count = models.PositiveIntegerField(default=0)
+    price_sum = models.FloatField(default=0.0)
+    type_counts = models.JSONField(default=dict, blank=True)
+    city_counts = models.JSONField(default=dict, blank=True)
+    amenity_counts = models.JSONField(default=dict, blank=True)
+    # incrementa a cada mudança nos favoritos; invalida recomendações persistidas
+    favorites_version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Perfil de Preferências'
+        verbose_name_plural = 'Perfis de Preferências'
+
+    def __str__(self):
+        return f"Perfil {self.user.username} ({self.favorites_count} favoritos)"
+
+    @staticmethod
+    def _bump(counts, key, delta):
+        value = counts.get(key, 0) + delta
+        if value > 0:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    @classmethod
+    def contribution(cls, propriedade) -> dict:
+        """Valores de `propriedade` que um favorito soma ao perfil (serializável em JSON)."""
+        return {
+            'preco': float(propriedade.preco_por_noite or 0),
+            'tipo': getattr(propriedade, 'tipo', None) or cls.DEFAULT_TIPO,
+            'cidade': propriedade.city or '',
+            'comodidades': list(propriedade.comodidades or []),
+        }
+
+    def _add(self, contrib, delta, count=True):
+        if count:
+            self.favorites_count = max(0, self.favorites_count + delta)
+        self.price_sum = max(0.0, self.price_sum + delta * float(contrib.get('preco') or 0))
+        self._bump(self.type_counts, contrib.get('tipo') or self.DEFAULT_TIPO, delta)
+        if contrib.get('cidade'):
+            self._bump(self.city_counts, contrib['cidade'], delta)
+        for a in (contrib.get('comodidades') or []):
+            self._bump(self.amenity_counts, a, delta)
+        if self.favorites_count == 0:
+            self.price_sum = 0.0
+
+    @classmethod
+    def apply_favorite(cls, user_id, contrib, delta):
+        """Soma (`delta=1`) ou subtrai (`delta=-1`) a contribuição de um favorito do perfil do usuário."""
+        with transaction.atomic():
+            if delta > 0:
+                profile, _ = cls.objects.select_for_update().get_or_create(user_id=user_id)
+            else:
+                # remoções nunca criam perfil (ex.: usuário sendo excluído em cascata)
+                profile = cls.objects.select_for_update().filter(user_id=user_id).first()
+                if profile is None:
+                    return None
+            profile._add(contrib, delta)
+            profile.favorites_version += 1
+            profile.save()
+        return profile
+
+    @classmethod
+    def replace_favorite(cls, user_id, old, new):
+        """Troca a contribuição `old` de um favorito por `new` (imóvel favoritado foi editado)."""
+        with transaction.atomic():
+            profile = cls.objects.select_for_update().filter(user_id=user_id).first()
+            if profile is None:
+                return None
+            profile._add(old, -1, count=False)
+            profile._add(new, 1, count=False)
+            profile.favorites_version += 1
+            profile.save()
+        return profile
+
+    @classmethod
+    def rebuild(cls, user):
+        """Recalcula o perfil a partir de todos os favoritos (backfill/correção)."""
+        with transaction.atomic():
+            profile, _ = cls.objects.select_for_update().get_or_create(user=user)
+            profile.favorites_count = 0
+            profile.price_sum = 0.0
+            profile.type_counts, profile.city_counts, profile.amenity_counts = {}, {}, {}
+            for fav in Favorito.objects.filter(user=user).select_related('propriedade'):
+                contrib = cls.contribution(fav.propriedade)
+                profile._add(contrib, 1)
+                if fav.contribuicao != contrib:
+                    Favorito.objects.filter(pk=fav.pk).update(contribuicao=contrib)
+            profile.favorites_version += 1
+            profile.save()
+        return profile
+
+    @property
+    def avg_price(self) -> float:
+        return self.price_sum / self.favorites_count if self.favorites_count else 0.0
+
+    @property
+    def tipo_pref(self):
+        return max(self.type_counts, key=self.type_counts.get) if self.type_counts else None
+
+    @property
+    def cidade_pref(self):
+        return max(self.city_counts, key=self.city_counts.get) if self.city_counts else None
+
+    def top_amenities(self, min_count: int = 2):
+        return {a for a, c in self.amenity_counts.items() if c >= min_count}
+
+
+class PendingRecommendationRecompute(models.Model):
+    """Fila de recomputação de recomendações pessoais (uma linha por usuário).
+
+    Cada clique em favorito empurra `due_at` para frente; cliques em sequência
+    viram uma única execução no worker (`manage.py recommendation_worker`).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='recomputacao_pendente')
+    requested_at = models.DateTimeField(auto_now_add=True)
+    due_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Recomputação Pendente'
+        verbose_name_plural = 'Recomputações Pendentes'
+
+    def __str__(self):
+        return f"Recompute {self.user.username} @ {self.due_at:%H:%M:%S}"
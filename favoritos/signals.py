@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from propriedades.models import Propriedade
+
+from .models import Favorito, UserPreferenceProfile
+
+
+@receiver(post_save, sender=Favorito)
+def favorito_criado(sender, instance, created, **kwargs):
+    if created:
+        contrib = UserPreferenceProfile.contribution(instance.propriedade)
+        Favorito.objects.filter(pk=instance.pk).update(contribuicao=contrib)
+        instance.contribuicao = contrib
+        UserPreferenceProfile.apply_favorite(instance.user_id, contrib, 1)
+
+
+@receiver(post_delete, sender=Favorito)
+def favorito_removido(sender, instance, **kwargs):
+    # subtrai o que foi somado, não os valores atuais do imóvel
+    contrib = instance.contribuicao or UserPreferenceProfile.contribution(instance.propriedade)
+    UserPreferenceProfile.apply_favorite(instance.user_id, contrib, -1)
+
+
+@receiver(post_save, sender=Propriedade)
+def favoritada_editada(sender, instance, created, raw=False, **kwargs):
+    """Imóvel favoritado mudou preço/cidade/comodidades: atualiza o perfil de quem o favoritou."""
+    if created or raw or not getattr(instance, 'catalogo_mudou', True):
+        return
+    nova = UserPreferenceProfile.contribution(instance)
+    mudaram = []
+    favoritos = Favorito.objects.filter(propriedade_id=instance.pk)
+    for pk, user_id, antiga in favoritos.values_list('pk', 'user_id', 'contribuicao').iterator(chunk_size=2000):
+        if antiga != nova:
+            UserPreferenceProfile.replace_favorite(user_id, antiga or nova, nova)
+            mudaram.append(pk)
+    if mudaram:
+        Favorito.objects.filter(pk__in=mudaram).update(contribuicao=nova)
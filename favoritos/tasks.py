@@ -0,0 +1,63 @@
+"""Recomputação assíncrona (com debounce) das recomendações pessoais.
+
+As views de favoritos só agendam; o worker (`manage.py recommendation_worker`)
+executa as recomputações vencidas.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PendingRecommendationRecompute, UserRecommendation
+
+logger = logging.getLogger(__name__)
+
+
+def _debounce() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'FAVORITOS_RECOMPUTE_DEBOUNCE_SECONDS', 5))
+
+
+def schedule_recompute(user) -> None:
+    """Agenda (ou adia) a recomputação do usuário; rajadas de cliques viram uma execução."""
+    PendingRecommendationRecompute.objects.update_or_create(
+        user=user, defaults={'due_at': timezone.now() + _debounce()},
+    )
+
+
+def run_due_recomputes(limit: int = 50, now=None) -> int:
+    """Executa as recomputações vencidas; retorna quantas foram processadas."""
+    from recomendacoes.services.ml.views import compute_personal_recommendations_for_user
+
+    now = now or timezone.now()
+    due = list(
+        PendingRecommendationRecompute.objects.filter(due_at__lte=now)
+        .select_related('user').order_by('due_at')[:limit]
+    )
+    done = 0
+    for item in due:
+        # reivindica só se ninguém reagendou no meio tempo; um novo clique recria a linha
+        claimed, _ = PendingRecommendationRecompute.objects.filter(pk=item.pk, due_at=item.due_at).delete()
+        if not claimed:
+            continue
+        try:
+            compute_personal_recommendations_for_user(item.user, limit=getattr(settings, 'FAVORITOS_RECOMMENDATIONS_LIMIT', 10))
+            done += 1
+        except Exception:
+            logger.exception("Falha recomputando recomendações de %s", item.user_id)
+    return done
+
+
+def persisted_recommendations(user, limit: int = 6):
+    """Últimas recomendações pessoais persistidas, no formato devolvido pelas views."""
+    recs = (
+        UserRecommendation.objects.filter(user=user, source='personal')
+        .select_related('propriedade').order_by('-score', 'propriedade_id')[:limit]
+    )
+    return [{
+        'id': r.propriedade_id,
+        'titulo': r.propriedade.titulo,
+        'predicted_price': float(r.predicted_price),
+        'score': r.score,
+        'reasons': r.reasons,
+    } for r in recs]
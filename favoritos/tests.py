@@ -1,10 +1,13 @@
 import json
+from datetime import timedelta
 from unittest.mock import patch
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.utils import timezone
 from propriedades.models import Propriedade
-from favoritos.models import Favorito
+from favoritos.models import Favorito, PendingRecommendationRecompute, UserPreferenceProfile, UserRecommendation
+from favoritos.tasks import run_due_recomputes
 
 
 class FavoritosViewTests(TestCase):
@@ -39,13 +42,12 @@ class FavoritosViewTests(TestCase):
     # ADD FAVORITO
     # ----------------------------------------------------------------------
 
-    @patch("favoritos.views.compute_personal_recommendations_for_user")
-    def test_add_favorito_success(self, mock_recs):
+    def test_add_favorito_success(self):
 
-        mock_recs.return_value = {
-            "results": [{"id": 1, "score": 0.9}],
-            "avg_price": 250
-        }
+        # Recomendação persistida anteriormente (a recomputação fica para o worker)
+        UserRecommendation.objects.create(
+            user=self.user, propriedade=self.prop, score=0.9, predicted_price=250, source="personal"
+        )
 
         client = Client()
         client.login(username="john", password="123456")
@@ -58,13 +60,13 @@ class FavoritosViewTests(TestCase):
         self.assertTrue(data["created"])
         self.assertEqual(len(data["recommendations"]), 1)
 
-        # Favorito é realmente criado
-        self.assertEqual(Favorito.objects.count(), 1)
+        self.assertTrue(data["recompute_pending"])
 
-    @patch("favoritos.views.compute_personal_recommendations_for_user")
-    def test_add_favorito_duplicate(self, mock_recs):
+        # Favorito é realmente criado e a recomputação agendada
+        self.assertEqual(Favorito.objects.count(), 1)
+        self.assertTrue(PendingRecommendationRecompute.objects.filter(user=self.user).exists())
 
-        mock_recs.return_value = {"results": [], "avg_price": None}
+    def test_add_favorito_duplicate(self):
 
         # criar antes
         Favorito.objects.create(user=self.user, propriedade=self.prop)
@@ -77,16 +79,14 @@ class FavoritosViewTests(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertFalse(data["created"])  # já existia
+        self.assertFalse(data["recompute_pending"])
         self.assertEqual(Favorito.objects.count(), 1)
 
     # ----------------------------------------------------------------------
     # REMOVE FAVORITO
     # ----------------------------------------------------------------------
 
-    @patch("favoritos.views.compute_personal_recommendations_for_user")
-    def test_remove_favorito_success(self, mock_recs):
-
-        mock_recs.return_value = {"results": [], "avg_price": None}
+    def test_remove_favorito_success(self):
 
         Favorito.objects.create(user=self.user, propriedade=self.prop)
 
@@ -149,4 +149,98 @@ class FavoritosViewTests(TestCase):
     def test_list_requires_login(self):
         client = Client()
         response = client.get(self.list_url)
-        self.assertEqual(response.status_code, 302)
\ No newline at end of file
+        self.assertEqual(response.status_code, 302)
+
+class UserPreferenceProfileTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="ana", password="123456")
+        cls.owner = User.objects.create_user(username="dono", password="123456")
+        cls.p1 = Propriedade.objects.create(
+            titulo="Apto Centro", preco_por_noite=100.0, city="Curitiba",
+            comodidades=["wifi", "tv"], owner=cls.owner,
+        )
+        cls.p2 = Propriedade.objects.create(
+            titulo="Casa Praia", preco_por_noite=300.0, city="Recife",
+            comodidades=["wifi"], owner=cls.owner,
+        )
+
+    def test_profile_follows_add_and_remove(self):
+        client = Client()
+        client.login(username="ana", password="123456")
+
+        client.post(reverse("favoritos:add", args=[self.p1.id]))
+        client.post(reverse("favoritos:add", args=[self.p2.id]))
+        profile = UserPreferenceProfile.objects.get(user=self.user)
+        self.assertEqual(profile.favorites_count, 2)
+        self.assertEqual(profile.avg_price, 200.0)
+        self.assertEqual(profile.city_counts, {"Curitiba": 1, "Recife": 1})
+        self.assertEqual(profile.top_amenities(), {"wifi"})
+
+        client.post(reverse("favoritos:remove", args=[self.p2.id]))
+        profile.refresh_from_db()
+        self.assertEqual(profile.favorites_count, 1)
+        self.assertEqual(profile.avg_price, 100.0)
+        self.assertEqual(profile.cidade_pref, "Curitiba")
+        self.assertEqual(profile.amenity_counts, {"wifi": 1, "tv": 1})
+
+    def test_rebuild_matches_incremental_profile(self):
+        Favorito.objects.create(user=self.user, propriedade=self.p1)
+        Favorito.objects.create(user=self.user, propriedade=self.p2)
+        incremental = UserPreferenceProfile.objects.get(user=self.user)
+        rebuilt = UserPreferenceProfile.rebuild(self.user)
+        for field in ("favorites_count", "price_sum", "type_counts", "city_counts", "amenity_counts"):
+            self.assertEqual(getattr(incremental, field), getattr(rebuilt, field))
+
+    def test_editing_favorited_property_keeps_profile_consistent(self):
+        Favorito.objects.create(user=self.user, propriedade=self.p1)
+        Favorito.objects.create(user=self.user, propriedade=self.p2)
+        p1 = Propriedade.objects.get(pk=self.p1.pk)
+        p1.preco_por_noite = 500
+        p1.city = "Recife"
+        p1.comodidades = ["piscina"]
+        p1.save()
+        profile = UserPreferenceProfile.objects.get(user=self.user)
+        self.assertEqual(profile.price_sum, 800.0)
+        self.assertEqual(profile.city_counts, {"Recife": 2})
+        self.assertEqual(profile.amenity_counts, {"wifi": 1, "piscina": 1})
+
+        Favorito.objects.get(user=self.user, propriedade=self.p1).delete()
+        profile.refresh_from_db()
+        rebuilt = UserPreferenceProfile.rebuild(self.user)
+        self.assertEqual(profile.price_sum, 300.0)
+        self.assertEqual(profile.city_counts, {"Recife": 1})
+        for field in ("favorites_count", "price_sum", "type_counts", "city_counts", "amenity_counts"):
+            self.assertEqual(getattr(profile, field), getattr(rebuilt, field))
+
+
+class RecomputeQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="bia", password="123456")
+        cls.owner = User.objects.create_user(username="dona", password="123456")
+        cls.props = [
+            Propriedade.objects.create(titulo=f"Imovel {i}", preco_por_noite=100.0, owner=cls.owner)
+            for i in range(3)
+        ]
+
+    @patch("recomendacoes.services.ml.views.compute_personal_recommendations_for_user")
+    def test_burst_of_toggles_is_recomputed_once(self, mock_compute):
+        client = Client()
+        client.login(username="bia", password="123456")
+        for p in self.props:
+            client.post(reverse("favoritos:add", args=[p.id]))
+        client.post(reverse("favoritos:remove", args=[self.props[0].id]))
+
+        self.assertEqual(PendingRecommendationRecompute.objects.count(), 1)
+        mock_compute.assert_not_called()
+
+        # ainda dentro da janela de debounce
+        self.assertEqual(run_due_recomputes(), 0)
+
+        later = timezone.now() + timedelta(minutes=1)
+        self.assertEqual(run_due_recomputes(now=later), 1)
+        self.assertEqual(mock_compute.call_count, 1)
+        self.assertFalse(PendingRecommendationRecompute.objects.exists())
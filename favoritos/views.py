@@ -3,32 +3,35 @@ from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
 from propriedades.models import Propriedade
-from .models import Favorito
-from recomendacoes.services.ml.views import compute_personal_recommendations_for_user
+from .models import Favorito, UserPreferenceProfile
+from .tasks import persisted_recommendations, schedule_recompute
+
+def _recommendations_payload(user, pending):
+    """Recomendações já persistidas; a recomputação roda no worker, fora do request."""
+    profile = UserPreferenceProfile.objects.filter(user=user).first()
+    return {
+        'recommendations': persisted_recommendations(user, limit=6),
+        'avg_price': profile.avg_price if profile else None,
+        'recompute_pending': pending,
+    }
 
 @login_required
 @require_POST
 def add_favorito(request, propriedade_id):
     prop = get_object_or_404(Propriedade, pk=propriedade_id, ativo=True)
     fav, created = Favorito.objects.get_or_create(user=request.user, propriedade=prop)
-    # Recompute personal recommendations for the user and return them in the response
-    try:
-        recs = compute_personal_recommendations_for_user(request.user, limit=6)
-    except Exception:
-        recs = {'status': 'error', 'results': []}
-    return JsonResponse({'status': 'ok', 'favorited': True, 'created': created, 'recommendations': recs.get('results', []), 'avg_price': recs.get('avg_price')})
+    if created:
+        schedule_recompute(request.user)
+    return JsonResponse({'status': 'ok', 'favorited': True, 'created': created, **_recommendations_payload(request.user, created)})
 
 @login_required
 @require_POST
 def remove_favorito(request, propriedade_id):
     prop = get_object_or_404(Propriedade, pk=propriedade_id)
-    Favorito.objects.filter(user=request.user, propriedade=prop).delete()
-    # Recompute personal recommendations after removal (may become empty)
-    try:
-        recs = compute_personal_recommendations_for_user(request.user, limit=6)
-    except Exception:
-        recs = {'status': 'error', 'results': []}
-    return JsonResponse({'status': 'ok', 'favorited': False, 'recommendations': recs.get('results', []), 'avg_price': recs.get('avg_price')})
+    deleted, _ = Favorito.objects.filter(user=request.user, propriedade=prop).delete()
+    if deleted:
+        schedule_recompute(request.user)
+    return JsonResponse({'status': 'ok', 'favorited': False, **_recommendations_payload(request.user, bool(deleted))})
 
 @login_required
 def list_favoritos(request):
@@ -0,0 +1,106 @@
+"""
+Aquece modelos, catálogo e recomendações pessoais logo após um deploy, para
+que os primeiros usuários não paguem esse custo.
+Uso: python manage.py warmup --url http://127.0.0.1:8000/api/ml/warmup/ [--days 7] [--max-users 1000]
+                             [--budget 120] [--json]
+
+Modelo, catálogo, índice de semelhantes e preços previstos vivem na memória
+do processo que serve as requisições: com --url o comando pede ao servidor
+(POST no endpoint de warmup, autenticado pelo header X-Warmup-Token com
+settings.ML_WARMUP_TOKEN ou --token) que se aqueça. Sem --url eles são carregados
+só neste processo, o que serve apenas para medir tempos. As recomendações
+persistidas dos usuários recentes são recomputadas aqui, direto no banco.
+
+Cada fase é cronometrada; o comando falha (exit != 0) se alguma fase falhar
+ou, com --budget, se o tempo total passar do limite. É o portão do pipeline
+para liberar o tráfego.
+"""
+import json
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recomendacoes.services.ml.services.warmup import WarmupError, refresh_recent_users, timed, warm_process
+
+
+class Command(BaseCommand):
+    help = 'Aquece o servidor (modelo, catálogo, preços) e pré-calcula recomendações de usuários recentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None,
+                            help='Endpoint de warmup do servidor em execução (ex.: http://127.0.0.1:8000/api/ml/warmup/)')
+        parser.add_argument('--token', default=None,
+                            help='Segredo do endpoint de warmup (padrão: settings.ML_WARMUP_TOKEN)')
+        parser.add_argument('--timeout', type=float, default=600.0, help='Tempo máximo (s) da chamada a --url')
+        parser.add_argument('--days', type=int, default=7, help='Janela de atividade dos usuários (login ou favorito)')
+        parser.add_argument('--max-users', type=int, default=1000, help='Máximo de usuários recomputados')
+        parser.add_argument('--limit', type=int, default=getattr(settings, 'FAVORITOS_RECOMMENDATIONS_LIMIT', 10),
+                            help='Recomendações por usuário')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Usuários por escrita em lote')
+        parser.add_argument('--budget', type=float, default=None, help='Falha se o tempo total (s) passar disso')
+        parser.add_argument('--json', action='store_true', help='Imprime só o relatório de tempos, em JSON')
+
+    def handle(self, *args, **options):
+        self.quiet = options['json']
+        self.timings = {}
+        t0 = time.perf_counter()
+
+        try:
+            if options['url']:
+                token = options['token'] or getattr(settings, 'ML_WARMUP_TOKEN', '')
+                if not token:
+                    raise CommandError('--url exige ML_WARMUP_TOKEN (ou --token) para autenticar no servidor')
+                server = timed('warm_server', lambda: self._warm_server(options['url'], token, options['timeout']),
+                               self.timings, self._report)
+                catalogue_size = server.get('catalogue_size', 0)
+                # a recomputação abaixo roda neste processo e também precisa do modelo
+                model = timed('load_model', self._load_model, self.timings, self._report)
+            else:
+                if not self.quiet:
+                    self.stdout.write(self.style.WARNING(
+                        '  sem --url: modelo e catálogo aquecidos só neste processo, não no servidor'
+                    ))
+                server = {}
+                model, catalogue = warm_process(self.timings, self._report)
+                catalogue_size = len(catalogue)
+            refreshed = timed('refresh_recommendations', lambda: refresh_recent_users(
+                model, options['days'], options['max_users'], options['limit'], options['chunk_size'],
+            ), self.timings, self._report)
+        except WarmupError as e:
+            raise CommandError(str(e)) from e
+
+        total = time.perf_counter() - t0
+        if self.quiet:
+            self.stdout.write(json.dumps({
+                'phases': self.timings,
+                'server_phases': server.get('phases', {}),
+                'total': round(total, 3),
+                'catalogue_size': catalogue_size,
+                'users_refreshed': refreshed,
+            }))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Warmup concluído em {total:.2f}s ({catalogue_size} imóvel(is), {refreshed} usuário(s) recomputado(s))'
+            ))
+        if options['budget'] is not None and total > options['budget']:
+            raise CommandError(f'Warmup levou {total:.2f}s, acima do limite de {options["budget"]:.2f}s')
+
+    def _report(self, name, seconds):
+        if not self.quiet:
+            self.stdout.write(f'  {name}: {seconds:.3f}s')
+
+    def _load_model(self):
+        from recomendacoes.services.ml.services.model import PriceModel
+
+        return PriceModel.instance()
+
+    def _warm_server(self, url, token, timeout):
+        req = urllib.request.Request(url, data=b'', method='POST', headers={'X-Warmup-Token': token})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return json.loads(resp.read().decode('utf-8') or '{}')
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f'HTTP {e.code}: {e.read().decode("utf-8", "replace")[:200]}') from e
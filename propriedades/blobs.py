@@ -0,0 +1,135 @@
+"""Armazenamento endereçado por conteúdo das imagens de propriedades.
+
+Cada conteúdo distinto é gravado uma única vez em
+`propriedades/blobs/ab/cd/<sha256>.<ext>` e registrado em `ImagemBlob`, com
+um contador de referências (as `PropriedadeImagem` que apontam para ele).
+O SHA-256 é calculado enquanto o upload chega (ver
+`propriedades.uploadhandlers`); arquivos sem o hash pronto são lidos em
+blocos uma vez.
+
+Quando o contador chega a zero, o blob é apagado junto com suas variantes
+(`<sha256>.w640.webp` etc.), depois do commit. Como o nome muda sempre que o
+conteúdo muda, as URLs dos blobs podem ser servidas com cache longo e
+`immutable` (ver `propriedades.views.imagem_blob`).
+"""
+import hashlib
+import logging
+import os
+import posixpath
+from typing import Iterable, Optional
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = 'propriedades/blobs'
+
+
+def blob_name(sha256: str, original_name: str = '') -> str:
+    ext = os.path.splitext(original_name or '')[1].lower()[:10]
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}'
+
+
+def content_sha256(f) -> str:
+    """SHA-256 do arquivo: o calculado no upload, ou lido em blocos."""
+    sha = getattr(f, 'sha256', None)
+    if sha:
+        return sha
+    digest = hashlib.sha256()
+    if hasattr(f, 'seek'):
+        f.seek(0)
+    for chunk in f.chunks():
+        digest.update(chunk)
+    if hasattr(f, 'seek'):
+        f.seek(0)
+    return digest.hexdigest()
+
+
+def store(f, storage=None):
+    """Guarda `f` (se o conteúdo ainda não existir) e soma uma referência; retorna o ImagemBlob."""
+    from .models import ImagemBlob
+
+    storage = storage or default_storage
+    sha = content_sha256(f)
+    name = blob_name(sha, getattr(f, 'name', ''))
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                blob, created = ImagemBlob.objects.get_or_create(
+                    sha256=sha, defaults={'arquivo': name, 'tamanho': getattr(f, 'size', 0) or 0},
+                )
+        except IntegrityError:
+            # outro upload do mesmo conteúdo criou a linha primeiro
+            blob, created = ImagemBlob.objects.get(sha256=sha), False
+        if created or not storage.exists(blob.arquivo):
+            if hasattr(f, 'seek'):
+                f.seek(0)
+            saved = storage.save(blob.arquivo, f)
+            if saved != blob.arquivo:
+                # o storage renomeou (nome já ocupado): vale o nome gravado
+                ImagemBlob.objects.filter(pk=blob.pk).update(arquivo=saved)
+                blob.arquivo = saved
+        ImagemBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+    blob.refcount += 1
+    return blob
+
+
+def release(blob_id: Optional[int]) -> None:
+    """Tira uma referência do blob; se ninguém mais usar, ele é coletado após o commit."""
+    from .models import ImagemBlob
+
+    if not blob_id:
+        return
+    ImagemBlob.objects.filter(pk=blob_id).update(refcount=F('refcount') - 1)
+    transaction.on_commit(lambda: collect_garbage([blob_id]))
+
+
+def _delete_files(blob, storage) -> int:
+    """Apaga o blob e as variantes (`<sha>.*` no mesmo diretório); retorna os bytes liberados."""
+    freed = 0
+    directory = posixpath.dirname(blob.arquivo)
+    try:
+        _dirs, files = storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        files = [posixpath.basename(blob.arquivo)]
+    for fname in files:
+        if not fname.startswith(blob.sha256):
+            continue
+        path = f'{directory}/{fname}'
+        try:
+            freed += storage.size(path)
+            storage.delete(path)
+        except Exception:
+            logger.warning("Não foi possível remover %s", path)
+    return freed
+
+
+def collect_garbage(blob_ids: Optional[Iterable[int]] = None, storage=None) -> dict:
+    """Apaga os blobs sem referência (todos, ou só os de `blob_ids`); retorna {'blobs', 'bytes'}."""
+    from .models import ImagemBlob
+
+    storage = storage or default_storage
+    qs = ImagemBlob.objects.filter(refcount__lte=0, imagens__isnull=True)
+    if blob_ids is not None:
+        qs = qs.filter(pk__in=list(blob_ids))
+    removed, freed = 0, 0
+    for blob in list(qs):
+        # só apaga se continua sem referência (um upload pode ter chegado no meio tempo)
+        deleted, _ = ImagemBlob.objects.filter(pk=blob.pk, refcount__lte=0, imagens__isnull=True).delete()
+        if deleted:
+            removed += 1
+            freed += _delete_files(blob, storage)
+    return {'blobs': removed, 'bytes': freed}
+
+
+def recount() -> int:
+    """Recalcula `refcount` a partir das imagens que apontam para cada blob; retorna quantos mudaram."""
+    from .models import ImagemBlob
+
+    fixed = 0
+    for blob in ImagemBlob.objects.annotate(refs=Count('imagens')).exclude(refcount=F('refs')):
+        ImagemBlob.objects.filter(pk=blob.pk).update(refcount=blob.refs)
+        fixed += 1
+    return fixed
@@ -0,0 +1,135 @@
+"""Contagens de facetas da listagem (cidade, quartos, faixa de preço, comodidades).
+
+Todas as contagens saem de uma única consulta: as linhas que passam pelos
+filtros que não são facetas são agrupadas por `city_norm`, e cada contagem é um
+`COUNT(...) FILTER (WHERE ...)` no mesmo grupo. Cada faceta ignora o próprio
+filtro (a contagem de uma cidade diz quantos imóveis haveria trocando a
+cidade), mas respeita os demais; comodidades se somam às já escolhidas.
+
+O resultado fica no cache do Django, com chave pela assinatura dos filtros
+normalizados e pela versão do catálogo.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, F, Max, Q
+
+from .filters import base_conditions, facet_conditions, with_amenity_alias
+from .models import AMENITIES_CHOICES, AMENITY_BITS, Propriedade
+
+KEY_PREFIX = 'propriedades:facets'
+BEDROOMS = (1, 2, 3, 4)
+
+
+def _cache():
+    return caches[getattr(settings, 'ML_CACHE_ALIAS', 'default')]
+
+
+def price_buckets() -> List[Dict[str, Any]]:
+    """Faixas de preço por noite a partir dos limites em PROPRIEDADES_FACET_PRICE_BOUNDS.
+
+    Cada faixa é [min, max): um preço igual a um limite fica só na faixa de cima. Como
+    o preço tem 2 casas, o filtro inclusivo da listagem usa `max_price` = max - 0,01,
+    e a contagem usa esse mesmo filtro (ver `_price_q`).
+    """
+    bounds = sorted(float(b) for b in getattr(settings, 'PROPRIEDADES_FACET_PRICE_BOUNDS', (100, 200, 400, 800)))
+    edges = [None, *bounds, None]
+    buckets = []
+    for low, high in zip(edges, edges[1:]):
+        max_price = None if high is None else round(high - 0.01, 2)
+        if low is None:
+            label = f'abaixo de R$ {high:.0f}'
+        elif high is None:
+            label = f'R$ {low:.0f} ou mais'
+        else:
+            label = f'R$ {low:.0f} a {max_price:.2f}'.replace('.', ',')
+        buckets.append({'min': low, 'max': high, 'min_price': low, 'max_price': max_price, 'label': label})
+    return buckets
+
+
+def _count(*conds: Q) -> Count:
+    cond = Q()
+    for c in conds:
+        cond &= c
+    return Count('id', filter=cond) if cond else Count('id')
+
+
+def _price_q(bucket) -> Q:
+    """A mesma condição que o link da faixa aplica na listagem (min_price/max_price inclusivos)."""
+    return facet_conditions({k: bucket[k] for k in ('min_price', 'max_price') if bucket[k] is not None})['price']
+
+
+def compute_facets(filters: Dict[str, Any], ranked_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Contagens de todas as facetas para `filters` (sem cache).
+
+    Com busca textual indexada, `ranked_ids` restringe as linhas aos resultados da busca.
+    """
+    conds = facet_conditions(filters)
+    city, beds, price, amen = (conds[k] for k in ('city', 'bedrooms', 'price', 'amenities'))
+    buckets = price_buckets()
+
+    qs = Propriedade.objects.filter(ativo=True)
+    if ranked_ids is not None:
+        qs = qs.filter(id__in=ranked_ids)
+        filters = {k: v for k, v in filters.items() if k != 'q'}
+    qs = with_amenity_alias(qs, filters).filter(base_conditions(filters))
+    qs = qs.alias(**{f'bit_{code}': F('comodidades_mask').bitand(bit) for code, bit in AMENITY_BITS.items()})
+
+    aggregates = {
+        'label': Max('city'),
+        'total': _count(city, beds, price, amen),
+        'by_city': _count(beds, price, amen),
+    }
+    for n in BEDROOMS:
+        aggregates[f'beds_{n}'] = _count(city, price, amen, Q(quartos__gte=n))
+    for i, bucket in enumerate(buckets):
+        aggregates[f'price_{i}'] = _count(city, beds, amen, _price_q(bucket))
+    for code, bit in AMENITY_BITS.items():
+        aggregates[f'amen_{code}'] = _count(city, beds, price, amen, Q(**{f'bit_{code}': bit}))
+
+    rows = list(qs.values('city_norm').annotate(**aggregates).order_by())
+
+    def total(key):
+        return sum(r[key] for r in rows)
+
+    max_cities = int(getattr(settings, 'PROPRIEDADES_FACET_MAX_CITIES', 20))
+    cities = sorted(
+        ({'value': r['city_norm'], 'label': r['label'], 'count': r['by_city']}
+         for r in rows if r['city_norm'] and r['by_city']),
+        key=lambda c: (-c['count'], c['value']),
+    )[:max_cities]
+    return {
+        'total': total('total'),
+        'cities': cities,
+        'bedrooms': [{'value': n, 'label': f'{n}+', 'count': total(f'beds_{n}')} for n in BEDROOMS],
+        'price': [dict(b, count=total(f'price_{i}')) for i, b in enumerate(buckets)],
+        'amenities': [
+            {'value': code, 'label': label, 'count': total(f'amen_{code}')} for code, label in AMENITIES_CHOICES
+        ],
+    }
+
+
+def cache_key(filters: Dict[str, Any], ranked_ids: Optional[List[int]] = None) -> str:
+    from recomendacoes.services.ml.services.versions import catalogue_version
+
+    # com busca indexada a consulta depende também do índice, que acompanha a versão do catálogo
+    payload = json.dumps([filters, ranked_ids is not None, catalogue_version()], sort_keys=True, default=str)
+    return f"{KEY_PREFIX}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+def get_facets(filters: Dict[str, Any], ranked_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Facetas de `filters`, do cache quando possível (PROPRIEDADES_FACETS_CACHE_TIMEOUT=0 desativa)."""
+    timeout = getattr(settings, 'PROPRIEDADES_FACETS_CACHE_TIMEOUT', 300)
+    if not timeout:
+        return compute_facets(filters, ranked_ids)
+    cache = _cache()
+    key = cache_key(filters, ranked_ids)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    value = compute_facets(filters, ranked_ids)
+    cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,117 @@
+"""Filtros da listagem de propriedades (parâmetros GET).
+
+`parse_filters` normaliza os parâmetros (números inválidos são ignorados,
+textos sem espaços extras e em minúsculas, cidade normalizada), e o resultado
+serve tanto para filtrar a listagem quanto como assinatura do cache de facetas
+(ver `propriedades.facets`).
+
+Cidade, quartos, preço e comodidades padrão são facetas: `facet_conditions`
+devolve a condição de cada uma separadamente, para que as contagens de uma
+faceta possam ignorar o próprio filtro.
+"""
+from typing import Any, Dict
+
+from django.db.models import F, Q
+
+from .models import AMENITY_BITS, amenities_mask, normalize_city
+
+FACETS = ('city', 'bedrooms', 'price', 'amenities')
+
+_TEXT = ('q', 'neighborhood', 'property_type')
+_INT = ('min_area', 'max_area', 'bedrooms', 'bathrooms', 'parking')
+_FLOAT = ('min_price', 'max_price', 'min_rating')
+
+
+def _number(value, kind):
+    try:
+        return kind(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_filters(params) -> Dict[str, Any]:
+    """Filtros presentes em `params` (QueryDict ou dict), já normalizados."""
+    out: Dict[str, Any] = {}
+    for key in _TEXT:
+        value = ' '.join(str(params.get(key) or '').split()).lower()
+        if value:
+            out[key] = value
+    city = normalize_city(params.get('city'))
+    if city:
+        out['city'] = city
+    for key in _INT:
+        value = _number(params.get(key), int)
+        if value is not None:
+            out[key] = value
+    for key in _FLOAT:
+        value = _number(params.get(key), float)
+        if value is not None:
+            out[key] = value
+    getlist = getattr(params, 'getlist', None)
+    raw = getlist('amenities') if getlist else (params.get('amenities') or [])
+    amenities = sorted({str(a).strip().lower() for a in raw if a and str(a).strip()})
+    if amenities:
+        out['amenities'] = amenities
+    return out
+
+
+def with_amenity_alias(qs, filters: Dict[str, Any]):
+    """Adiciona o alias `comod_sel` (máscara AND comodidades pedidas) usado pela condição de comodidades."""
+    mask = amenities_mask(filters.get('amenities'))
+    if mask:
+        qs = qs.alias(comod_sel=F('comodidades_mask').bitand(mask))
+    return qs
+
+
+def base_conditions(filters: Dict[str, Any]) -> Q:
+    """Filtros que não são facetas (texto, bairro, tipo, área, banheiros, vagas, nota mínima)."""
+    cond = Q()
+    if 'q' in filters:
+        # sem índice de busca textual; com índice, o chamador restringe pelos ids ranqueados
+        cond &= Q(titulo__icontains=filters['q'])
+    if 'neighborhood' in filters:
+        cond &= Q(endereco__icontains=filters['neighborhood'])
+    if 'property_type' in filters:
+        cond &= Q(titulo__icontains=filters['property_type'])
+    if 'min_area' in filters:
+        cond &= Q(area_m2__gte=filters['min_area'])
+    if 'max_area' in filters:
+        cond &= Q(area_m2__lte=filters['max_area'])
+    if 'bathrooms' in filters:
+        cond &= Q(banheiros__gte=filters['bathrooms'])
+    if 'parking' in filters:
+        cond &= Q(vagas_garagem__gte=filters['parking'])
+    if 'min_rating' in filters:
+        # média denormalizada em Propriedade (sem avaliações = NULL, não passa)
+        cond &= Q(rating_avg__gte=filters['min_rating'])
+    # comodidades fora de AMENITIES_CHOICES: item exato (com aspas) no JSON
+    for a in filters.get('amenities', []):
+        if a not in AMENITY_BITS:
+            cond &= Q(comodidades__icontains=f'"{a}"')
+    return cond
+
+
+def facet_conditions(filters: Dict[str, Any]) -> Dict[str, Q]:
+    """Condição de cada faceta (Q vazio quando não filtrada)."""
+    conds = {name: Q() for name in FACETS}
+    if 'city' in filters:
+        # igualdade na cidade normalizada (sem acento/caixa), coberta por índice
+        conds['city'] = Q(city_norm=filters['city'])
+    if 'bedrooms' in filters:
+        conds['bedrooms'] = Q(quartos__gte=filters['bedrooms'])
+    if 'min_price' in filters:
+        conds['price'] &= Q(preco_por_noite__gte=filters['min_price'])
+    if 'max_price' in filters:
+        conds['price'] &= Q(preco_por_noite__lte=filters['max_price'])
+    mask = amenities_mask(filters.get('amenities'))
+    if mask:
+        conds['amenities'] = Q(comod_sel=mask)
+    return conds
+
+
+def filter_queryset(qs, filters: Dict[str, Any]):
+    """Aplica todos os filtros a `qs`."""
+    cond = base_conditions(filters)
+    for facet in facet_conditions(filters).values():
+        cond &= facet
+    return with_amenity_alias(qs, filters).filter(cond)
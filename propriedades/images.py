@@ -0,0 +1,153 @@
+"""Variantes redimensionadas das imagens de propriedades (WebP e JPEG).
+
+O upload só grava o original; a geração das variantes é agendada para depois
+do commit e roda num pool de threads do próprio processo, fora da requisição.
+Cada largura de PROPRIEDADES_IMAGE_WIDTHS (sem ampliar o original) vira um
+arquivo WebP e um JPEG ao lado do original (`foto.w640.webp`), e a lista vai
+para `PropriedadeImagem.variantes`, de onde os templates montam o `srcset`.
+Imagens que compartilham o mesmo blob (ver `propriedades.blobs`) compartilham
+também as variantes.
+
+Imagens que ficarem pendentes (processo reiniciado, erro) são refeitas por
+`python manage.py build_image_renditions`.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+FORMATS = (('webp', 'webp'), ('jpeg', 'jpg'))
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def widths() -> List[int]:
+    return sorted({int(w) for w in getattr(settings, 'PROPRIEDADES_IMAGE_WIDTHS', (320, 640, 1280))})
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=int(getattr(settings, 'PROPRIEDADES_IMAGE_WORKERS', 2)),
+                thread_name_prefix='variantes-imagem',
+            )
+        return _EXECUTOR
+
+
+def _run_in_background(imagem_id: int) -> None:
+    try:
+        build_renditions(imagem_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(imagem_id: int) -> None:
+    """Agenda a geração das variantes para depois do commit da transação atual.
+
+    Com PROPRIEDADES_IMAGE_ASYNC = False a geração roda no próprio on_commit (testes, scripts).
+    """
+    if getattr(settings, 'PROPRIEDADES_IMAGE_ASYNC', True):
+        transaction.on_commit(lambda: _executor().submit(_run_in_background, imagem_id))
+    else:
+        transaction.on_commit(lambda: build_renditions(imagem_id))
+
+
+def _encode(im, fmt: str) -> bytes:
+    buf = BytesIO()
+    if fmt == 'jpeg':
+        if im.mode in ('RGBA', 'LA', 'P'):
+            from PIL import Image
+
+            rgba = im.convert('RGBA')
+            im = Image.new('RGB', rgba.size, (255, 255, 255))
+            im.paste(rgba, mask=rgba.getchannel('A'))
+        elif im.mode != 'RGB':
+            im = im.convert('RGB')
+        im.save(buf, 'JPEG', quality=int(getattr(settings, 'PROPRIEDADES_IMAGE_JPEG_QUALITY', 80)),
+                optimize=True, progressive=True)
+    else:
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA' if im.mode in ('LA', 'P', 'PA') else 'RGB')
+        im.save(buf, 'WEBP', quality=int(getattr(settings, 'PROPRIEDADES_IMAGE_WEBP_QUALITY', 75)), method=4)
+    return buf.getvalue()
+
+
+def build_renditions(imagem_id: int, reuse: bool = True) -> bool:
+    """Gera (ou refaz) as variantes de uma imagem; retorna False se ela não existe mais ou falhou.
+
+    Com `reuse`, imagens do mesmo blob reaproveitam as variantes já geradas para ele.
+    """
+    from PIL import Image, ImageOps
+
+    from .models import Propriedade, PropriedadeImagem
+
+    img = PropriedadeImagem.objects.filter(pk=imagem_id).first()
+    if img is None or not img.imagem:
+        return False
+    if reuse and img.blob_id:
+        # mesmo conteúdo já processado para outra imagem: as variantes do blob servem
+        pronta = (
+            PropriedadeImagem.objects.filter(blob_id=img.blob_id, variantes_status=PropriedadeImagem.STATUS_PRONTO)
+            .exclude(pk=img.pk).values('largura', 'altura', 'variantes').first()
+        )
+        if pronta:
+            PropriedadeImagem.objects.filter(pk=imagem_id).update(variantes_status=PropriedadeImagem.STATUS_PRONTO, **pronta)
+            Propriedade.incrementar_versao(img.propriedade_id)
+            return True
+    storage = img.imagem.storage
+    stem = os.path.splitext(img.imagem.name)[0]
+    try:
+        with img.imagem.open('rb') as fh:
+            original = Image.open(fh)
+            original.load()
+        original = ImageOps.exif_transpose(original)
+        largura, altura = original.size
+        variantes = []
+        for w in sorted({min(w, largura) for w in widths()}):
+            resized = original.copy()
+            resized.thumbnail((w, max(1, round(altura * w / largura))), Image.LANCZOS)
+            for fmt, ext in FORMATS:
+                data = _encode(resized, fmt)
+                name = f'{stem}.w{w}.{ext}'
+                if storage.exists(name):
+                    storage.delete(name)
+                variantes.append({
+                    'nome': storage.save(name, ContentFile(data)),
+                    'formato': fmt,
+                    'largura': resized.width,
+                    'altura': resized.height,
+                    'bytes': len(data),
+                })
+    except Exception:
+        logger.exception("Falha gerando variantes da imagem %s", imagem_id)
+        PropriedadeImagem.objects.filter(pk=imagem_id).update(variantes_status=PropriedadeImagem.STATUS_ERRO)
+        return False
+    # update(): não dispara os signals de PropriedadeImagem (nem reagenda a geração)
+    PropriedadeImagem.objects.filter(pk=imagem_id).update(
+        largura=largura, altura=altura, variantes=variantes, variantes_status=PropriedadeImagem.STATUS_PRONTO,
+    )
+    # a galeria em cache do detalhe passa a usar as variantes
+    Propriedade.incrementar_versao(img.propriedade_id)
+    # variantes de larguras que saíram da configuração
+    novas = {v['nome'] for v in variantes}
+    delete_renditions([v for v in img.variantes if v.get('nome') not in novas], storage)
+    return True
+
+
+def delete_renditions(variantes, storage) -> None:
+    for v in variantes or []:
+        try:
+            storage.delete(v['nome'])
+        except Exception:
+            logger.warning("Não foi possível remover a variante %s", v.get('nome'))
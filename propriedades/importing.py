@@ -0,0 +1,180 @@
+"""Importação em streaming dos imóveis gerados (`dados/raw/imoveis_gerados.json`).
+
+`iter_records` lê um array JSON ou um arquivo JSONL registro a registro, com
+memória constante; `map_record` converte um registro do gerador nos campos de
+`Propriedade` (incluindo os derivados que `save()` calcularia, já que a carga
+usa `bulk_create`). Cada registro leva uma impressão digital (`origem_hash`,
+SHA-256 do JSON canônico), e reimportar o mesmo arquivo não duplica linhas.
+
+O comando `python manage.py import_listings` orquestra a carga.
+"""
+import functools
+import hashlib
+import json
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterator, Optional
+
+from .models import AMENITIES_CHOICES, Propriedade, amenities_mask, normalize_city
+
+READ_SIZE = 1 << 20
+# um registro maior que isto indica arquivo corrompido (e não um registro grande)
+MAX_RECORD_BYTES = 16 << 20
+
+
+class ImportErrorRecord(ValueError):
+    """Registro que não pode virar uma Propriedade (campo obrigatório ausente ou inválido)."""
+
+
+def _iter_jsonl(fh) -> Iterator[Dict[str, Any]]:
+    for lineno, line in enumerate(fh, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'JSON inválido na linha {lineno}: {e}') from e
+
+
+def _iter_array(fh) -> Iterator[Dict[str, Any]]:
+    """Objetos de um array JSON de nível superior, decodificados um a um do buffer."""
+    decoder = json.JSONDecoder()
+    buf, eof, started = '', False, False
+    while True:
+        pos = 0
+        while True:
+            # pula espaços, vírgulas e o '[' inicial até o próximo valor
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+                pos += 1
+            if pos < len(buf) and not started:
+                if buf[pos] != '[':
+                    raise ValueError('Esperado um array JSON de registros')
+                started = True
+                pos += 1
+                continue
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            if pos >= len(buf):
+                break
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError('JSON truncado ou inválido')
+                if len(buf) - pos > MAX_RECORD_BYTES:
+                    raise ValueError('Registro JSON grande demais (arquivo corrompido?)')
+                break  # registro incompleto: lê mais
+            yield obj
+            pos = end
+        buf = buf[pos:]
+        if eof:
+            if buf.strip():
+                raise ValueError('JSON truncado ou inválido')
+            if started:
+                raise ValueError('Array JSON sem "]" final')
+            return
+        chunk = fh.read(READ_SIZE)
+        eof = not chunk
+        buf += chunk
+
+
+def iter_records(path: str, fmt: str = 'auto') -> Iterator[Dict[str, Any]]:
+    """Registros de `path`: 'json' (array), 'jsonl' (um objeto por linha) ou 'auto' (pelo 1º caractere)."""
+    with open(path, 'r', encoding='utf-8') as fh:
+        if fmt == 'auto':
+            head = ''
+            while True:
+                ch = fh.read(1)
+                if not ch or not ch.isspace():
+                    head = ch
+                    break
+            fh.seek(0)
+            fmt = 'json' if head == '[' else 'jsonl'
+        yield from (_iter_array(fh) if fmt == 'json' else _iter_jsonl(fh))
+
+
+def fingerprint(record: Dict[str, Any]) -> str:
+    canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+@functools.lru_cache(maxsize=4096)  # poucos rótulos distintos, repetidos em milhões de registros
+def _key(text: str) -> str:
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ' '.join(''.join(ch for ch in text if not unicodedata.combining(ch)).casefold().replace('-', ' ').split())
+
+
+# rótulos do gerador -> códigos de AMENITIES_CHOICES; os demais ficam como texto em minúsculas
+AMENITY_ALIASES = {
+    **{_key(label): code for code, label in AMENITIES_CHOICES},
+    **{_key(code): code for code, _label in AMENITIES_CHOICES},
+    'cozinha': 'cozinha',
+    'estacionamento gratuito': 'estacionamento',
+}
+
+
+def map_amenities(labels) -> list:
+    out = []
+    for label in labels or []:
+        code = AMENITY_ALIASES.get(_key(str(label))) or str(label).strip().lower()
+        if code and code not in out:
+            out.append(code)
+    return out
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None and value != '' else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _decimal(value) -> Optional[Decimal]:
+    """Valor com 2 casas que cabe nos DecimalField(max_digits=8) de Propriedade; senão None."""
+    try:
+        d = Decimal(str(value)).quantize(Decimal('0.01')) if value is not None and value != '' else None
+    except (InvalidOperation, ValueError):
+        return None
+    return d if d is not None and abs(d) < Decimal('1000000') else None
+
+
+def map_record(record: Dict[str, Any], owner_id: int) -> Propriedade:
+    """Propriedade (não salva) a partir de um registro do gerador; ImportErrorRecord se faltar o essencial.
+
+    `preco_aluguel` vai para `preco_por_noite`: é o alvo do modelo de preço, que compara
+    suas previsões com `preco_por_noite` (ver recomendacoes.services.ml).
+    """
+    if not isinstance(record, dict):
+        raise ImportErrorRecord('registro não é um objeto')
+    preco = _decimal(record.get('preco_aluguel', record.get('preco_por_noite')))
+    if preco is None or preco <= 0:
+        raise ImportErrorRecord('preço ausente ou fora da faixa')
+    end = record.get('endereco') if isinstance(record.get('endereco'), dict) else {}
+    city = str(end.get('cidade') or record.get('city') or '')[:100]
+    bairro = str(end.get('bairro') or '')
+    rua = ', '.join(str(x) for x in (end.get('rua'), end.get('numero')) if x not in (None, ''))
+    endereco = ' - '.join(x for x in (rua, bairro, str(end.get('complemento') or '')) if x)[:300]
+    tipo = str(record.get('tipo') or 'Imóvel')
+    local = ', '.join(x for x in (bairro, city) if x)
+    comodidades = map_amenities(record.get('comodidades'))
+    return Propriedade(
+        owner_id=owner_id,
+        titulo=(f'{tipo} em {local}' if local else tipo)[:200],
+        descricao=str(record.get('descricao') or ''),
+        endereco=endereco,
+        city=city,
+        city_norm=normalize_city(city),
+        state=str(end.get('estado') or record.get('state') or '')[:100],
+        preco_por_noite=preco,
+        area_m2=_int(record.get('area_m2')),
+        quartos=_int(record.get('quartos')),
+        banheiros=_int(record.get('banheiros')),
+        vagas_garagem=_int(record.get('vagas_garagem')),
+        condominio=_decimal(record.get('condominio')),
+        iptu=_decimal(record.get('iptu')),
+        ativo=str(record.get('status') or 'ativo').strip().lower() == 'ativo',
+        comodidades=comodidades,
+        comodidades_mask=amenities_mask(comodidades),
+        origem_hash=fingerprint(record),
+    )
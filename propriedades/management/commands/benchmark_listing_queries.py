@@ -0,0 +1,109 @@
+"""
+Mede as consultas quentes da listagem e do recommender contra um catálogo
+sintético, mostrando o plano (EXPLAIN) e o tempo de cada uma, com e sem os
+índices de Propriedade. Tudo roda dentro de uma transação desfeita no final:
+o banco não é alterado.
+Uso: python manage.py benchmark_listing_queries [--rows 1000000] [--repeat 5] [--compare]
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from propriedades.models import AMENITIES_CHOICES, Propriedade, amenities_mask, normalize_city
+
+CITIES = ['São Paulo', 'Rio de Janeiro', 'Curitiba', 'Belo Horizonte', 'Recife', 'Porto Alegre',
+          'Salvador', 'Fortaleza', 'Florianópolis', 'Goiânia', 'Natal', 'Manaus']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def query_shapes(ativos):
+    """Formatos de consulta usados em propriedades/views.py e recommender.py."""
+    recent = ('-criado_em', '-id')
+    city = normalize_city('Curitiba')
+    return [
+        ('listagem (primeira página)', ativos.order_by(*recent)[:25]),
+        ('listagem por cidade', ativos.filter(city_norm=city).order_by(*recent)[:25]),
+        ('cidade + faixa de preço', ativos.filter(city_norm=city, preco_por_noite__gte=150, preco_por_noite__lte=250)
+         .order_by(*recent)[:25]),
+        ('faixa de preço', ativos.filter(preco_por_noite__gte=900, preco_por_noite__lte=950).order_by(*recent)[:25]),
+        ('quartos + área mínimos', ativos.filter(quartos__gte=4, area_m2__gte=180).order_by(*recent)[:25]),
+        ('candidatos do recommender por cidade', ativos.filter(city_norm=city).values_list('id', 'area_m2', 'quartos')),
+        ('contagem por cidade', ativos.filter(city_norm=city)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN e tempos das consultas da listagem num catálogo sintético (transação desfeita)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Propriedades sintéticas')
+        parser.add_argument('--repeat', type=int, default=5, help='Execuções por consulta (vale a melhor)')
+        parser.add_argument('--batch', type=int, default=5000)
+        parser.add_argument('--compare', action='store_true', help='Repete as medições sem os índices de Propriedade')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._populate(options)
+                self._run('com índices', options)
+                if options['compare']:
+                    # DROP INDEX também é desfeito pelo rollback (SQLite e PostgreSQL)
+                    with connection.cursor() as cur:
+                        for index in Propriedade._meta.indexes:
+                            cur.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+                    self._run('sem índices', options, fresh_sql=True)
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write(self.style.SUCCESS('Transação desfeita; nenhum dado foi mantido.'))
+
+    def _populate(self, options):
+        rng = random.Random(options['seed'])
+        owner = User.objects.create(username=f'benchmark-{time.time_ns()}')
+        codes = [code for code, _label in AMENITIES_CHOICES]
+        now = timezone.now()
+        t0 = time.perf_counter()
+        batch = []
+        for i in range(options['rows']):
+            city = rng.choice(CITIES)
+            comodidades = rng.sample(codes, rng.randint(0, 5))
+            batch.append(Propriedade(
+                owner=owner, titulo=f'Imóvel sintético {i}', city=city, city_norm=normalize_city(city),
+                preco_por_noite=Decimal(rng.randint(80, 3000)), area_m2=rng.randint(20, 300),
+                quartos=rng.randint(0, 5), banheiros=rng.randint(1, 4), vagas_garagem=rng.randint(0, 3),
+                comodidades=comodidades, comodidades_mask=amenities_mask(comodidades),
+                ativo=rng.random() > 0.05, criado_em=now - timedelta(seconds=i),
+            ))
+            if len(batch) >= options['batch']:
+                Propriedade.objects.bulk_create(batch)  # sem signals: não toca índices de busca nem caches
+                batch = []
+        if batch:
+            Propriedade.objects.bulk_create(batch)
+        with connection.cursor() as cur:
+            cur.execute('ANALYZE')
+        self.stdout.write(f'{options["rows"]} propriedades sintéticas criadas em {time.perf_counter() - t0:.1f}s')
+
+    def _run(self, label, options, fresh_sql=False):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n== {label} =='))
+        ativos = Propriedade.objects.filter(ativo=True)
+        if fresh_sql:
+            # SQL com texto diferente: o sqlite3 reaproveita o plano de EXPLAIN de uma instrução já preparada
+            ativos = ativos.extra(where=['1 = 1'])
+        for name, qs in query_shapes(ativos):
+            is_count = name.startswith('contagem')
+            best = float('inf')
+            for _ in range(max(1, options['repeat'])):
+                t = time.perf_counter()
+                qs.count() if is_count else list(qs.all())  # .all(): sem reaproveitar o cache do queryset
+                best = min(best, time.perf_counter() - t)
+            self.stdout.write(self.style.SUCCESS(f'\n{name}: {best * 1000:.2f} ms'))
+            self.stdout.write(qs.explain())
@@ -0,0 +1,30 @@
+"""
+Gera as variantes redimensionadas (WebP/JPEG) das imagens de propriedades que
+ainda não as têm: imagens anteriores ao pipeline, ou que ficaram pendentes por
+reinício do processo ou erro.
+Uso: python manage.py build_image_renditions [--all] [--limit 500]
+"""
+from django.core.management.base import BaseCommand
+
+from propriedades.images import build_renditions
+from propriedades.models import PropriedadeImagem
+
+
+class Command(BaseCommand):
+    help = 'Gera as variantes das imagens pendentes (ou de todas, com --all)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Refaz também as imagens já prontas')
+        parser.add_argument('--limit', type=int, default=None, help='Máximo de imagens processadas')
+
+    def handle(self, *args, **options):
+        qs = PropriedadeImagem.objects.order_by('id')
+        if not options['all']:
+            qs = qs.exclude(variantes_status=PropriedadeImagem.STATUS_PRONTO)
+        ids = list(qs.values_list('id', flat=True)[:options['limit']])
+        ok = sum(1 for pk in ids if build_renditions(pk, reuse=not options["all"]))
+        falhas = len(ids) - ok
+        msg = f'✓ Variantes geradas para {ok} imagem(ns)'
+        if falhas:
+            msg += f'; {falhas} falha(s) (ver log)'
+        self.stdout.write(self.style.SUCCESS(msg) if not falhas else self.style.WARNING(msg))
@@ -0,0 +1,54 @@
+"""
+Manutenção do armazenamento de imagens endereçado por conteúdo.
+Uso: python manage.py gc_image_blobs [--adopt] [--limit 500]
+
+- recalcula o contador de referências de cada blob a partir das imagens;
+- com --adopt, move imagens antigas (anteriores aos blobs) para o blob do seu
+  conteúdo, removendo o arquivo original duplicado e refazendo as variantes;
+- apaga blobs sem referência, com suas variantes.
+"""
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from propriedades import blobs
+from propriedades.images import build_renditions, delete_renditions
+from propriedades.models import PropriedadeImagem
+
+
+class Command(BaseCommand):
+    help = 'Recalcula referências, adota imagens antigas (--adopt) e coleta blobs de imagem sem uso'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--adopt', action='store_true', help='Move imagens antigas para blobs (deduplicando)')
+        parser.add_argument('--limit', type=int, default=None, help='Máximo de imagens adotadas nesta execução')
+
+    def handle(self, *args, **options):
+        if options['adopt']:
+            adopted, missing = self._adopt(options['limit'])
+            self.stdout.write(f'{adopted} imagem(ns) adotada(s); {missing} sem arquivo no storage')
+        fixed = blobs.recount()
+        if fixed:
+            self.stdout.write(self.style.WARNING(f'{fixed} contador(es) de referência corrigido(s)'))
+        result = blobs.collect_garbage()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {result["blobs"]} blob(s) removido(s), {result["bytes"] / 1024 / 1024:.1f} MB liberados'
+        ))
+
+    def _adopt(self, limit):
+        adopted = missing = 0
+        legacy = PropriedadeImagem.objects.filter(blob__isnull=True).exclude(imagem='').order_by('id')
+        for img in legacy[:limit]:
+            storage, antigo = img.imagem.storage, img.imagem.name
+            if not storage.exists(antigo):
+                missing += 1
+                continue
+            with storage.open(antigo, 'rb') as fh:
+                blob = blobs.store(File(fh, name=antigo), storage)
+            PropriedadeImagem.objects.filter(pk=img.pk).update(
+                blob=blob, imagem=blob.arquivo, variantes=[], variantes_status=PropriedadeImagem.STATUS_PENDENTE,
+            )
+            delete_renditions(img.variantes, storage)
+            storage.delete(antigo)
+            build_renditions(img.pk)
+            adopted += 1
+        return adopted, missing
@@ -0,0 +1,128 @@
+"""
+Importa os imóveis gerados (array JSON ou JSONL) para a tabela Propriedade,
+em streaming e com memória constante.
+Uso: python manage.py import_listings [dados/raw/imoveis_gerados.json] [--chunk-size 2000] [--owner usuario]
+
+Cada lote entra numa transação, via bulk_create, já com os campos derivados
+(city_norm, comodidades_mask) e indexado na busca textual. Registros já
+importados (mesmo `origem_hash`) são ignorados, então reexecutar o comando,
+inclusive depois de uma interrupção, não duplica imóveis. Sem --owner, cada
+anfitrião do registro vira (ou reaproveita) um usuário `anfitriao-<nome>`.
+No fim a versão do catálogo é incrementada uma única vez.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+
+from propriedades import search
+from propriedades.importing import ImportErrorRecord, iter_records, map_record
+from propriedades.models import Propriedade
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OWNER = 'importacao'
+
+
+class Command(BaseCommand):
+    help = 'Importa imóveis de um array JSON ou JSONL para Propriedade (idempotente, em lotes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=os.path.join(settings.BASE_DIR, 'dados', 'raw', 'imoveis_gerados.json'))
+        parser.add_argument('--format', choices=['auto', 'json', 'jsonl'], default='auto')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Registros por transação / bulk_create')
+        parser.add_argument('--owner', default=None, help='Username dono de todos os imóveis (senão, um por anfitrião)')
+        parser.add_argument('--limit', type=int, default=None, help='Máximo de registros lidos')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Arquivo não encontrado: {path}')
+        self.fixed_owner = None
+        if options['owner']:
+            self.fixed_owner = User.objects.filter(username=options['owner']).values_list('id', flat=True).first()
+            if self.fixed_owner is None:
+                raise CommandError(f'Usuário não encontrado: {options["owner"]}')
+        self.owners = {}
+        size = max(1, options['chunk_size'])
+        stats = {'lidos': 0, 'inseridos': 0, 'existentes': 0, 'invalidos': 0, 'reportado': 0}
+        t0 = time.perf_counter()
+
+        batch = []
+        try:
+            for record in iter_records(path, options['format']):
+                if options['limit'] is not None and stats['lidos'] >= options['limit']:
+                    break
+                stats['lidos'] += 1
+                try:
+                    batch.append(map_record(record, self._owner_id(record)))
+                except ImportErrorRecord as e:
+                    stats['invalidos'] += 1
+                    if stats['invalidos'] <= 10:
+                        logger.warning('Registro %s ignorado: %s', stats['lidos'], e)
+                if len(batch) >= size:
+                    self._flush(batch, stats)
+                    batch = []
+                    self._progress(stats, t0)
+            self._flush(batch, stats)
+        except ValueError as e:
+            raise CommandError(f'{path}: {e} (lotes anteriores já gravados; reexecute após corrigir)') from e
+        finally:
+            if stats['inseridos']:
+                from recomendacoes.services.ml.services.versions import bump_catalogue_version
+
+                bump_catalogue_version()
+
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {stats["inseridos"]} imóvel(is) importado(s), {stats["existentes"]} já existente(s), '
+            f'{stats["invalidos"]} inválido(s) de {stats["lidos"]} registro(s) em {elapsed:.1f}s'
+        ))
+
+    def _owner_id(self, record):
+        if self.fixed_owner is not None:
+            return self.fixed_owner
+        host = record.get('anfitriao') if isinstance(record, dict) else None
+        nome = str((host or {}).get('nome') or '').strip() if isinstance(host, dict) else ''
+        username = f'anfitriao-{slugify(nome)}'[:150] if slugify(nome) else DEFAULT_OWNER
+        if username not in self.owners:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                first, _, last = nome.partition(' ')
+                user = User(username=username, first_name=first[:150], last_name=last[:150])
+                user.set_unusable_password()
+                user.save()
+            self.owners[username] = user.pk
+        return self.owners[username]
+
+    def _flush(self, batch, stats):
+        if not batch:
+            return
+        # duplicatas dentro do lote e registros de execuções anteriores
+        unique = {p.origem_hash: p for p in batch}
+        existing = set(
+            Propriedade.objects.filter(origem_hash__in=list(unique)).values_list('origem_hash', flat=True)
+        )
+        new = [p for h, p in unique.items() if h not in existing]
+        stats['existentes'] += len(batch) - len(new)
+        if not new:
+            return
+        with transaction.atomic():
+            created = Propriedade.objects.bulk_create(new)  # sem save()/signals: derivados já preenchidos
+            ids = [p.pk for p in created if p.pk is not None]
+            if len(ids) != len(created):
+                ids = list(Propriedade.objects.filter(origem_hash__in=[p.origem_hash for p in new]).values_list('id', flat=True))
+            search.index_many(ids)
+        stats['inseridos'] += len(new)
+
+    def _progress(self, stats, t0):
+        # uma linha a cada ~100k registros lidos
+        if stats['lidos'] // 100_000 > stats.get('reportado', 0):
+            stats['reportado'] = stats['lidos'] // 100_000
+            rate = stats['lidos'] / max(time.perf_counter() - t0, 1e-9)
+            self.stdout.write(f'  {stats["lidos"]} registro(s) lidos, {stats["inseridos"]} inseridos ({rate:.0f}/s)')
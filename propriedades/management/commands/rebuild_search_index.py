@@ -0,0 +1,22 @@
+"""
+Recria o conteúdo do índice de busca textual a partir das propriedades ativas.
+Uso: python manage.py rebuild_search_index
+
+Útil depois de instalar a extensão `unaccent` no PostgreSQL (a busca passa a
+ignorar acentos só nos documentos indexados a partir daí).
+"""
+from django.core.management.base import BaseCommand
+
+from propriedades import search
+
+
+class Command(BaseCommand):
+    help = 'Recria o índice de busca textual das propriedades'
+
+    def handle(self, *args, **options):
+        if search.backend() is None:
+            self.stdout.write(self.style.WARNING('Sem índice de busca neste banco; nada a fazer.'))
+            return
+        search._UNACCENT.clear()
+        total = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} propriedade(s) indexada(s)'))
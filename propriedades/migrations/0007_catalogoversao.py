@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0006_propriedade_area_m2_propriedade_banheiros_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogoVersao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versao', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versão do Catálogo',
+                'verbose_name_plural': 'Versão do Catálogo',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0007_catalogoversao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propriedade',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['criado_em', 'id'], name='prop_ativo_criado_id_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import DatabaseError, migrations, transaction
+
+# SQL congelado nesta migração (não importa propriedades.search, que pode mudar depois)
+TABLE = 'propriedades_busca'
+SQLITE_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    "titulo, descricao, endereco, city, tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_FILL = (
+    f"INSERT INTO {TABLE}(rowid, titulo, descricao, endereco, city) "
+    "SELECT id, titulo, descricao, endereco, city FROM propriedades_propriedade WHERE ativo"
+)
+POSTGRES_CREATE = [
+    f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+    "propriedade_id bigint PRIMARY KEY REFERENCES propriedades_propriedade(id) ON DELETE CASCADE, "
+    "documento tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_documento_gin ON {TABLE} USING GIN (documento)",
+]
+
+
+def _postgres_fill(unaccent):
+    parts = []
+    for column, label in zip(('titulo', 'descricao', 'endereco', 'city'), ('A', 'D', 'C', 'B')):
+        text = f"coalesce({column}, '')"
+        if unaccent:
+            text = f'unaccent({text})'
+        parts.append(f"setweight(to_tsvector('portuguese', {text}), '{label}')")
+    return (
+        f"INSERT INTO {TABLE}(propriedade_id, documento) "
+        f"SELECT id, {' || '.join(parts)} FROM propriedades_propriedade WHERE ativo"
+    )
+
+
+def _criar_unaccent(conn):
+    """Tenta instalar `unaccent` (exige superusuário/dono do banco); sem permissão, a busca segue sem ela."""
+    try:
+        with transaction.atomic(using=conn.alias), conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    except DatabaseError:
+        pass
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'unaccent'")
+        return cur.fetchone() is not None
+
+
+def criar_indice(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == 'sqlite':
+        statements = [SQLITE_CREATE, f"DELETE FROM {TABLE}", SQLITE_FILL]
+    elif conn.vendor == 'postgresql':
+        unaccent = _criar_unaccent(conn)
+        statements = [*POSTGRES_CREATE, f"DELETE FROM {TABLE}", _postgres_fill(unaccent)]
+    else:
+        return  # outros bancos: a listagem usa o filtro icontains
+    with conn.cursor() as cur:
+        for sql in statements:
+            cur.execute(sql)
+
+
+def remover_indice(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor in ('sqlite', 'postgresql'):
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0008_propriedade_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
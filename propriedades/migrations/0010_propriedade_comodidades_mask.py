@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# cópia congelada de propriedades.models.AMENITY_BITS/amenities_mask na data desta migração
+AMENITY_BITS = {
+    code: 1 << i
+    for i, code in enumerate(('wifi', 'piscina', 'tv', 'lavadora', 'ar', 'cozinha', 'estacionamento', 'pet', 'churrasqueira'))
+}
+
+
+def amenities_mask(codes):
+    mask = 0
+    for code in codes or []:
+        mask |= AMENITY_BITS.get(str(code).strip().lower(), 0)
+    return mask
+
+
+def preencher_mask(apps, schema_editor):
+    Propriedade = apps.get_model('propriedades', 'Propriedade')
+    pendentes = []
+    for prop in Propriedade.objects.only('id', 'comodidades').iterator(chunk_size=2000):
+        mask = amenities_mask(prop.comodidades)
+        if mask:
+            prop.comodidades_mask = mask
+            pendentes.append(prop)
+        if len(pendentes) >= 2000:
+            Propriedade.objects.bulk_update(pendentes, ['comodidades_mask'])
+            pendentes = []
+    if pendentes:
+        Propriedade.objects.bulk_update(pendentes, ['comodidades_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0009_busca_textual'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propriedade',
+            name='comodidades_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        # preenche antes de criar o índice, para não atualizá-lo linha a linha
+        migrations.RunPython(preencher_mask, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='propriedade',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['comodidades_mask'], name='prop_ativo_comod_mask_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:45
+
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# cópia congelada de propriedades.models.normalize_city na data desta migração
+def normalize_city(value):
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+
+def preencher_city_norm(apps, schema_editor):
+    Propriedade = apps.get_model('propriedades', 'Propriedade')
+    pendentes = []
+    for prop in Propriedade.objects.only('id', 'city').exclude(city='').iterator(chunk_size=2000):
+        prop.city_norm = normalize_city(prop.city)
+        pendentes.append(prop)
+        if len(pendentes) >= 2000:
+            Propriedade.objects.bulk_update(pendentes, ['city_norm'])
+            pendentes = []
+    if pendentes:
+        Propriedade.objects.bulk_update(pendentes, ['city_norm'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0010_propriedade_comodidades_mask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propriedade',
+            name='city_norm',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        # preenche antes de criar os índices, para não atualizá-los linha a linha
+        migrations.RunPython(preencher_city_norm, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='propriedade',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['city_norm', 'criado_em', 'id'], name='prop_ativo_city_criado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propriedade',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['city_norm', 'preco_por_noite'], name='prop_ativo_city_preco_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propriedade',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['preco_por_noite'], name='prop_ativo_preco_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propriedade',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['quartos', 'area_m2'], name='prop_ativo_quartos_area_idx'),
+        ),
+    ]
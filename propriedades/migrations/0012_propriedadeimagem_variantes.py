@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0011_propriedade_city_norm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propriedadeimagem',
+            name='altura',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='propriedadeimagem',
+            name='largura',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='propriedadeimagem',
+            name='variantes',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='propriedadeimagem',
+            name='variantes_status',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('pronto', 'Pronto'), ('erro', 'Erro')], default='pendente', editable=False, max_length=10),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0012_propriedadeimagem_variantes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagemBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('arquivo', models.CharField(max_length=255)),
+                ('tamanho', models.BigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='propriedadeimagem',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='imagens', to='propriedades.imagemblob'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0014_propriedade_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propriedade',
+            name='versao',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
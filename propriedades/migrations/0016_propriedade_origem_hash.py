@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propriedades', '0015_propriedade_versao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propriedade',
+            name='origem_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
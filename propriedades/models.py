@@ -1,4 +1,7 @@
+import unicodedata
+
 from django.db import models
+from django.db.models.functions import Cast, NullIf
 from django.contrib.auth.models import User
 
 
@@ -15,12 +18,45 @@ AMENITIES_CHOICES = [
     ("churrasqueira", "Churrasqueira"),
 ]
 
+# Bit de cada comodidade padrão em Propriedade.comodidades_mask (a ordem de
+# AMENITIES_CHOICES é estável: novas comodidades entram sempre no fim)
+AMENITY_BITS = {code: 1 << i for i, (code, _label) in enumerate(AMENITIES_CHOICES)}
+
+
+def amenities_mask(codes):
+    """Máscara das comodidades padrão em `codes`; as desconhecidas são ignoradas."""
+    mask = 0
+    for code in codes or []:
+        mask |= AMENITY_BITS.get(str(code).strip().lower(), 0)
+    return mask
+
+
+def normalize_city(value):
+    """Cidade sem acentos, em minúsculas e com espaços colapsados ("  São  Paulo" -> "sao paulo")."""
+    text = unicodedata.normalize("NFKD", str(value or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+# campos lidos pelos recomendadores (pontuação, modelo de preço, índice de semelhantes e o
+# título exibido nos resultados em cache); só mudanças neles incrementam CatalogoVersao
+SCORING_FIELDS = (
+    "titulo", "city", "preco_por_noite", "area_m2", "quartos", "banheiros", "vagas_garagem",
+    "condominio", "iptu", "comodidades", "ativo",
+)
+
+# agregados de avaliação: só mudam por Propriedade.aplicar_avaliacao / backfill_ratings
+RATING_FIELDS = ("rating_sum", "rating_count", "rating_avg", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5")
+
+
 class Propriedade(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="propriedades")
     titulo = models.CharField(max_length=200)
     descricao = models.TextField(blank=True)
     endereco = models.CharField(max_length=300, blank=True)
     city = models.CharField("Cidade", max_length=100, blank=True)
+    # derivado de `city` em save(): permite filtrar cidade por igualdade indexada
+    city_norm = models.CharField(max_length=100, blank=True, default="", editable=False)
     state = models.CharField("Estado", max_length=100, blank=True)
     preco_por_noite = models.DecimalField(max_digits=8, decimal_places=2)
     # Campos extras para enriquecer recomendação / modelo de preço
@@ -33,14 +69,209 @@ class Propriedade(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True)
     ativo = models.BooleanField(default=True)
     comodidades = models.JSONField(default=list, blank=True)
+    # derivado de `comodidades` em save(): um bit por item de AMENITIES_CHOICES
+    comodidades_mask = models.BigIntegerField(default=0, editable=False)
+    # agregados das avaliações, mantidos no banco por aplicar_avaliacao (sem agregar Avaliacao por imóvel)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_count = models.IntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(null=True, blank=True, editable=False)
+    rating_1 = models.IntegerField(default=0, editable=False)
+    rating_2 = models.IntegerField(default=0, editable=False)
+    rating_3 = models.IntegerField(default=0, editable=False)
+    rating_4 = models.IntegerField(default=0, editable=False)
+    rating_5 = models.IntegerField(default=0, editable=False)
+    # impressão digital (SHA-256) do registro de origem em importações; torna a reimportação idempotente
+    origem_hash = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False)
+    # incrementada a cada mudança no imóvel, nas imagens ou nas avaliações; chave dos fragmentos em cache do detalhe
+    versao = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Índices parciais (só imóveis ativos): o Django gera `WHERE "ativo"` para
+        # ativo=True, e o SQLite só usa índice nessa condição se ela for a do índice parcial.
+        indexes = [
+            # paginação por chave da listagem (ver propriedades.pagination)
+            models.Index(fields=["criado_em", "id"], condition=models.Q(ativo=True), name="prop_ativo_criado_id_idx"),
+            # filtro de comodidades avaliado direto no índice, sem ler as linhas
+            models.Index(fields=["comodidades_mask"], condition=models.Q(ativo=True), name="prop_ativo_comod_mask_idx"),
+            # listagem filtrada por cidade já na ordem da paginação; candidatos do recommender por cidade
+            models.Index(fields=["city_norm", "criado_em", "id"], condition=models.Q(ativo=True), name="prop_ativo_city_criado_idx"),
+            # faixa de preço, com e sem cidade (listagem e questionário)
+            models.Index(fields=["city_norm", "preco_por_noite"], condition=models.Q(ativo=True), name="prop_ativo_city_preco_idx"),
+            models.Index(fields=["preco_por_noite"], condition=models.Q(ativo=True), name="prop_ativo_preco_idx"),
+            # mínimos de quartos/área (filtros numéricos mais seletivos da listagem)
+            models.Index(fields=["quartos", "area_m2"], condition=models.Q(ativo=True), name="prop_ativo_quartos_area_idx"),
+            # nota mínima da listagem
+            models.Index(fields=["rating_avg"], condition=models.Q(ativo=True), name="prop_ativo_rating_idx"),
+        ]
 
     def __str__(self):
         return f"{self.titulo} - {self.owner.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._scoring_inicial = instance._scoring_values()
+        return instance
+
+    def _scoring_values(self):
+        # campos adiados (only/defer) ficam de fora: não foram carregados, então não mudaram aqui
+        deferred = self.get_deferred_fields()
+        return {f: getattr(self, f) for f in SCORING_FIELDS if f not in deferred}
+
+    def save(self, *args, **kwargs):
+        # instância nova (ou sem o estado carregado do banco) sempre conta como mudança do catálogo
+        inicial = getattr(self, "_scoring_inicial", None)
+        self.catalogo_mudou = self._state.adding or inicial is None or self._scoring_values() != inicial
+        self.comodidades_mask = amenities_mask(self.comodidades)
+        self.city_norm = normalize_city(self.city)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            derived = {"comodidades": "comodidades_mask", "city": "city_norm"}
+            kwargs["update_fields"] = set(update_fields) | {d for f, d in derived.items() if f in update_fields}
+        elif not self._state.adding and self.pk is not None and not kwargs.get("force_insert"):
+            # uma instância carregada antes de uma avaliação não pode sobrescrever os agregados
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name not in RATING_FIELDS
+            ]
+        atualizando = kwargs.get("update_fields") is not None
+        if atualizando:
+            self.versao = models.F("versao") + 1
+            kwargs["update_fields"] = set(kwargs["update_fields"]) | {"versao"}
+        super().save(*args, **kwargs)
+        self._scoring_inicial = self._scoring_values()
+        if atualizando:
+            self.refresh_from_db(fields=["versao"])
+
+    @classmethod
+    def incrementar_versao(cls, pk):
+        cls.objects.filter(pk=pk).update(versao=models.F("versao") + 1)
+
+    @classmethod
+    def aplicar_avaliacao(cls, pk, nota, delta=1):
+        """Soma (delta=1) ou retira (delta=-1) uma nota de 1 a 5 dos agregados, atomicamente no banco."""
+        nota = int(nota)
+        if not 1 <= nota <= 5:
+            raise ValueError(f"nota fora de 1-5: {nota}")
+        soma = models.F("rating_sum") + delta * nota
+        total = models.F("rating_count") + delta
+        cls.objects.filter(pk=pk).update(
+            rating_sum=soma,
+            rating_count=total,
+            rating_avg=Cast(soma, models.FloatField()) / NullIf(total, 0),
+            versao=models.F("versao") + 1,
+            **{f"rating_{nota}": models.F(f"rating_{nota}") + delta},
+        )
+
+    @property
+    def rating_histogram(self):
+        """[(nota, quantidade, % do total)] de 5 a 1, para as barras da página de detalhe."""
+        total = self.rating_count or 0
+        return [
+            (n, getattr(self, f"rating_{n}"), round(100 * getattr(self, f"rating_{n}") / total) if total else 0)
+            for n in range(5, 0, -1)
+        ]
+
+class ImagemBlob(models.Model):
+    """Conteúdo de imagem guardado uma única vez, endereçado pelo SHA-256 (ver propriedades.blobs)."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    arquivo = models.CharField(max_length=255)  # nome no storage
+    tamanho = models.BigIntegerField(default=0)
+    # quantas PropriedadeImagem apontam para este conteúdo; em zero o blob é coletado
+    refcount = models.IntegerField(default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.refcount} ref.)"
+
+
 class PropriedadeImagem(models.Model):
+    STATUS_PENDENTE = "pendente"
+    STATUS_PRONTO = "pronto"
+    STATUS_ERRO = "erro"
+    STATUS_CHOICES = [(STATUS_PENDENTE, "Pendente"), (STATUS_PRONTO, "Pronto"), (STATUS_ERRO, "Erro")]
+
     propriedade = models.ForeignKey(Propriedade, on_delete=models.CASCADE, related_name="imagens")
     imagem = models.ImageField(upload_to="propriedades/")
     legenda = models.CharField(max_length=200, blank=True)
+    # conteúdo compartilhado; `imagem` aponta para o arquivo do blob (nulo só em imagens antigas)
+    blob = models.ForeignKey(
+        ImagemBlob, null=True, blank=True, on_delete=models.PROTECT, related_name="imagens", editable=False,
+    )
+    # preenchidos em segundo plano por propriedades.images.build_renditions
+    largura = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    altura = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # [{"nome", "formato" (webp|jpeg), "largura", "altura", "bytes"}], da menor para a maior
+    variantes = models.JSONField(default=list, blank=True, editable=False)
+    variantes_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDENTE, editable=False)
 
     def __str__(self):
         return f"Imagem {self.propriedade} ({self.legenda})"
+
+    def save(self, *args, **kwargs):
+        # arquivo recém-enviado: vai para o blob do seu conteúdo (gravado só se ainda não existir)
+        if self.imagem and not self.imagem._committed:
+            from django.db import transaction
+
+            from .blobs import release, store
+
+            with transaction.atomic():
+                anterior = self.blob_id
+                self.blob = store(self.imagem.file, self.imagem.storage)
+                self.imagem = self.blob.arquivo
+                if anterior:
+                    release(anterior)
+                if kwargs.get("update_fields") is not None:
+                    kwargs["update_fields"] = set(kwargs["update_fields"]) | {"blob"}
+                super().save(*args, **kwargs)
+            return
+        super().save(*args, **kwargs)
+
+    def _srcset(self, formato):
+        storage = self.imagem.storage
+        return ", ".join(
+            f"{storage.url(v['nome'])} {v['largura']}w" for v in self.variantes if v.get("formato") == formato
+        )
+
+    @property
+    def srcset_webp(self):
+        return self._srcset("webp")
+
+    @property
+    def srcset_jpeg(self):
+        return self._srcset("jpeg")
+
+    @property
+    def thumb_url(self):
+        """Menor variante JPEG (ou o original enquanto as variantes não ficam prontas)."""
+        for v in self.variantes:
+            if v.get("formato") == "jpeg":
+                return self.imagem.storage.url(v["nome"])
+        return self.imagem.url
+
+
+class CatalogoVersao(models.Model):
+    """Contador global do catálogo (linha única), incrementado quando muda algum campo de
+    SCORING_FIELDS de uma Propriedade (ou ela é criada/excluída), e uma vez por importação.
+
+    Usado para invalidar caches e recomendações persistidas de forma consistente
+    entre processos (web, worker, comandos).
+    """
+    versao = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Versão do Catálogo'
+        verbose_name_plural = 'Versão do Catálogo'
+
+    def __str__(self):
+        return f"Catálogo v{self.versao}"
+
+    @classmethod
+    def atual(cls) -> int:
+        return cls.objects.filter(pk=1).values_list('versao', flat=True).first() or 0
+
+    @classmethod
+    def incrementar(cls) -> None:
+        if not cls.objects.filter(pk=1).update(versao=models.F('versao') + 1):
+            obj, created = cls.objects.get_or_create(pk=1, defaults={'versao': 1})
+            if not created:
+                cls.objects.filter(pk=1).update(versao=models.F('versao') + 1)
@@ -0,0 +1,115 @@
+"""Paginação por chave (keyset) da listagem de propriedades.
+
+A ordem é estável por (criado_em, id), mais recentes primeiro. Cada página
+busca no máximo `page_size + 1` linhas a partir da chave da borda da página
+anterior, então o custo não cresce com a posição no catálogo. O cursor é
+opaco para o cliente: carrega a chave da borda e a direção.
+
+Resultados da busca textual já vêm ranqueados e limitados; para eles
+`ranked_page` pagina por offset sobre a lista de ids.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+
+NEXT = 'n'
+PREV = 'p'
+RANKED = 'r'
+
+
+def page_size(value: Optional[str] = None) -> int:
+    default = int(getattr(settings, 'PROPRIEDADES_PAGE_SIZE', 24))
+    try:
+        size = int(value) if value else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, int(getattr(settings, 'PROPRIEDADES_PAGE_SIZE_MAX', 100))))
+
+
+def encode_cursor(obj, direction: str) -> str:
+    raw = json.dumps({'t': obj.criado_em.isoformat(), 'i': obj.pk, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int, str]]:
+    """(criado_em, id, direção) do cursor; None se ausente ou inválido."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        direction = data['d']
+        if direction not in (NEXT, PREV):
+            return None
+        return datetime.fromisoformat(data['t']), int(data['i']), direction
+    except Exception:
+        return None
+
+
+def keyset_page(qs, cursor: Optional[str], size: int) -> Dict[str, Any]:
+    """Uma página de `qs` a partir do cursor: {'items', 'next_cursor', 'prev_cursor'}."""
+    key = decode_cursor(cursor)
+    if key is None:
+        rows = list(qs.order_by('-criado_em', '-id')[:size + 1])
+        has_next, has_prev = len(rows) > size, False
+        items = rows[:size]
+    else:
+        created, pk, direction = key
+        if direction == NEXT:
+            after = Q(criado_em__lt=created) | Q(criado_em=created, id__lt=pk)
+            rows = list(qs.filter(after).order_by('-criado_em', '-id')[:size + 1])
+            has_next, has_prev = len(rows) > size, True
+            items = rows[:size]
+        else:
+            before = Q(criado_em__gt=created) | Q(criado_em=created, id__gt=pk)
+            rows = list(qs.filter(before).order_by('criado_em', 'id')[:size + 1])
+            if len(rows) <= size:
+                # voltou até o início: mostra a primeira página completa
+                return keyset_page(qs, None, size)
+            has_next, has_prev = True, True
+            items: List = rows[:size][::-1]
+    return {
+        'items': items,
+        'next_cursor': encode_cursor(items[-1], NEXT) if items and has_next else None,
+        'prev_cursor': encode_cursor(items[0], PREV) if items and has_prev else None,
+    }
+
+
+def _encode_offset(offset: int) -> str:
+    raw = json.dumps({'o': offset, 'd': RANKED}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_offset(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return max(0, int(data['o'])) if data.get('d') == RANKED else 0
+    except Exception:
+        return 0
+
+
+def ranked_page(qs, ranked_ids: List[int], cursor: Optional[str], size: int) -> Dict[str, Any]:
+    """Página de resultados já ranqueados (ex.: busca textual), na ordem de `ranked_ids`.
+
+    `ranked_ids` é limitado (PROPRIEDADES_SEARCH_MAX_RESULTS), então o cursor é um offset
+    sobre os ids que também passam pelos filtros de `qs`.
+    """
+    allowed = set(qs.filter(id__in=ranked_ids).values_list('id', flat=True)) if ranked_ids else set()
+    ids = [pk for pk in ranked_ids if pk in allowed]
+    offset = min(_decode_offset(cursor), len(ids))
+    page_ids = ids[offset:offset + size]
+    by_id = qs.in_bulk(page_ids)
+    items = [by_id[pk] for pk in page_ids if pk in by_id]
+    end = offset + len(page_ids)
+    return {
+        'items': items,
+        'next_cursor': _encode_offset(end) if end < len(ids) else None,
+        'prev_cursor': _encode_offset(max(0, offset - size)) if offset > 0 else None,
+    }
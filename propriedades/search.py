@@ -0,0 +1,207 @@
+"""Busca textual da listagem (parâmetro `q`).
+
+O índice é uma tabela auxiliar criada pela migração 0009 conforme o banco:
+
+- SQLite: tabela virtual FTS5 `propriedades_busca` (tokenizer `unicode61
+  remove_diacritics 2`, sem acento e sem caixa), ranqueada por bm25;
+- PostgreSQL: tabela `propriedades_busca` com `tsvector` (configuração
+  `portuguese`) e índice GIN, ranqueada por `ts_rank`. Com a extensão
+  `unaccent` instalada a busca também ignora acentos; a migração tenta
+  criá-la, mas isso exige superusuário ou dono do banco. Sem permissão, um
+  administrador roda `CREATE EXTENSION unaccent` e depois
+  `python manage.py rebuild_search_index`.
+
+O conteúdo é mantido pelos signals de `Propriedade` (ver `propriedades.signals`).
+Em outros bancos, ou se a tabela não existir, `search_ids` devolve None e a
+listagem cai no filtro `icontains`.
+"""
+import logging
+import re
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'propriedades_busca'
+# pesos de titulo, descricao, endereco e city no ranking (maior = mais relevante)
+WEIGHTS = (10.0, 1.0, 2.0, 3.0)
+
+COLUMNS = ('titulo', 'descricao', 'endereco', 'city')
+# pesos A-D do tsvector seguem a ordem de WEIGHTS
+POSTGRES_LABELS = ('A', 'D', 'C', 'B')
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+# aliases de banco em que o índice já foi encontrado (a tabela só some num rollback da migração)
+_AVAILABLE = set()
+# PostgreSQL: se a extensão unaccent está instalada, por alias de banco
+_UNACCENT = {}
+
+
+def backend(conn=None) -> Optional[str]:
+    """'sqlite' ou 'postgresql' se o índice existir neste banco; senão None."""
+    conn = conn or connection
+    if conn.vendor not in ('sqlite', 'postgresql'):
+        return None
+    key = (conn.alias, conn.settings_dict.get('NAME'))
+    if key not in _AVAILABLE:
+        try:
+            if TABLE not in conn.introspection.table_names():
+                return None
+        except Exception:
+            return None
+        _AVAILABLE.add(key)
+    return conn.vendor
+
+
+def has_unaccent(conn=None) -> bool:
+    conn = conn or connection
+    key = (conn.alias, conn.settings_dict.get('NAME'))
+    if key not in _UNACCENT:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'unaccent'")
+            _UNACCENT[key] = cur.fetchone() is not None
+    return _UNACCENT[key]
+
+
+def _unaccent(expr: str, conn=None) -> str:
+    return f'unaccent({expr})' if has_unaccent(conn) else expr
+
+
+def postgres_document(columns, conn=None) -> str:
+    """Expressão tsvector ponderada para `columns` (nomes de coluna ou placeholders %s)."""
+    parts = []
+    for column, label in zip(columns, POSTGRES_LABELS):
+        text = _unaccent(f"coalesce({column}, '')", conn)
+        parts.append(f"setweight(to_tsvector('portuguese', {text}), '{label}')")
+    return ' || '.join(parts)
+
+
+def _terms(q: str) -> List[str]:
+    return _TERM.findall(q or '')[:16]
+
+
+def _row(prop):
+    return [prop.titulo or '', prop.descricao or '', prop.endereco or '', prop.city or '']
+
+
+def index_propriedade(prop) -> None:
+    """Insere ou atualiza a propriedade no índice (propriedades inativas saem dele)."""
+    kind = backend()
+    if kind is None:
+        return
+    if not prop.ativo:
+        remove_propriedade(prop.pk)
+        return
+    with connection.cursor() as cur:
+        if kind == 'sqlite':
+            cur.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [prop.pk])
+            cur.execute(
+                f"INSERT INTO {TABLE}(rowid, titulo, descricao, endereco, city) VALUES (%s, %s, %s, %s, %s)",
+                [prop.pk, *_row(prop)],
+            )
+        else:
+            cur.execute(
+                f"INSERT INTO {TABLE}(propriedade_id, documento) VALUES (%s, {postgres_document(['%s'] * 4)}) "
+                "ON CONFLICT (propriedade_id) DO UPDATE SET documento = EXCLUDED.documento",
+                [prop.pk, *_row(prop)],
+            )
+
+
+def index_many(pks) -> int:
+    """Indexa de uma vez as propriedades ativas de `pks` (novas: ex. importação com bulk_create)."""
+    kind = backend()
+    pks = list(pks)
+    if kind is None or not pks:
+        return 0
+    marks = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cur:
+        if kind == 'sqlite':
+            cur.execute(
+                f"INSERT INTO {TABLE}(rowid, titulo, descricao, endereco, city) "
+                f"SELECT id, titulo, descricao, endereco, city FROM propriedades_propriedade WHERE ativo AND id IN ({marks})",
+                pks,
+            )
+        else:
+            cur.execute(
+                f"INSERT INTO {TABLE}(propriedade_id, documento) "
+                f"SELECT id, {postgres_document(COLUMNS)} "
+                f"FROM propriedades_propriedade WHERE ativo AND id IN ({marks}) "
+                "ON CONFLICT (propriedade_id) DO UPDATE SET documento = EXCLUDED.documento",
+                pks,
+            )
+        return cur.rowcount
+
+
+def remove_propriedade(pk) -> None:
+    kind = backend()
+    if kind is None:
+        return
+    with connection.cursor() as cur:
+        if kind == 'sqlite':
+            cur.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [pk])
+        else:
+            cur.execute(f"DELETE FROM {TABLE} WHERE propriedade_id = %s", [pk])
+
+
+def rebuild(conn=None) -> int:
+    """Recria o conteúdo do índice a partir das propriedades ativas; retorna quantas foram indexadas."""
+    conn = conn or connection
+    kind = backend(conn)
+    if kind is None:
+        return 0
+    with conn.cursor() as cur:
+        if kind == 'sqlite':
+            cur.execute(f"DELETE FROM {TABLE}")
+            cur.execute(
+                f"INSERT INTO {TABLE}(rowid, titulo, descricao, endereco, city) "
+                "SELECT id, titulo, descricao, endereco, city FROM propriedades_propriedade WHERE ativo"
+            )
+        else:
+            cur.execute(f"DELETE FROM {TABLE}")
+            cur.execute(
+                f"INSERT INTO {TABLE}(propriedade_id, documento) "
+                f"SELECT id, {postgres_document(COLUMNS, conn)} "
+                "FROM propriedades_propriedade WHERE ativo"
+            )
+        return cur.rowcount
+
+
+def search_ids(q: str, limit: Optional[int] = None) -> Optional[List[int]]:
+    """Ids das propriedades que casam com `q`, do mais ao menos relevante.
+
+    Cada termo vale como prefixo e todos precisam aparecer (AND). Retorna None
+    quando não há índice, para o chamador usar o filtro simples.
+    """
+    kind = backend()
+    if kind is None:
+        return None
+    terms = _terms(q)
+    if not terms:
+        return []
+    limit = limit or int(getattr(settings, 'PROPRIEDADES_SEARCH_MAX_RESULTS', 1000))
+    try:
+        with connection.cursor() as cur:
+            if kind == 'sqlite':
+                match = ' AND '.join('"%s"*' % t for t in terms)
+                cur.execute(
+                    f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s "
+                    f"ORDER BY bm25({TABLE}, {', '.join(str(w) for w in WEIGHTS)}), rowid LIMIT %s",
+                    [match, limit],
+                )
+            else:
+                tsquery = ' & '.join(f'{t}:*' for t in terms)
+                cur.execute(
+                    f"SELECT propriedade_id FROM {TABLE}, "
+                    f"to_tsquery('portuguese', {_unaccent('%s')}) AS consulta "
+                    "WHERE documento @@ consulta "
+                    "ORDER BY ts_rank(documento, consulta, 1) DESC, propriedade_id LIMIT %s",
+                    [tsquery, limit],
+                )
+            return [row[0] for row in cur.fetchall()]
+    except Exception:
+        logger.exception("Falha na busca textual; usando filtro simples")
+        return None
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import blobs, images, search
+from .models import Propriedade, PropriedadeImagem
+
+
+@receiver(post_save, sender=Propriedade)
+def indexar_propriedade(sender, instance, **kwargs):
+    """Mantém o índice de busca textual em dia com título, descrição, endereço e cidade."""
+    search.index_propriedade(instance)
+
+
+@receiver(post_delete, sender=Propriedade)
+def desindexar_propriedade(sender, instance, **kwargs):
+    search.remove_propriedade(instance.pk)
+
+
+@receiver(post_save, sender=PropriedadeImagem)
+def agendar_variantes(sender, instance, created, **kwargs):
+    """Novas imagens ganham variantes redimensionadas em segundo plano (ver propriedades.images)."""
+    Propriedade.incrementar_versao(instance.propriedade_id)
+    if created and instance.imagem:
+        images.schedule_renditions(instance.pk)
+
+
+@receiver(post_delete, sender=PropriedadeImagem)
+def remover_variantes(sender, instance, **kwargs):
+    Propriedade.incrementar_versao(instance.propriedade_id)
+    if instance.blob_id:
+        # arquivo e variantes são do blob, compartilhado: saem quando ninguém mais o referenciar
+        blobs.release(instance.blob_id)
+    elif instance.variantes:
+        variantes, storage = instance.variantes, instance.imagem.storage
+        transaction.on_commit(lambda: images.delete_renditions(variantes, storage))
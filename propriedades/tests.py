@@ -66,3 +66,520 @@ class PropriedadesFormTests(TestCase):
         resp = self.client.get(reverse("propriedades:excluir", args=[p.pk]))
         self.assertEqual(resp.status_code, 200)
         self.assertTemplateUsed(resp, "propriedades/confirm_delete.html")
+
+
+class ListaPaginacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="pager", password="pass")
+        cls.props = [
+            Propriedade.objects.create(owner=cls.owner, titulo=f"Casa {i}", preco_por_noite="100.00")
+            for i in range(5)
+        ]
+        # mesmo criado_em para todas: o desempate por id precisa manter a ordem estável
+        Propriedade.objects.update(criado_em=cls.props[0].criado_em)
+
+    def _ids(self, resp):
+        return [p.pk for p in resp.context["propriedades"]]
+
+    def test_next_and_prev_cursors_walk_the_listing(self):
+        expected = [p.pk for p in reversed(self.props)]
+        first = self.client.get(reverse("propriedades:lista"), {"page_size": 2})
+        self.assertEqual(self._ids(first), expected[:2])
+        self.assertIsNone(first.context["prev_url"])
+
+        second = self.client.get(reverse("propriedades:lista") + first.context["next_url"])
+        self.assertEqual(self._ids(second), expected[2:4])
+        third = self.client.get(reverse("propriedades:lista") + second.context["next_url"])
+        self.assertEqual(self._ids(third), expected[4:])
+        self.assertIsNone(third.context["next_url"])
+
+        back = self.client.get(reverse("propriedades:lista") + third.context["prev_url"])
+        self.assertEqual(self._ids(back), expected[2:4])
+        self.assertIn("page_size=2", third.context["prev_url"])
+
+    def test_favorite_flags_only_for_visible_page(self):
+        from favoritos.models import Favorito
+
+        user = User.objects.create_user(username="pager_fav", password="pass")
+        Favorito.objects.create(user=user, propriedade=self.props[-1])
+        self.client.force_login(user)
+        resp = self.client.get(reverse("propriedades:lista"), {"page_size": 2, "cursor": "lixo"})
+        flags = {p.pk: p.is_favorito for p in resp.context["propriedades"]}
+        self.assertEqual(flags, {self.props[-1].pk: True, self.props[-2].pk: False})
+
+
+class BuscaTextualTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="busca", password="pass")
+        cls.centro = Propriedade.objects.create(
+            owner=cls.owner, titulo="Apartamento no Centro", descricao="Perto do metrô",
+            city="São Paulo", preco_por_noite="100.00",
+        )
+        cls.praia = Propriedade.objects.create(
+            owner=cls.owner, titulo="Casa de praia", descricao="Vista para o mar, a 2h de Sao Paulo",
+            city="Ubatuba", preco_por_noite="300.00",
+        )
+
+    def _ids(self, q):
+        resp = self.client.get(reverse("propriedades:lista"), {"q": q})
+        return [p.pk for p in resp.context["propriedades"]]
+
+    def test_search_ignores_accents_and_matches_other_fields_ranked(self):
+        from propriedades.search import backend
+
+        self.assertEqual(backend(), "sqlite")
+        # cidade pesa mais que descrição
+        self.assertEqual(self._ids("sao paulo"), [self.centro.pk, self.praia.pk])
+        self.assertEqual(self._ids("METRÔ"), [self.centro.pk])
+        self.assertEqual(self._ids("prai"), [self.praia.pk])
+
+    def test_index_follows_save_and_delete(self):
+        self.praia.titulo = "Chalé na serra"
+        self.praia.save()
+        self.assertEqual(self._ids("praia"), [])
+        self.assertEqual(self._ids("chale"), [self.praia.pk])
+        self.praia.delete()
+        self.assertEqual(self._ids("chale"), [])
+
+    def test_rebuild_command_reindexes_active_properties(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.db import connection
+
+        with connection.cursor() as cur:
+            cur.execute("DELETE FROM propriedades_busca")
+        self.assertEqual(self._ids("praia"), [])
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("2 propriedade(s)", out.getvalue())
+        self.assertEqual(self._ids("praia"), [self.praia.pk])
+
+
+class ComodidadesMaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="mask", password="pass")
+        cls.wifi_tv = Propriedade.objects.create(owner=cls.owner, titulo="Wifi e TV", preco_por_noite="100.00", comodidades=["wifi", "TV"])
+        cls.wifi = Propriedade.objects.create(owner=cls.owner, titulo="Só wifi", preco_por_noite="100.00", comodidades=["wifi"])
+        cls.sauna = Propriedade.objects.create(owner=cls.owner, titulo="Sauna", preco_por_noite="100.00", comodidades=["sauna", "saunas"])
+
+    def _ids(self, amenities):
+        resp = self.client.get(reverse("propriedades:lista"), {"amenities": amenities})
+        return {p.pk for p in resp.context["propriedades"]}
+
+    def test_mask_follows_comodidades_on_save(self):
+        from propriedades.models import AMENITY_BITS
+
+        self.assertEqual(self.wifi_tv.comodidades_mask, AMENITY_BITS["wifi"] | AMENITY_BITS["tv"])
+        self.wifi.comodidades = ["piscina"]
+        self.wifi.save(update_fields=["comodidades"])
+        self.wifi.refresh_from_db()
+        self.assertEqual(self.wifi.comodidades_mask, AMENITY_BITS["piscina"])
+
+    def test_form_save_sets_mask(self):
+        form = PropriedadeForm(data={"titulo": "Casa com pet", "preco_por_noite": "90.00", "comodidades": ["pet", "ar"]})
+        self.assertTrue(form.is_valid())
+        prop = form.save(commit=False)
+        prop.owner = self.owner
+        prop.save()
+        self.assertEqual(self._ids(["pet", "ar"]), {prop.pk})
+
+    def test_filter_requires_every_amenity(self):
+        self.assertEqual(self._ids(["wifi"]), {self.wifi_tv.pk, self.wifi.pk})
+        self.assertEqual(self._ids(["wifi", "tv"]), {self.wifi_tv.pk})
+        self.assertEqual(self._ids(["sauna"]), {self.sauna.pk})
+        self.assertEqual(self._ids(["saun"]), set())
+
+
+class CidadeNormalizadaTests(TestCase):
+    def test_city_filter_ignores_case_accents_and_spaces(self):
+        from propriedades.models import normalize_city
+
+        owner = User.objects.create_user(username="cidade", password="pass")
+        sp = Propriedade.objects.create(owner=owner, titulo="Em SP", city="São  Paulo", preco_por_noite="100.00")
+        Propriedade.objects.create(owner=owner, titulo="Em Santos", city="Santos", preco_por_noite="100.00")
+        self.assertEqual(sp.city_norm, normalize_city(" sao paulo "))
+        resp = self.client.get(reverse("propriedades:lista"), {"city": "SAO PAULO"})
+        self.assertEqual([p.pk for p in resp.context["propriedades"]], [sp.pk])
+
+
+class FacetasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username="facetas", password="pass")
+
+        def criar(city, quartos, preco, comodidades):
+            return Propriedade.objects.create(
+                owner=owner, titulo="Imóvel", city=city, quartos=quartos,
+                preco_por_noite=preco, comodidades=comodidades,
+            )
+
+        criar("São Paulo", 1, "90.00", ["wifi"])
+        criar("sao paulo", 2, "150.00", ["wifi", "tv"])
+        criar("Santos", 3, "450.00", ["piscina"])
+        criar("Santos", 4, "900.00", ["wifi", "piscina"])
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def _facetas(self, params):
+        resp = self.client.get(reverse("propriedades:facetas"), params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()["facets"]
+
+    def test_counts_in_a_single_query_and_each_facet_ignores_its_own_filter(self):
+        from propriedades.facets import compute_facets
+        from propriedades.filters import parse_filters
+
+        with self.assertNumQueries(1):
+            facetas = compute_facets(parse_filters({"city": "SAO PAULO", "bedrooms": "2"}))
+        self.assertEqual(facetas["total"], 1)
+        # cidades respeitam quartos >= 2, mas não a cidade escolhida
+        self.assertEqual(
+            [(c["value"], c["count"]) for c in facetas["cities"]], [("santos", 2), ("sao paulo", 1)]
+        )
+        # quartos respeitam a cidade, mas não o mínimo de quartos
+        self.assertEqual([b["count"] for b in facetas["bedrooms"]], [2, 1, 0, 0])
+        self.assertEqual([b["count"] for b in facetas["price"]], [0, 1, 0, 0, 0])
+        amen = {a["value"]: a["count"] for a in facetas["amenities"]}
+        self.assertEqual((amen["wifi"], amen["tv"], amen["piscina"]), (1, 1, 0))
+
+    def test_amenity_counts_add_to_selected_amenities(self):
+        facetas = self._facetas({"amenities": ["wifi"]})
+        amen = {a["value"]: a["count"] for a in facetas["amenities"]}
+        self.assertEqual(facetas["total"], 3)
+        self.assertEqual((amen["wifi"], amen["tv"], amen["piscina"]), (3, 1, 1))
+
+    def test_cached_until_catalogue_changes(self):
+        self._facetas({})
+        with self.assertNumQueries(0):
+            self.assertEqual(self._facetas({})["total"], 4)
+        Propriedade.objects.filter(city="Santos").first().delete()
+        self.assertEqual(self._facetas({})["total"], 3)
+
+    def test_listing_shows_counts_and_links(self):
+        resp = self.client.get(reverse("propriedades:lista"), {"city": "santos"})
+        facetas = resp.context["facetas"]
+        self.assertEqual(facetas["total"], 2)
+        santos = next(c for c in facetas["cities"] if c["value"] == "santos")
+        self.assertTrue(santos["active"])
+        self.assertContains(resp, "Santos (2)")
+
+    def test_price_on_bucket_boundary_counted_where_its_link_shows_it(self):
+        Propriedade.objects.create(
+            owner=User.objects.get(username="facetas"), titulo="Imóvel", city="Santos", preco_por_noite="200.00",
+        )
+        lista = reverse("propriedades:lista")
+        resp = self.client.get(lista)
+        for bucket in resp.context["facetas"]["price"]:
+            listed = self.client.get(lista + bucket["url"]).context["facetas"]["total"]
+            self.assertEqual(bucket["count"], listed, bucket["label"])
+        counts = {b["label"]: b["count"] for b in resp.context["facetas"]["price"]}
+        self.assertEqual(counts["R$ 100 a 199,99"], 1)
+        self.assertEqual(counts["R$ 200 a 399,99"], 1)
+
+
+class ImagemTestMixin:
+    """MEDIA_ROOT temporário e variantes geradas no próprio on_commit."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        from django.test import override_settings
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media, PROPRIEDADES_IMAGE_ASYNC=False)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username="fotos", password="pass")
+        self.prop = Propriedade.objects.create(owner=self.owner, titulo="Com fotos", preco_por_noite="100.00")
+
+    def _upload(self, size, mode="RGBA", name="foto.png"):
+        from io import BytesIO
+
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        buf = BytesIO()
+        Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(buf, "PNG")
+        return SimpleUploadedFile(name, buf.getvalue(), content_type="image/png")
+
+
+class VariantesImagemTests(ImagemTestMixin, TestCase):
+
+    def _criar(self, size):
+        from propriedades.models import PropriedadeImagem
+
+        with self.captureOnCommitCallbacks(execute=True):
+            img = PropriedadeImagem.objects.create(propriedade=self.prop, imagem=self._upload(size))
+        img.refresh_from_db()
+        return img
+
+    def test_upload_generates_webp_and_jpeg_renditions_without_upscaling(self):
+        img = self._criar((1000, 500))
+        self.assertEqual(img.variantes_status, "pronto")
+        self.assertEqual((img.largura, img.altura), (1000, 500))
+        self.assertEqual(
+            [(v["formato"], v["largura"], v["altura"]) for v in img.variantes],
+            [("webp", 320, 160), ("jpeg", 320, 160), ("webp", 640, 320), ("jpeg", 640, 320),
+             ("webp", 1000, 500), ("jpeg", 1000, 500)],
+        )
+        storage = img.imagem.storage
+        self.assertTrue(all(storage.exists(v["nome"]) for v in img.variantes))
+        self.assertIn(".w320.webp 320w", img.srcset_webp)
+        self.assertTrue(img.thumb_url.endswith(".w320.jpg"))
+
+        resp = self.client.get(reverse("propriedades:detalhe", args=[self.prop.pk]))
+        self.assertContains(resp, 'type="image/webp"')
+        resp = self.client.get(reverse("propriedades:lista"))
+        self.assertContains(resp, img.thumb_url)
+
+    def test_delete_removes_renditions(self):
+        img = self._criar((400, 300))
+        nomes, storage = [v["nome"] for v in img.variantes], img.imagem.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            img.delete()
+        self.assertFalse(any(storage.exists(n) for n in nomes))
+
+    def test_backfill_command_processes_pending_images(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from propriedades.models import PropriedadeImagem
+
+        # sem executar o on_commit: a imagem fica pendente, como as anteriores ao pipeline
+        img = PropriedadeImagem.objects.create(propriedade=self.prop, imagem=self._upload((800, 600), mode="RGB"))
+        self.assertEqual(img.variantes_status, "pendente")
+        call_command("build_image_renditions", stdout=StringIO())
+        img.refresh_from_db()
+        self.assertEqual(img.variantes_status, "pronto")
+        self.assertEqual(sorted({v["largura"] for v in img.variantes}), [320, 640, 800])
+
+
+class ImagemBlobTests(ImagemTestMixin, TestCase):
+    def _criar(self, prop, upload):
+        from propriedades.models import PropriedadeImagem
+
+        with self.captureOnCommitCallbacks(execute=True):
+            img = PropriedadeImagem.objects.create(propriedade=prop, imagem=upload)
+        img.refresh_from_db()
+        return img
+
+    def test_same_content_is_stored_once_and_collected_after_last_reference(self):
+        from propriedades.models import ImagemBlob
+
+        outra = Propriedade.objects.create(owner=self.owner, titulo="Outra", preco_por_noite="80.00")
+        a = self._criar(self.prop, self._upload((500, 400), name="a.png"))
+        b = self._criar(outra, self._upload((500, 400), name="b.png"))
+        blob = ImagemBlob.objects.get()
+        self.assertEqual((a.blob_id, b.blob_id, blob.refcount), (blob.pk, blob.pk, 2))
+        self.assertEqual(a.imagem.name, b.imagem.name)
+        self.assertIn(blob.sha256, a.imagem.name)
+        # a segunda imagem reaproveita as variantes do blob
+        self.assertEqual(b.variantes, a.variantes)
+
+        storage = a.imagem.storage
+        arquivos = [a.imagem.name] + [v["nome"] for v in a.variantes]
+        with self.captureOnCommitCallbacks(execute=True):
+            a.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        self.assertTrue(all(storage.exists(n) for n in arquivos))
+        with self.captureOnCommitCallbacks(execute=True):
+            outra.delete()
+        self.assertFalse(ImagemBlob.objects.exists())
+        self.assertFalse(any(storage.exists(n) for n in arquivos))
+
+    def test_upload_is_hashed_while_streaming(self):
+        import hashlib
+        from unittest import mock
+
+        from propriedades.models import ImagemBlob
+
+        self.client.login(username="fotos", password="pass")
+        upload = self._upload((300, 200))
+        conteudo = upload.read()
+        upload.seek(0)
+        # sem releitura: o hash tem que vir pronto do upload handler
+        with mock.patch("propriedades.blobs.content_sha256", side_effect=lambda f: f.sha256), \
+                self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(reverse("propriedades:nova"), {
+                "titulo": "Casa nova", "preco_por_noite": "120.00", "imagens": [upload],
+            })
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(ImagemBlob.objects.get().sha256, hashlib.sha256(conteudo).hexdigest())
+
+    def test_blob_urls_are_served_as_immutable(self):
+        from django.test import RequestFactory
+
+        from propriedades.blobs import BLOB_DIR
+        from propriedades.views import imagem_blob
+
+        img = self._criar(self.prop, self._upload((100, 100)))
+        path = img.imagem.name[len(BLOB_DIR) + 1:]
+        resp = imagem_blob(RequestFactory().get("/"), path)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("immutable", resp["Cache-Control"])
+
+    def test_gc_command_adopts_legacy_images(self):
+        from io import StringIO
+
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+
+        from propriedades.models import ImagemBlob, PropriedadeImagem
+
+        atual = self._criar(self.prop, self._upload((200, 200)))
+        # imagem antiga com o mesmo conteúdo, gravada fora do pipeline de blobs
+        antigo = default_storage.save("propriedades/antiga.png", ContentFile(self._upload((200, 200)).read()))
+        PropriedadeImagem.objects.bulk_create([PropriedadeImagem(propriedade=self.prop, imagem=antigo)])
+        call_command("gc_image_blobs", "--adopt", stdout=StringIO())
+        legado = PropriedadeImagem.objects.exclude(pk=atual.pk).get()
+        self.assertEqual(legado.blob_id, atual.blob_id)
+        self.assertEqual(ImagemBlob.objects.get().refcount, 2)
+        self.assertFalse(default_storage.exists(antigo))
+        self.assertEqual(legado.variantes_status, "pronto")
+
+
+class DetalheConsultasTests(ImagemTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+
+        from avaliacoes.models import Avaliacao
+        from propriedades.models import PropriedadeImagem
+
+        cache.clear()
+        autores = [User.objects.create_user(username=f"hospede{i}", password="pass") for i in range(3)]
+        for i in range(3):
+            PropriedadeImagem.objects.create(propriedade=self.prop, imagem=self._upload((64, 64), name=f"f{i}.png"))
+        for i in range(25):
+            Avaliacao.objects.create(autor=autores[i % 3], propriedade=self.prop, nota=1 + i % 5, comentario=f"c{i}")
+        # vizinhos ativos: a seção de semelhantes é renderizada (consulta in_bulk incluída na contagem)
+        for i in range(3):
+            Propriedade.objects.create(owner=self.owner, titulo=f"Vizinha {i}", preco_por_noite=f"{101 + i}.00")
+        from django.test import override_settings
+
+        from recomendacoes.services.ml.services import similar
+
+        override = override_settings(ML_SIMILAR_REBUILD_SECONDS=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        similar._INDEX["value"] = None
+        self.url = reverse("propriedades:detalhe", args=[self.prop.pk])
+        self.client.get(self.url)  # aquece o índice de semelhantes
+        cache.clear()
+
+    def test_constant_queries_and_fragments_served_from_cache(self):
+        # propriedade+dono, versão do catálogo e semelhantes (in_bulk), imagens, página de avaliações+autores
+        with self.assertNumQueries(5):
+            resp = self.client.get(self.url)
+        self.assertEqual(len(resp.context["similares"]), 3)
+        self.assertContains(resp, "Vizinha 2")
+        self.assertContains(resp, "c24")
+        self.assertNotContains(resp, "c14")  # só a primeira página (10 mais recentes)
+        self.assertEqual(resp.content.decode().count("<picture>"), 3)
+        # fragmentos em cache: a propriedade e os semelhantes (a versão do catálogo também ficou em cache)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_review_pages_and_invalidation_by_version(self):
+        from avaliacoes.models import Avaliacao
+
+        resp = self.client.get(self.url, {"avaliacoes": 3})
+        self.assertContains(resp, "c0")
+        self.assertNotContains(resp, "c5<")
+        self.assertContains(resp, "?avaliacoes=2#avaliacoes")
+        self.client.get(self.url)
+        Avaliacao.objects.create(autor=self.owner, propriedade=self.prop, nota=5, comentario="nova avaliação")
+        self.assertContains(self.client.get(self.url), "nova avaliação")
+
+
+class ImportacaoTests(TestCase):
+    REGISTRO = {
+        "tipo": "Apartamento",
+        "endereco": {"cidade": "São Paulo", "bairro": "Pinheiros", "rua": "Rua A", "numero": 10},
+        "quartos": 2, "banheiros": 1, "vagas_garagem": 1, "area_m2": 60,
+        "preco_aluguel": 2500, "descricao": "Perto do metrô",
+        "comodidades": ["Wi-Fi", "Estacionamento gratuito", "Lareira"],
+        "status": "ativo", "anfitriao": {"nome": "Ana Souza"},
+    }
+
+    def _call(self, *args):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("import_listings", *args, stdout=out)
+        return out.getvalue()
+
+    def _jsonl(self, registros):
+        import json
+        import os
+        import tempfile
+
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            for r in registros:
+                fh.write((r if isinstance(r, str) else json.dumps(r)) + "\n")
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_generated_file_is_imported_once(self):
+        out = self._call()
+        self.assertIn("50 imóvel(is) importado(s)", out)
+        self.assertEqual(Propriedade.objects.count(), 50)
+        self.assertTrue(User.objects.filter(username__startswith="anfitriao-").exists())
+        out = self._call()
+        self.assertIn("0 imóvel(is) importado(s), 50 já existente(s)", out)
+        self.assertEqual(Propriedade.objects.count(), 50)
+
+    def test_jsonl_maps_fields_and_indexes_for_search(self):
+        from propriedades.models import AMENITY_BITS
+        from propriedades.search import search_ids
+
+        inativo = dict(self.REGISTRO, status="inativo", descricao="Outro")
+        path = self._jsonl([self.REGISTRO, self.REGISTRO, "", inativo, {"tipo": "Casa"}])
+        out = self._call(path, "--chunk-size", "2")
+        self.assertIn("2 imóvel(is) importado(s), 1 já existente(s), 1 inválido(s)", out)
+        p = Propriedade.objects.get(ativo=True)
+        self.assertEqual(p.owner.username, "anfitriao-ana-souza")
+        self.assertEqual(p.titulo, "Apartamento em Pinheiros, São Paulo")
+        self.assertEqual(p.city_norm, "sao paulo")
+        self.assertEqual(str(p.preco_por_noite), "2500.00")
+        self.assertEqual(p.comodidades, ["wifi", "estacionamento", "lareira"])
+        self.assertEqual(p.comodidades_mask, AMENITY_BITS["wifi"] | AMENITY_BITS["estacionamento"])
+        self.assertEqual(search_ids("metro pinheiros"), [p.pk])
+
+    def test_array_reader_streams_across_buffer_boundaries(self):
+        import json
+        import os
+        import tempfile
+
+        from propriedades import importing
+
+        registros = [dict(self.REGISTRO, numero=i, descricao="x" * 50) for i in range(40)]
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(registros, fh, indent=2)
+        self.addCleanup(os.remove, path)
+        old = importing.READ_SIZE
+        importing.READ_SIZE = 64
+        try:
+            self.assertEqual(list(importing.iter_records(path)), registros)
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.truncate(os.path.getsize(path) - 5)
+            with self.assertRaises(ValueError):
+                list(importing.iter_records(path))
+        finally:
+            importing.READ_SIZE = old
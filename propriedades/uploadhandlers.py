@@ -0,0 +1,35 @@
+"""Upload handlers que calculam o SHA-256 do arquivo enquanto ele chega.
+
+Substituem os handlers padrão do Django (FILE_UPLOAD_HANDLERS) e deixam o
+hash em `arquivo.sha256`, usado pelo armazenamento endereçado por conteúdo
+(`propriedades.blobs`) sem reler o arquivo.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class _HashingMixin:
+    def new_file(self, *args, **kwargs):
+        self._sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # o handler em memória não ativado só repassa os dados ao próximo, que calcula o hash
+        if getattr(self, 'activated', True):
+            self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        f = super().file_complete(file_size)
+        if f is not None:
+            f.sha256 = self._sha256.hexdigest()
+        return f
+
+
+class HashingMemoryFileUploadHandler(_HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(_HashingMixin, TemporaryFileUploadHandler):
+    pass
@@ -6,6 +6,7 @@ app_name = "propriedades"
 urlpatterns = [
     path("", views.lista_propriedades, name="lista"),
     path("nova/", views.criar_propriedade, name="nova"),
+    path("facetas/", views.facetas_propriedades, name="facetas"),
     path("<int:pk>/", views.detalhe_propriedade, name="detalhe"),
     path("<int:pk>/excluir/", views.excluir_propriedade, name="excluir"),
 ]
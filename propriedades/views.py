@@ -1,80 +1,33 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.http import JsonResponse
 from .models import Propriedade, PropriedadeImagem
-from django.db.models import Q
+from .facets import get_facets
+from .filters import filter_queryset, parse_filters
 from .forms import PropriedadeForm
+from .pagination import keyset_page, page_size, ranked_page
+from .search import search_ids
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
 def lista_propriedades(request):
-    q = request.GET.get("q", "")
-    props = Propriedade.objects.filter(ativo=True)
-    if q:
-        props = props.filter(titulo__icontains=q)
-    # Aplicar filtros simples via GET (para a seção "Filtros de recomendação" atuar como filtros)
+    filters = parse_filters(request.GET)
+    # Busca textual ranqueada (FTS5/tsvector); sem índice, filtro simples no título
+    ranked_ids = search_ids(filters["q"]) if "q" in filters else None
+    # com índice, o texto já está nos ids ranqueados (ver ranked_page abaixo)
+    list_filters = filters if ranked_ids is None else {k: v for k, v in filters.items() if k != "q"}
+    props = filter_queryset(Propriedade.objects.filter(ativo=True), list_filters)
+    # Contagens por faceta (uma consulta agregada, em cache por filtros + versão do catálogo)
     try:
-        city = (request.GET.get("city") or "").strip()
-        neighborhood = (request.GET.get("neighborhood") or "").strip()
-        ptype = (request.GET.get("property_type") or "").strip()
-        min_area = request.GET.get("min_area")
-        max_area = request.GET.get("max_area")
-        bedrooms = request.GET.get("bedrooms")
-        bathrooms = request.GET.get("bathrooms")
-        parking = request.GET.get("parking")
-        min_price = request.GET.get("min_price")
-        max_price = request.GET.get("max_price")
-        amenities = request.GET.getlist("amenities")
-
-        if city:
-            props = props.filter(city__icontains=city)
-        if neighborhood:
-            props = props.filter(endereco__icontains=neighborhood)
-        if ptype:
-            # campo 'tipo' pode não existir em todos os registros; tentar filtrar por atributo
-            props = props.filter(Q(tipo__icontains=ptype) | Q(property_type__icontains=ptype) | Q(titulo__icontains=ptype))
-        if min_area:
-            try:
-                props = props.filter(area_m2__gte=int(min_area))
-            except Exception:
-                pass
-        if max_area:
-            try:
-                props = props.filter(area_m2__lte=int(max_area))
-            except Exception:
-                pass
-        if bedrooms:
-            try:
-                props = props.filter(quartos__gte=int(bedrooms))
-            except Exception:
-                pass
-        if bathrooms:
-            try:
-                props = props.filter(banheiros__gte=int(bathrooms))
-            except Exception:
-                pass
-        if parking:
-            try:
-                props = props.filter(vagas_garagem__gte=int(parking))
-            except Exception:
-                pass
-        if min_price:
-            try:
-                props = props.filter(preco_por_noite__gte=float(min_price))
-            except Exception:
-                pass
-        if max_price:
-            try:
-                props = props.filter(preco_por_noite__lte=float(max_price))
-            except Exception:
-                pass
-        # amenidades: exigir que cada amenity esteja contida no JSONField 'comodidades'
-        for a in [x.strip().lower() for x in amenities if x]:
-            props = props.filter(comodidades__icontains=a) if a else props
+        facetas = _facet_links(get_facets(filters, ranked_ids), request.GET, filters)
     except Exception:
-        # se qualquer erro de parsing ocorrer, ignorar filtros
-        pass
+        logger.exception("Falha calculando facetas da listagem")
+        facetas = None
     # Recomendações: somente pessoais, exibidas após usuário favoritar imóveis.
     recomendadas = []
     # Se usuário autenticado, tentar carregar recomendações personalizadas persistidas
@@ -92,41 +45,153 @@ def lista_propriedades(request):
         except Exception:
             pass
 
-    # Para facilitar a lógica no template (evita chamadas a .filter/.exists no template),
-    # transformamos a lista/queryset em lista materializada e marcamos um atributo
-    # booleano `is_favorito` em cada propriedade para o usuário atual.
+    # Paginação por chave (criado_em, id): só a página visível é carregada.
+    # O flag `is_favorito` (evita chamadas a .filter/.exists no template) também
+    # é calculado apenas para os itens desta página.
+    size = page_size(request.GET.get("page_size"))
+    if ranked_ids is not None:
+        page = ranked_page(props, ranked_ids, request.GET.get("cursor"), size)
+    else:
+        page = keyset_page(props, request.GET.get("cursor"), size)
+    props_list = page["items"]
+    # capa do card: imagens só dos itens da página, numa consulta
+    prefetch_related_objects(props_list, "imagens")
     try:
-        props_list = list(props) if not isinstance(props, list) else props
-        if request.user.is_authenticated:
+        if request.user.is_authenticated and props_list:
             from favoritos.models import Favorito
-            fav_ids = set(Favorito.objects.filter(user=request.user, propriedade__in=props_list).values_list('propriedade_id', flat=True))
+            fav_ids = set(Favorito.objects.filter(user=request.user, propriedade__in=[p.pk for p in props_list]).values_list('propriedade_id', flat=True))
         else:
             fav_ids = set()
-        for p in props_list:
-            p.is_favorito = (p.id in fav_ids)
     except Exception:
-        # Em caso de erro inesperado, garantimos que `propriedades` ainda esteja disponível
-        props_list = list(props) if not isinstance(props, list) else props
-        for p in props_list:
-            p.is_favorito = False
+        fav_ids = set()
+    for p in props_list:
+        p.is_favorito = (p.id in fav_ids)
+
+    def page_url(cursor):
+        if not cursor:
+            return None
+        params = request.GET.copy()
+        params["cursor"] = cursor
+        return "?" + params.urlencode()
 
     # Lista de amenidades selecionadas para marcar checkboxes no template
     selected_amenities = request.GET.getlist("amenities")
+    amenity_counts = {a["value"]: a["count"] for a in facetas["amenities"]} if facetas else {}
+    amenity_options = [
+        {"value": code, "label": label, "checked": code in selected_amenities, "count": amenity_counts.get(code)}
+        for code, label in AMENITIES_CHOICES
+    ]
     return render(
         request,
         "propriedades/lista.html",
         {
             "propriedades": props_list,
+            "next_url": page_url(page["next_cursor"]),
+            "prev_url": page_url(page["prev_cursor"]),
             "recomendadas": recomendadas,
             "selected_amenities": selected_amenities,
+            "amenity_options": amenity_options,
+            "facetas": facetas,
         },
     )
 
+
+def _facet_links(facetas, params, filters):
+    """Acrescenta a cada valor de faceta a URL da listagem com aquele filtro (sem o cursor) e se está ativo."""
+    def url(**changes):
+        q = params.copy()
+        q.pop("cursor", None)
+        for key, value in changes.items():
+            q.pop(key, None)
+            if value is not None:
+                q[key] = value
+        return "?" + q.urlencode()
+
+    out = dict(facetas)
+    out["cities"] = [
+        dict(c, url=url(city=c["label"]), active=c["value"] == filters.get("city"))
+        for c in facetas["cities"]
+    ]
+    out["bedrooms"] = [
+        dict(b, url=url(bedrooms=b["value"]), active=b["value"] == filters.get("bedrooms"))
+        for b in facetas["bedrooms"]
+    ]
+    out["price"] = [
+        dict(
+            b,
+            url=url(
+                min_price=None if b["min_price"] is None else f'{b["min_price"]:g}',
+                max_price=None if b["max_price"] is None else f'{b["max_price"]:g}',
+            ),
+            active=(b["min_price"], b["max_price"]) == (filters.get("min_price"), filters.get("max_price")),
+        )
+        for b in facetas["price"]
+    ]
+    return out
+
+
+def facetas_propriedades(request):
+    """Contagens das facetas da listagem em JSON, para os mesmos parâmetros GET de `lista_propriedades`."""
+    filters = parse_filters(request.GET)
+    ranked_ids = search_ids(filters["q"]) if "q" in filters else None
+    return JsonResponse({"filters": filters, "facets": get_facets(filters, ranked_ids)})
+
 from .models import AMENITIES_CHOICES
 
 def detalhe_propriedade(request, pk):
-    prop = get_object_or_404(Propriedade, pk=pk)
-    return render(request, "propriedades/detalhe.html", {"propriedade": prop, "amenities_choices": AMENITIES_CHOICES})
+    # dono na mesma consulta; imagens e avaliações são querysets preguiçosos, avaliados (uma
+    # consulta cada) só quando o fragmento correspondente não está em cache
+    prop = get_object_or_404(Propriedade.objects.select_related("owner"), pk=pk)
+    imagens = prop.imagens.order_by("id")
+    avaliacoes_pagina = _pagina_avaliacoes(prop, request.GET.get("avaliacoes"))
+    # Imóveis semelhantes via índice k-NN em memória; a página não depende dele
+    try:
+        from recomendacoes.services.ml.views import similar_property_objects
+        similares = [p for p, _dist in similar_property_objects(prop)]
+    except Exception:
+        logger.exception("Falha buscando imóveis semelhantes")
+        similares = []
+    return render(
+        request,
+        "propriedades/detalhe.html",
+        {
+            "propriedade": prop,
+            "imagens": imagens,
+            "avaliacoes_pagina": avaliacoes_pagina,
+            "amenities_choices": AMENITIES_CHOICES,
+            "similares": similares,
+            "fragment_timeout": getattr(settings, "PROPRIEDADES_DETAIL_FRAGMENT_TIMEOUT", 600),
+        },
+    )
+
+
+def _pagina_avaliacoes(prop, pagina):
+    """Fatia das avaliações (mais recentes primeiro); o total vem de `rating_count`, sem COUNT(*)."""
+    size = int(getattr(settings, "PROPRIEDADES_REVIEWS_PAGE_SIZE", 10))
+    paginas = max(1, -(-prop.rating_count // size))
+    try:
+        numero = min(max(1, int(pagina)), paginas)
+    except (TypeError, ValueError):
+        numero = 1
+    offset = (numero - 1) * size
+    itens = prop.avaliacoes.select_related("autor").order_by("-criado_em", "-id")[offset:offset + size]
+    return {
+        "numero": numero,
+        "itens": itens,
+        "anterior": numero - 1 if numero > 1 else None,
+        "proxima": numero + 1 if numero < paginas else None,
+    }
+
+def imagem_blob(request, path):
+    """Serve arquivos dos blobs de imagem com cache longo: o nome deriva do conteúdo, então nunca muda."""
+    from django.views.static import serve
+
+    from .blobs import BLOB_DIR
+
+    resp = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, BLOB_DIR))
+    max_age = int(getattr(settings, "PROPRIEDADES_BLOB_CACHE_SECONDS", 365 * 24 * 3600))
+    resp["Cache-Control"] = f"public, max-age={max_age}, immutable"
+    return resp
 
 @login_required
 def criar_propriedade(request):
@@ -155,7 +220,7 @@ def criar_propriedade(request):
                         continue
                     try:
                         img = PropriedadeImagem(propriedade=prop, imagem=f)
-                        img.save()  # salva tanto o registro quanto o arquivo em MEDIA_ROOT
+                        img.save()  # salva o registro e o original; as variantes saem em segundo plano
                         print("Saved imagem:", img.imagem.name, "id:", img.pk)
                     except Exception as e:
                         logger.exception("Erro salvando imagem")
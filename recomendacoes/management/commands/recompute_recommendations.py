@@ -0,0 +1,144 @@
+"""
+Recomputa em lote as recomendações pessoais (após retreino do modelo ou
+importação de catálogo), em processos paralelos.
+Uso: python manage.py recompute_recommendations [--workers 4] [--only-stale] [--resume]
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+# estado por processo worker: modelo carregado, criado uma vez
+_WORKER = {}
+
+
+def _checkpoint_path():
+    return getattr(settings, 'ML_RECOMPUTE_CHECKPOINT', os.path.join(settings.BASE_DIR, '.recompute_checkpoint.json'))
+
+
+def _init_worker(catalogue_version):
+    import django
+    django.setup()
+    connections.close_all()  # não reaproveitar conexões herdadas do processo pai
+
+    from favoritos.models import UserPreferenceProfile
+    from recomendacoes.services.ml.services.model import PriceModel
+    from recomendacoes.services.ml.services.personal_catalogue import get_personal_catalogue
+
+    model = PriceModel.instance()
+    _WORKER['model'] = model
+    # catálogo e preços do tipo padrão ficam em memória para todos os blocos deste worker
+    get_personal_catalogue(catalogue_version).prices(model, UserPreferenceProfile.DEFAULT_TIPO)
+    _WORKER['catalogue_version'] = catalogue_version
+
+
+def _process_chunk(user_ids, limit):
+    """Recomputa um bloco de usuários e grava tudo numa única escrita em lote."""
+    from favoritos.models import Favorito, UserPreferenceProfile
+    from recomendacoes.services.ml.views import (
+        persist_personal_recommendations, personal_stamp, score_personal_candidates,
+    )
+
+    model = _WORKER['model']
+    fav_ids = {}
+    for user_id, prop_id in Favorito.objects.filter(user_id__in=user_ids).values_list('user_id', 'propriedade_id'):
+        fav_ids.setdefault(user_id, []).append(prop_id)
+
+    entries = []
+    for profile in UserPreferenceProfile.objects.filter(user_id__in=user_ids, favorites_count__gt=0):
+        top = score_personal_candidates(profile, fav_ids.get(profile.user_id, []), model, limit)
+        entries.append((profile.user_id, top, personal_stamp(profile, model, _WORKER['catalogue_version'], limit)))
+    persist_personal_recommendations(entries)
+    return len(user_ids)
+
+
+class Command(BaseCommand):
+    help = 'Recomputa as recomendações pessoais de todos os usuários (ou só dos desatualizados) em paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='Processos worker')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Usuários por lote de escrita')
+        parser.add_argument('--limit', type=int, default=10, help='Recomendações por usuário')
+        parser.add_argument('--only-stale', action='store_true',
+                            help='Só usuários cujas recomendações não batem com as versões atuais')
+        parser.add_argument('--resume', action='store_true',
+                            help='Retoma uma execução interrompida, pulando usuários já gravados por ela')
+
+    def _user_ids(self, options, started_at):
+        from favoritos.models import UserPreferenceProfile, UserRecommendationState
+        from recomendacoes.services.ml.services.model import PriceModel
+        from recomendacoes.services.ml.services.versions import catalogue_version
+        from recomendacoes.services.ml.views import personal_model_version
+
+        user_ids = list(
+            UserPreferenceProfile.objects.filter(favorites_count__gt=0).order_by('user_id').values_list('user_id', flat=True)
+        )
+        skip = set()
+        if options['resume']:
+            skip |= set(UserRecommendationState.objects.filter(
+                source='personal', generated_at__gte=started_at,
+            ).values_list('user_id', flat=True))
+        if options['only_stale']:
+            max_age = timedelta(seconds=getattr(settings, 'ML_PERSONAL_RECS_MAX_AGE_SECONDS', 6 * 3600))
+            fav_versions = dict(UserPreferenceProfile.objects.values_list('user_id', 'favorites_version'))
+            mv, cv, now = personal_model_version(PriceModel.instance()), catalogue_version(), timezone.now()
+            for state in UserRecommendationState.objects.filter(source='personal'):
+                if state.is_fresh(fav_versions.get(state.user_id), mv, cv, options['limit'], max_age, now):
+                    skip.add(state.user_id)
+        return [u for u in user_ids if u not in skip]
+
+    def handle(self, *args, **options):
+        from recomendacoes.services.ml.services.versions import catalogue_version
+
+        checkpoint = _checkpoint_path()
+        started_at = timezone.now()
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint, 'r', encoding='utf-8') as f:
+                started_at = datetime.fromisoformat(json.load(f)['started_at'])
+            self.stdout.write(f'Retomando execução iniciada em {started_at.isoformat()}')
+        else:
+            with open(checkpoint, 'w', encoding='utf-8') as f:
+                json.dump({'started_at': started_at.isoformat()}, f)
+
+        user_ids = self._user_ids(options, started_at)
+        total = len(user_ids)
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Nenhum usuário para recomputar.'))
+            os.remove(checkpoint)
+            return
+
+        size = max(1, options['chunk_size'])
+        chunks = [user_ids[i:i + size] for i in range(0, total, size)]
+        version = catalogue_version()
+        self.stdout.write(f'Recomputando {total} usuário(s) em {len(chunks)} lote(s) com {options["workers"]} worker(s)...')
+
+        t0 = time.perf_counter()
+        done = 0
+        if options['workers'] <= 1:
+            _init_worker(version)
+            for chunk in chunks:
+                done += _process_chunk(chunk, options['limit'])
+                self._progress(done, total, t0)
+        else:
+            connections.close_all()  # conexões não sobrevivem ao fork
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker, initargs=(version,)) as pool:
+                futures = [pool.submit(_process_chunk, chunk, options['limit']) for chunk in chunks]
+                for fut in as_completed(futures):
+                    done += fut.result()
+                    self._progress(done, total, t0)
+
+        elapsed = time.perf_counter() - t0
+        os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {done} usuário(s) em {elapsed:.2f}s ({done / max(elapsed, 1e-9):.1f} usuários/s)'
+        ))
+
+    def _progress(self, done, total, t0):
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(f'  {done}/{total} ({done / max(elapsed, 1e-9):.1f} usuários/s)')
@@ -0,0 +1,40 @@
+"""
+Treina o recomendador por fatoração de matrizes (ALS implícito) com favoritos,
+reservas confirmadas e avaliações, gravando os fatores em model_store/als_factors.npz.
+Uso: python manage.py train_als [--factors 32] [--iterations 10] [--workers 4]
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recomendacoes.services.ml.services.als import ALS_PATH, collect_feedback, save_als, train_als
+
+
+class Command(BaseCommand):
+    help = 'Treina os fatores latentes de usuários e propriedades (ALS com feedback implícito)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--factors', type=int, default=getattr(settings, 'ML_ALS_FACTORS', 32))
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--regularization', type=float, default=0.1)
+        parser.add_argument('--alpha', type=float, default=20.0, help='Escala da confiança (1 + alpha * peso)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Threads de resolução')
+        parser.add_argument('--output', default=ALS_PATH, help='Arquivo .npz de saída')
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        model = train_als(
+            collect_feedback(),
+            factors=options['factors'],
+            regularization=options['regularization'],
+            alpha=options['alpha'],
+            iterations=options['iterations'],
+            workers=options['workers'],
+        )
+        save_als(model, options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {len(model.user_ids)} usuário(s) x {len(model.item_ids)} propriedade(s), '
+            f'{options["factors"]} fatores em {time.perf_counter() - t0:.2f}s → {options["output"]}'
+        ))
@@ -33,6 +33,8 @@ class RecommendationInputSerializer(serializers.Serializer):
     city = serializers.CharField(required=False, allow_blank=True)
     limit = serializers.IntegerField(min_value=1, max_value=50, required=False, default=10)
     candidates = CandidateSerializer(many=True, required=False)
+    # cursor opaco devolvido no header X-Next-Cursor da página anterior
+    cursor = serializers.CharField(required=False, allow_blank=True)
 
 class RecommendationOutputItemSerializer(serializers.Serializer):
     id = serializers.IntegerField()
@@ -59,3 +61,4 @@ class SurveyInputSerializer(serializers.Serializer):
     amenities = serializers.ListField(
         child=serializers.CharField(), required=False, allow_empty=True
     )
+    cursor = serializers.CharField(required=False, allow_blank=True)
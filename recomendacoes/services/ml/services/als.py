@@ -0,0 +1,171 @@
+"""Recomendador por fatoração de matrizes com feedback implícito (ALS).
+
+Treino offline (`manage.py train_als`) sobre a matriz esparsa usuário x
+propriedade, com pesos vindos de favoritos, reservas confirmadas e avaliações
+positivas, seguindo o ALS implícito de Hu, Koren & Volinsky: confiança
+`1 + alpha * peso` e preferência binária. Cada meia-iteração resolve um
+sistema f x f por usuário (ou item) em blocos paralelos; o NumPy libera o GIL
+dentro do `solve`, então threads bastam para usar vários núcleos.
+
+Os fatores são gravados como float32 em `model_store/als_factors.npz`; servir
+o top-k de um usuário é um produto matriz-vetor mais `argpartition`.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .item_similarity import collect_interactions
+from .model import MODEL_DIR
+
+try:
+    import scipy.sparse as sp
+    SCIPY_OK = True
+except Exception:
+    sp = None  # type: ignore
+    SCIPY_OK = False
+
+ALS_PATH = os.path.join(MODEL_DIR, 'als_factors.npz')
+
+# nota da avaliação -> peso; avaliações ruins não contam como preferência
+REVIEW_WEIGHTS = {3: 0.5, 4: 1.5, 5: 2.5}
+
+
+class AlsModel:
+    """Fatores latentes (float32) de usuários e propriedades."""
+
+    def __init__(self, user_ids, item_ids, user_factors, item_factors, version: str = ''):
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.user_factors = np.asarray(user_factors, dtype=np.float32)
+        self.item_factors = np.asarray(item_factors, dtype=np.float32)
+        self.version = version
+        self._user_pos = {int(u): i for i, u in enumerate(self.user_ids)}
+        self._item_pos = {int(p): i for i, p in enumerate(self.item_ids)}
+
+    def has_user(self, user_id: int) -> bool:
+        return int(user_id) in self._user_pos
+
+    def recommend(self, user_id: int, k: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Top-k propriedades do usuário: [(id, score)], sem os ids em `exclude`."""
+        u = self._user_pos.get(int(user_id))
+        if u is None or k <= 0 or not len(self.item_ids):
+            return []
+        scores = self.item_factors @ self.user_factors[u]
+        skip = list({self._item_pos[p] for p in exclude if p in self._item_pos})
+        if skip:
+            scores[skip] = -np.inf
+        k = min(k, len(scores) - len(skip))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(self.item_ids[i]), float(scores[i])) for i in top]
+
+
+def collect_feedback():
+    """Favoritos e reservas confirmadas (ver item_similarity) mais avaliações positivas."""
+    from avaliacoes.models import Avaliacao
+
+    yield from collect_interactions()
+    reviews = Avaliacao.objects.filter(nota__gte=min(REVIEW_WEIGHTS))
+    for u, p, nota in reviews.values_list('autor_id', 'propriedade_id', 'nota').iterator(chunk_size=5000):
+        yield u, p, REVIEW_WEIGHTS.get(nota, max(REVIEW_WEIGHTS.values()))
+
+
+def _solve_rows(Cui, Y, YtY, reg, rows, out):
+    """Resolve os fatores das linhas `rows` de `Cui` mantendo `Y` fixo."""
+    f = Y.shape[1]
+    eye = reg * np.eye(f, dtype=np.float64)
+    indptr, indices, data = Cui.indptr, Cui.indices, Cui.data
+    for r in rows:
+        lo, hi = indptr[r], indptr[r + 1]
+        if lo == hi:
+            out[r] = 0.0
+            continue
+        Yr = Y[indices[lo:hi]]
+        conf = data[lo:hi]  # alpha * peso  (= C - 1)
+        A = YtY + (Yr.T * conf) @ Yr + eye
+        b = Yr.T @ (1.0 + conf)
+        out[r] = np.linalg.solve(A, b)
+
+
+def _half_step(Cui, Y, reg, workers, chunk):
+    Y64 = Y.astype(np.float64)
+    YtY = Y64.T @ Y64
+    out = np.empty((Cui.shape[0], Y.shape[1]), dtype=np.float64)
+    blocks = [range(i, min(i + chunk, Cui.shape[0])) for i in range(0, Cui.shape[0], chunk)]
+    if workers <= 1 or len(blocks) <= 1:
+        for rows in blocks:
+            _solve_rows(Cui, Y64, YtY, reg, rows, out)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda rows: _solve_rows(Cui, Y64, YtY, reg, rows, out), blocks))
+    return out.astype(np.float32)
+
+
+def train_als(interactions, factors: int = 32, regularization: float = 0.1, alpha: float = 20.0,
+              iterations: int = 10, workers: Optional[int] = None, chunk: int = 2048, seed: int = 0) -> AlsModel:
+    """Treina os fatores a partir de (user_id, propriedade_id, peso); pesos repetidos são somados."""
+    if not SCIPY_OK:
+        raise RuntimeError('scipy é necessário para treinar o ALS')
+    users, items, weights = [], [], []
+    for u, i, w in interactions:
+        users.append(u)
+        items.append(i)
+        weights.append(w)
+    if not items:
+        return AlsModel([], [], np.zeros((0, factors)), np.zeros((0, factors)))
+
+    user_ids, u_idx = np.unique(np.asarray(users, dtype=np.int64), return_inverse=True)
+    item_ids, i_idx = np.unique(np.asarray(items, dtype=np.int64), return_inverse=True)
+    Cui = sp.csr_matrix(
+        (alpha * np.asarray(weights, dtype=np.float64), (u_idx, i_idx)),
+        shape=(len(user_ids), len(item_ids)),
+    )
+    Cui.sum_duplicates()
+    Ciu = Cui.T.tocsr()
+
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    X = (rng.standard_normal((len(user_ids), factors)) * 0.01).astype(np.float32)
+    Y = (rng.standard_normal((len(item_ids), factors)) * 0.01).astype(np.float32)
+    for _ in range(iterations):
+        X = _half_step(Cui, Y, regularization, workers, chunk)
+        Y = _half_step(Ciu, X, regularization, workers, chunk)
+    return AlsModel(user_ids, item_ids, X, Y)
+
+
+def save_als(model: AlsModel, path: str = ALS_PATH) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, user_ids=model.user_ids, item_ids=model.item_ids,
+             user_factors=model.user_factors, item_factors=model.item_factors)
+    os.replace(tmp, path)
+
+
+_CACHE: Dict[str, object] = {'key': None, 'value': None}
+_LOCK = threading.Lock()
+
+
+def load_als(path: Optional[str] = None) -> Optional[AlsModel]:
+    """Fatores em memória, recarregados só quando mtime/tamanho do arquivo mudam."""
+    path = path or ALS_PATH
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    if _CACHE['key'] == key:
+        return _CACHE['value']  # type: ignore[return-value]
+    with _LOCK:
+        if _CACHE['key'] != key:
+            with np.load(path) as f:
+                _CACHE['value'] = AlsModel(
+                    f['user_ids'], f['item_ids'], f['user_factors'], f['item_factors'],
+                    version=f'{st.st_mtime_ns}:{st.st_size}',
+                )
+            _CACHE['key'] = key
+        return _CACHE['value']  # type: ignore[return-value]
@@ -0,0 +1,149 @@
+"""Filtragem colaborativa item-item a partir de co-ocorrência de interações.
+
+Um job offline (`manage.py build_item_similarity`) monta a matriz esparsa
+usuário x propriedade com favoritos e reservas confirmadas, calcula a
+similaridade cosseno entre propriedades e guarda só os top-N vizinhos de
+cada uma em `model_store/item_similarity.npz` (CSR: indptr/indices/data).
+Em produção a matriz é carregada uma vez e recarregada só se o arquivo mudar.
+"""
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from .model import MODEL_DIR
+
+try:
+    import scipy.sparse as sp
+    SCIPY_OK = True
+except Exception:
+    sp = None  # type: ignore
+    SCIPY_OK = False
+
+SIMILARITY_PATH = os.path.join(MODEL_DIR, 'item_similarity.npz')
+
+FAVORITE_WEIGHT = 1.0
+RESERVATION_WEIGHT = 2.0
+
+
+class ItemSimilarity:
+    """Top-N vizinhos por propriedade em formato CSR (float32)."""
+
+    def __init__(self, item_ids, indptr, indices, data, version: str = ''):
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float32)
+        self.version = version
+        self._pos = {int(pid): i for i, pid in enumerate(self.item_ids)}
+
+    def neighbors(self, prop_id: int):
+        """Retorna (ids, similaridades) dos vizinhos de `prop_id`."""
+        i = self._pos.get(int(prop_id))
+        if i is None:
+            return self.item_ids[:0], self.data[:0]
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return self.item_ids[self.indices[lo:hi]], self.data[lo:hi]
+
+    def scores_for(self, prop_ids: Iterable[int]) -> Dict[int, float]:
+        """Soma as similaridades dos vizinhos de cada propriedade dada (ex.: favoritos)."""
+        out: Dict[int, float] = {}
+        for pid in prop_ids:
+            ids, sims = self.neighbors(pid)
+            for nid, s in zip(ids.tolist(), sims.tolist()):
+                out[nid] = out.get(nid, 0.0) + s
+        return out
+
+
+def build_item_similarity(interactions, top_n: int = 50) -> ItemSimilarity:
+    """Calcula a similaridade cosseno item-item e mantém os `top_n` vizinhos de cada item.
+
+    `interactions`: iterável de (user_id, propriedade_id, peso).
+    """
+    if not SCIPY_OK:
+        raise RuntimeError('scipy é necessário para construir a matriz de similaridade')
+    users, items, weights = [], [], []
+    for u, i, w in interactions:
+        users.append(u)
+        items.append(i)
+        weights.append(w)
+    if not items:
+        return ItemSimilarity([], [0], [], [])
+
+    user_ids, u_idx = np.unique(np.asarray(users, dtype=np.int64), return_inverse=True)
+    item_ids, i_idx = np.unique(np.asarray(items, dtype=np.int64), return_inverse=True)
+    # pesos repetidos (favorito + reserva do mesmo par) são somados pelo formato COO
+    X = sp.csr_matrix(
+        (np.asarray(weights, dtype=np.float32), (u_idx, i_idx)),
+        shape=(len(user_ids), len(item_ids)),
+    )
+    co = (X.T @ X).tocsr()
+    norms = np.sqrt(co.diagonal()).astype(np.float32)
+    norms[norms == 0] = 1.0
+    co.setdiag(0)
+    co.eliminate_zeros()
+    co = co.tocoo()
+    sims = co.data / (norms[co.row] * norms[co.col])
+    co = sp.csr_matrix((sims.astype(np.float32), (co.row, co.col)), shape=co.shape)
+
+    indptr = [0]
+    indices, data = [], []
+    for r in range(co.shape[0]):
+        lo, hi = co.indptr[r], co.indptr[r + 1]
+        row_idx, row_val = co.indices[lo:hi], co.data[lo:hi]
+        if len(row_val) > top_n:
+            keep = np.argpartition(-row_val, top_n)[:top_n]
+            row_idx, row_val = row_idx[keep], row_val[keep]
+        order = np.argsort(-row_val, kind='stable')
+        indices.append(row_idx[order])
+        data.append(row_val[order])
+        indptr.append(indptr[-1] + len(order))
+    return ItemSimilarity(
+        item_ids, indptr,
+        np.concatenate(indices) if indices else [], np.concatenate(data) if data else [],
+    )
+
+
+def collect_interactions():
+    """Favoritos (peso 1) e reservas confirmadas (peso 2), lidos em streaming."""
+    from favoritos.models import Favorito
+    from reservas.models import Reserva
+
+    for u, p in Favorito.objects.values_list('user_id', 'propriedade_id').iterator(chunk_size=5000):
+        yield u, p, FAVORITE_WEIGHT
+    confirmed = Reserva.objects.filter(status=Reserva.STATUS_CONFIRMED)
+    for u, p in confirmed.values_list('guest_id', 'propriedade_id').iterator(chunk_size=5000):
+        yield u, p, RESERVATION_WEIGHT
+
+
+def save_item_similarity(sim: ItemSimilarity, path: str = SIMILARITY_PATH) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(tmp, item_ids=sim.item_ids, indptr=sim.indptr, indices=sim.indices, data=sim.data)
+    os.replace(tmp, path)
+
+
+_CACHE: Dict[str, object] = {'key': None, 'value': None}
+_LOCK = threading.Lock()
+
+
+def load_item_similarity(path: Optional[str] = None) -> Optional[ItemSimilarity]:
+    """Matriz em memória, recarregada só quando mtime/tamanho do arquivo mudam."""
+    path = path or SIMILARITY_PATH
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    if _CACHE['key'] == key:
+        return _CACHE['value']  # type: ignore[return-value]
+    with _LOCK:
+        if _CACHE['key'] != key:
+            with np.load(path) as f:
+                _CACHE['value'] = ItemSimilarity(
+                    f['item_ids'], f['indptr'], f['indices'], f['data'],
+                    version=f'{st.st_mtime_ns}:{st.st_size}',
+                )
+            _CACHE['key'] = key
+        return _CACHE['value']  # type: ignore[return-value]
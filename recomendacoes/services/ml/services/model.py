@@ -1,5 +1,7 @@
 import os
-from typing import Dict, Tuple, Optional
+import threading
+import time
+from typing import Dict, List, Tuple, Optional
 
 from .data_loader import iter_flattened
 
@@ -107,8 +109,17 @@ class _Baseline:
         )
         return max(0.0, float(val))
 
+def _mtime(path: Optional[str]) -> int:
+    try:
+        return os.stat(path).st_mtime_ns if path else 0
+    except OSError:
+        return 0
+
+
 class PriceModel:
     _instance: Optional["PriceModel"] = None
+    _lock = threading.Lock()
+    _checked_at = 0.0
 
     def __init__(self):
         _ensure_dirs()
@@ -116,13 +127,47 @@ class PriceModel:
         self.pipeline = None
         self.baseline = _Baseline()
         self.expected_features: list[str] | None = None
+        self.source_path: Optional[str] = None
         self._load_or_train()
+        # mtime do artefato que foi de fato carregado: a versão não acompanha o arquivo sozinha
+        self.source_mtime = _mtime(self.source_path) if self.method == "ml" else 0
 
     @classmethod
     def instance(cls) -> "PriceModel":
-        if cls._instance is None:
-            cls._instance = PriceModel()
-        return cls._instance
+        """Modelo do processo; recarregado (sob lock) quando o artefato em disco muda (ex.: após retreino).
+
+        O arquivo é consultado no máximo a cada ML_MODEL_RELOAD_CHECK_SECONDS.
+        """
+        current = cls._instance
+        if current is not None and not current._artifact_changed(cls):
+            return current
+        with cls._lock:
+            if cls._instance is None or cls._instance._artifact_changed(cls, force=True):
+                cls._instance = PriceModel()
+                cls._checked_at = time.monotonic()
+            return cls._instance
+
+    def _artifact_changed(self, cls, force: bool = False) -> bool:
+        if self.method != "ml" or not self.source_path:
+            return False
+        if not force:
+            try:
+                from django.conf import settings
+                interval = float(getattr(settings, 'ML_MODEL_RELOAD_CHECK_SECONDS', 5))
+            except Exception:
+                interval = 5.0
+            now = time.monotonic()
+            if now - cls._checked_at < interval:
+                return False
+            cls._checked_at = now
+        return _mtime(self.source_path) != self.source_mtime
+
+    @property
+    def version(self) -> str:
+        """Identifica o modelo carregado (método + arquivo + mtime na carga); usado para invalidar caches."""
+        if self.method != "ml" or not self.source_path:
+            return self.method
+        return f"{self.method}:{os.path.basename(self.source_path)}:{self.source_mtime}"
 
     def _load_or_train(self):
         data = [d for d in iter_flattened() if d['preco_aluguel'] > 0 and d['area_m2'] > 0]
@@ -149,6 +194,7 @@ class PriceModel:
                             if shared_model.exists():
                                 self.pipeline = joblib.load(shared_model)
                                 self.method = 'ml'
+                                self.source_path = str(shared_model)
                                 # try to load metadata with feature names if available
                                 try:
                                     meta_path = shared_model.parent / 'metadata.json'
@@ -188,6 +234,7 @@ class PriceModel:
                 try:
                     self.pipeline = joblib.load(MODEL_PATH)  # type: ignore
                     self.method = "ml"
+                    self.source_path = MODEL_PATH
                     return
                 except Exception:
                     self.pipeline = None
@@ -218,6 +265,7 @@ class PriceModel:
                 self.method = "ml"
                 try:
                     joblib.dump(pipe, MODEL_PATH)  # type: ignore
+                    self.source_path = MODEL_PATH
                 except Exception:
                     pass
             except Exception:
@@ -227,76 +275,88 @@ class PriceModel:
         # baseline sempre disponível
         self.baseline.fit(data)
 
-    def predict(self, features: Dict, return_details: bool = False) -> Tuple[float, str, Optional[Dict]]:
-        if self.pipeline is not None and self.method == "ml":
-            # predição via sklearn
-            import pandas as pd  # type: ignore
-            # Build DataFrame with the expected features (fill missing with sensible defaults)
-            if self.expected_features is None:
-                # fallback to a minimal set
-                cols = ['tipo', 'cidade', 'area_m2', 'quartos', 'banheiros', 'vagas_garagem', 'condominio', 'iptu']
+    def _feature_columns(self) -> List[str]:
+        if self.expected_features is None:
+            # fallback to a minimal set
+            return ['tipo', 'cidade', 'area_m2', 'quartos', 'banheiros', 'vagas_garagem', 'condominio', 'iptu']
+        return list(self.expected_features)
+
+    @staticmethod
+    def _build_row(features: Dict, cols: List[str]) -> Dict:
+        # fill missing expected features with sensible defaults
+        row = {}
+        for c in cols:
+            if c in ('tipo', 'cidade', 'politica_cancelamento', 'endereco_bairro'):
+                row[c] = features.get(c) or ''
+            elif c in ('mobiliado', 'wifi', 'loc_estrategica', 'anfitriao_superhost'):
+                row[c] = int(bool(features.get(c)))
+            else:
+                # numeric fallback
+                try:
+                    row[c] = float(features.get(c) or 0.0)
+                except Exception:
+                    row[c] = 0.0
+        return row
+
+    def _encoded_category(self, f: str, val: str) -> int:
+        # cache de classe -> código por encoder, evitando `le.transform` por valor
+        lookup = self.__dict__.setdefault('_le_lookup', {})
+        mapping = lookup.get(f)
+        if mapping is None:
+            le = self.label_encoders.get(f)
+            try:
+                mapping = {c: i for i, c in enumerate(le.classes_)}
+            except Exception:
+                mapping = {}
+            lookup[f] = mapping
+        # unseen category -> map to 0
+        return mapping.get(val, 0)
+
+    def _encode_rows(self, rows: List[Dict], cols: List[str]):
+        """Monta a matriz de entrada de um regressor sklearn "puro" (sem Pipeline).
+
+        Categorias são codificadas com os label encoders salvos e colunas numéricas
+        passam pelo scaler, quando disponível.
+        """
+        import numpy as _np
+        cat_keys = set(self.label_encoders.keys()) if isinstance(self.label_encoders, dict) else set()
+        arr = _np.zeros((len(rows), len(cols)), dtype=float)
+        for j, f in enumerate(cols):
+            if f in cat_keys:
+                arr[:, j] = [self._encoded_category(f, str(row.get(f) or '')) for row in rows]
             else:
-                cols = list(self.expected_features)
-
-            row = {}
-            for c in cols:
-                if c in ('tipo', 'cidade', 'politica_cancelamento', 'endereco_bairro'):
-                    row[c] = features.get(c) or ''
-                elif c in ('mobiliado', 'wifi', 'loc_estrategica', 'anfitriao_superhost'):
-                    row[c] = int(bool(features.get(c)))
-                else:
-                    # numeric fallback
+                col = []
+                for row in rows:
                     try:
-                        row[c] = float(features.get(c) or 0.0)
+                        col.append(float(row.get(f) or 0.0))
                     except Exception:
-                        row[c] = 0.0
+                        col.append(0.0)
+                arr[:, j] = col
+
+        # apply scaler to numeric columns if scaler exists
+        if getattr(self, 'scaler', None) is not None:
+            numeric_idx = [i for i, f in enumerate(cols) if f not in cat_keys]
+            try:
+                arr[:, numeric_idx] = self.scaler.transform(arr[:, numeric_idx])
+            except Exception:
+                # if scaling fails, continue with unscaled
+                pass
+        return arr
 
+    def predict(self, features: Dict, return_details: bool = False) -> Tuple[float, str, Optional[Dict]]:
+        if self.pipeline is not None and self.method == "ml":
+            # predição via sklearn
+            import pandas as pd  # type: ignore
+            cols = self._feature_columns()
+            row = self._build_row(features, cols)
             X = pd.DataFrame([row], columns=cols)
 
             # If underlying estimator is a plain sklearn regressor (not a pipeline),
             # ensure categorical features are encoded and numeric features scaled
             try:
-                import numpy as _np
                 est = self.pipeline
                 if not hasattr(est, 'named_steps'):
-                    # prepare row vector in expected order
-                    feat_order = cols
-                    vec = []
-                    cat_keys = set(self.label_encoders.keys()) if isinstance(self.label_encoders, dict) else set()
-                    for f in feat_order:
-                        if f in cat_keys:
-                            le = self.label_encoders.get(f)
-                            val = str(row.get(f) or '')
-                            try:
-                                enc = int(le.transform([val])[0])
-                            except Exception:
-                                # unseen category -> map to 0
-                                try:
-                                    enc = int(le.transform([le.classes_[0]])[0])
-                                except Exception:
-                                    enc = 0
-                            vec.append(enc)
-                        else:
-                            try:
-                                vec.append(float(row.get(f) or 0.0))
-                            except Exception:
-                                vec.append(0.0)
-
-                    arr = _np.asarray([vec], dtype=float)
-                    # apply scaler to numeric columns if scaler exists
-                    if getattr(self, 'scaler', None) is not None:
-                        # determine numeric indices: those not in cat_keys
-                        numeric_idx = [i for i, f in enumerate(feat_order) if f not in cat_keys]
-                        # slice numeric columns and scale
-                        num_part = arr[:, numeric_idx]
-                        try:
-                            scaled = self.scaler.transform(num_part)
-                            arr[:, numeric_idx] = scaled
-                        except Exception:
-                            # if scaling fails, continue with unscaled
-                            pass
-
-                    # use arr for prediction
+                    arr = self._encode_rows([row], cols)
                     pred = float(est.predict(arr)[0])
                     details = None
                     return pred, 'ml', details
@@ -339,3 +399,40 @@ class PriceModel:
         except Exception:
             pass
         return pred, "baseline", (details if return_details else None)
+
+    def predict_many(self, features_list: List[Dict]):
+        """Predição em lote: equivale a `predict` item a item, mas avalia o modelo uma única vez.
+
+        Retorna um array NumPy (float) alinhado com `features_list`.
+        """
+        import numpy as np  # type: ignore
+        if not features_list:
+            return np.zeros(0, dtype=float)
+        if self.pipeline is not None and self.method == "ml":
+            import pandas as pd  # type: ignore
+            cols = self._feature_columns()
+            rows = [self._build_row(f, cols) for f in features_list]
+            try:
+                est = self.pipeline
+                if not hasattr(est, 'named_steps'):
+                    return np.asarray(est.predict(self._encode_rows(rows, cols)), dtype=float)
+            except Exception:
+                pass
+            try:
+                preds = np.asarray(self.pipeline.predict(pd.DataFrame(rows, columns=cols)), dtype=float)
+            except Exception:
+                return np.asarray([self.predict(f)[0] for f in features_list], dtype=float)
+            try:
+                from recomendacoes.services.ml.monitoring import log_prediction
+                metadata = {'features': self.expected_features} if self.expected_features else None
+                log_prediction({'batch_size': len(rows)}, float(preds.mean()), 'ml', metadata=metadata)
+            except Exception:
+                pass
+            return preds
+        preds = np.asarray([self.baseline.predict(f) for f in features_list], dtype=float)
+        try:
+            from recomendacoes.services.ml.monitoring import log_prediction
+            log_prediction({'batch_size': len(preds)}, float(preds.mean()), 'baseline', metadata={'method': 'baseline'})
+        except Exception:
+            pass
+        return preds
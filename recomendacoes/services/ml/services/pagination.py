@@ -0,0 +1,56 @@
+"""Paginação por cursor dos resultados de recomendação.
+
+O ranking completo (até `ML_RANKED_RESULTS_MAX` itens) é calculado uma vez e
+guardado no cache de respostas; cada página é só uma fatia dele. O cursor é
+opaco para o cliente: carrega o fingerprint da requisição, o offset e o token
+das versões (catálogo e modelo) com que a primeira página foi calculada, para
+as páginas seguintes fatiarem o mesmo ranking mesmo que o catálogo mude.
+"""
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+
+def ranked_limit() -> int:
+    return int(getattr(settings, 'ML_RANKED_RESULTS_MAX', 200))
+
+
+def request_fingerprint(endpoint: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps([endpoint, params], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def encode_cursor(fingerprint: str, offset: int, token: Optional[str] = None) -> str:
+    data = {'f': fingerprint, 'o': offset}
+    if token:
+        data['v'] = token
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], fingerprint: str) -> Tuple[int, Optional[str]]:
+    """Retorna (offset, token de versões) do cursor; ValueError se for inválido ou de outra consulta."""
+    if not cursor:
+        return 0, None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset = int(data['o'])
+        fp = data['f']
+        token = data.get('v')
+    except Exception:
+        raise ValueError('Cursor inválido.')
+    if fp != fingerprint or offset < 0:
+        raise ValueError('Cursor não corresponde a esta consulta.')
+    return offset, (str(token) if token else None)
+
+
+def paginate(items: List[Dict], offset: int, limit: int, fingerprint: str,
+             token: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    page = items[offset:offset + limit]
+    end = offset + len(page)
+    next_cursor = encode_cursor(fingerprint, end, token) if end < len(items) else None
+    return page, next_cursor
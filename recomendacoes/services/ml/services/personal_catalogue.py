@@ -0,0 +1,103 @@
+"""Catálogo ativo em formato de matriz para a pontuação das recomendações pessoais.
+
+Construído uma vez por versão do catálogo (ver `versions.catalogue_version`, que
+só muda com os campos de `propriedades.models.SCORING_FIELDS`: avaliações,
+imagens e edições de descrição/endereço não forçam a reconstrução) e mantido
+em memória: ids ordenados, cidades codificadas como inteiros, matriz
+booleana de comodidades e os campos usados pelo modelo de preço. Os preços
+previstos ficam guardados por (versão do modelo, tipo), então o custo de
+pontuar um usuário é só aritmética vetorizada sobre o catálogo inteiro.
+"""
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from .versions import catalogue_version, model_version
+
+CATALOGUE_FIELDS = (
+    'id', 'titulo', 'city', 'area_m2', 'quartos', 'banheiros', 'vagas_garagem', 'condominio', 'iptu', 'comodidades',
+)
+
+
+class PersonalCatalogue:
+    """Colunas das propriedades ativas, alinhadas por posição (ordenadas por id)."""
+
+    def __init__(self, rows, version: int):
+        self.version = version
+        self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        self.titles = [r[1] for r in rows]
+        self._rows = rows
+        self.pos = {int(pid): i for i, pid in enumerate(self.ids)}
+
+        cities = [r[2] for r in rows]
+        self.city_codes = {c: i for i, c in enumerate(sorted({c for c in cities if c}))}
+        self.city = np.fromiter((self.city_codes.get(c, -1) for c in cities), dtype=np.int32, count=len(rows))
+
+        vocab = sorted({a for r in rows for a in (r[9] or []) if isinstance(a, str)})
+        self.amenity_codes = {a: j for j, a in enumerate(vocab)}
+        self.amenities = np.zeros((len(rows), len(vocab)), dtype=bool)
+        for i, r in enumerate(rows):
+            for a in r[9] or []:
+                j = self.amenity_codes.get(a) if isinstance(a, str) else None
+                if j is not None:
+                    self.amenities[i, j] = True
+
+        self._prices: Dict[tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions(self, prop_ids) -> np.ndarray:
+        """Posições (únicas) dos ids presentes no catálogo; ids ausentes são ignorados."""
+        pos = [self.pos[p] for p in prop_ids if p in self.pos]
+        return np.unique(np.asarray(pos, dtype=np.int64))
+
+    def features(self, i: int, tipo) -> Dict:
+        r = self._rows[i]
+        return {
+            'tipo': tipo,
+            'cidade': r[2],
+            'area_m2': r[3] or 0,
+            'quartos': r[4] or 0,
+            'banheiros': r[5] or 0,
+            'vagas_garagem': r[6] or 0,
+            'condominio': float(r[7] or 0),
+            'iptu': float(r[8] or 0),
+        }
+
+    def prices(self, model, tipo) -> np.ndarray:
+        """Preço previsto de cada propriedade (uma predição em lote por modelo e tipo)."""
+        key = (model_version(model), tipo)
+        cached = self._prices.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            if key not in self._prices:
+                feats = [self.features(i, tipo) for i in range(len(self))]
+                self._prices[key] = np.asarray(model.predict_many(feats), dtype=float) if feats else np.zeros(0)
+            return self._prices[key]
+
+
+_CACHE: Dict[str, Optional[PersonalCatalogue]] = {'value': None}
+_LOCK = threading.Lock()
+
+
+def get_personal_catalogue(version: Optional[int] = None) -> PersonalCatalogue:
+    """Catálogo da versão atual; reconstruído só quando a versão do catálogo muda."""
+    from propriedades.models import Propriedade
+
+    version = catalogue_version() if version is None else version
+    cached = _CACHE['value']
+    if cached is not None and cached.version == version:
+        return cached
+    with _LOCK:
+        cached = _CACHE['value']
+        if cached is None or cached.version != version:
+            rows = list(
+                Propriedade.objects.filter(ativo=True).order_by('id')
+                .values_list(*CATALOGUE_FIELDS).iterator(chunk_size=2000)
+            )
+            cached = _CACHE['value'] = PersonalCatalogue(rows, version)
+        return cached
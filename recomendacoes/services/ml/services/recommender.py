@@ -1,30 +1,204 @@
 import os
 import csv
+import threading
 from typing import List, Dict, Optional
 
+import numpy as np
+
 BASE_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_CSV = os.path.join(os.path.dirname(BASE_APP_DIR), 'data', 'sample_properties.csv')
 
+class CandidateColumns:
+    """Candidatos em formato colunar: arrays NumPy para números, tuplas para textos.
+
+    Mantém o mesmo conteúdo dos dicts usados pelo recommender, porém compacto e
+    pronto para filtragem/pontuação vetorizada. `to_dicts()` reconstrói o formato antigo.
+    """
+    TEXT = ('title', 'city', 'neighborhood', 'property_type')
+    NUMERIC = (('area', np.float64), ('bedrooms', np.int64), ('bathrooms', np.int64), ('parking', np.int64))
+
+    def __init__(self, ids, title, city, neighborhood, area, bedrooms, bathrooms, parking, property_type, extra=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.title = tuple(title)
+        self.city = tuple(city)
+        self.neighborhood = tuple(neighborhood)
+        self.area = np.asarray(area, dtype=np.float64)
+        self.bedrooms = np.asarray(bedrooms, dtype=np.int64)
+        self.bathrooms = np.asarray(bathrooms, dtype=np.int64)
+        self.parking = np.asarray(parking, dtype=np.int64)
+        self.property_type = tuple(property_type)
+        # colunas opcionais (ex.: tipo, price, amenities) presentes só em algumas fontes
+        self.extra: Dict[str, tuple] = {k: tuple(v) for k, v in (extra or {}).items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_dicts(cls, items: List[Dict]) -> "CandidateColumns":
+        extra_keys = [k for k in ('tipo', 'price', 'amenities') if any(k in x for x in items)]
+        return cls(
+            ids=[x["id"] for x in items],
+            title=[x["title"] for x in items],
+            city=[x.get("city", "") or "" for x in items],
+            neighborhood=[x.get("neighborhood", "") or "" for x in items],
+            area=[x.get("area") or 0.0 for x in items],
+            bedrooms=[x.get("bedrooms") or 0 for x in items],
+            bathrooms=[x.get("bathrooms") or 0 for x in items],
+            parking=[x.get("parking") or 0 for x in items],
+            property_type=[x.get("property_type") for x in items],
+            extra={k: [x.get(k) for x in items] for k in extra_keys},
+        )
+
+    def take(self, idx) -> "CandidateColumns":
+        idx = np.asarray(idx, dtype=np.int64)
+        pick = lambda seq: [seq[i] for i in idx]  # noqa: E731
+        return CandidateColumns(
+            ids=self.ids[idx],
+            title=pick(self.title),
+            city=pick(self.city),
+            neighborhood=pick(self.neighborhood),
+            area=self.area[idx],
+            bedrooms=self.bedrooms[idx],
+            bathrooms=self.bathrooms[idx],
+            parking=self.parking[idx],
+            property_type=pick(self.property_type),
+            extra={k: pick(v) for k, v in self.extra.items()},
+        )
+
+    def city_mask(self, city: str):
+        c = city.lower()
+        return np.fromiter((x.lower() == c for x in self.city), dtype=bool, count=len(self))
+
+    def to_dicts(self) -> List[Dict]:
+        out = []
+        for i in range(len(self)):
+            d = {
+                "id": int(self.ids[i]),
+                "title": self.title[i],
+                "city": self.city[i],
+                "neighborhood": self.neighborhood[i],
+                "area": float(self.area[i]),
+                "bedrooms": int(self.bedrooms[i]),
+                "bathrooms": int(self.bathrooms[i]),
+                "parking": int(self.parking[i]),
+                "property_type": self.property_type[i],
+            }
+            for k, v in self.extra.items():
+                d[k] = v[i]
+            out.append(d)
+        return out
+
+
+# cache do CSV de amostra: (mtime_ns, tamanho) -> colunas já convertidas
+_SAMPLE_CACHE: Dict[str, object] = {"key": None, "columns": None}
+_SAMPLE_LOCK = threading.Lock()
+
+
+def _sample_columns() -> CandidateColumns:
+    """Colunas do CSV de amostra, relidas só quando mtime/tamanho do arquivo mudam."""
+    try:
+        st = os.stat(DATA_CSV)
+    except OSError:
+        return CandidateColumns.from_dicts([])
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _SAMPLE_CACHE["columns"]
+    if _SAMPLE_CACHE["key"] == key and cached is not None:
+        return cached
+    with _SAMPLE_LOCK:
+        if _SAMPLE_CACHE["key"] == key and _SAMPLE_CACHE["columns"] is not None:
+            return _SAMPLE_CACHE["columns"]
+        items = []
+        with open(DATA_CSV, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                items.append({
+                    "id": int(row["id"]),
+                    "title": row["title"],
+                    "city": row["city"],
+                    "neighborhood": row.get("neighborhood", "") or "",
+                    "area": float(row["area"]),
+                    "bedrooms": int(row["bedrooms"]),
+                    "bathrooms": int(row["bathrooms"]),
+                    "parking": int(row["parking"]),
+                    "property_type": row["property_type"],
+                })
+        cols = CandidateColumns.from_dicts(items)
+        _SAMPLE_CACHE["key"] = key
+        _SAMPLE_CACHE["columns"] = cols
+        return cols
+
+
 def _load_sample_candidates() -> List[Dict]:
     """Retorna candidatos de amostra do CSV (mantido por compatibilidade)."""
-    items = []
-    if not os.path.exists(DATA_CSV):
-        return items
-    with open(DATA_CSV, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            items.append({
-                "id": int(row["id"]),
-                "title": row["title"],
-                "city": row["city"],
-                "neighborhood": row.get("neighborhood", "") or "",
-                "area": float(row["area"]),
-                "bedrooms": int(row["bedrooms"]),
-                "bathrooms": int(row["bathrooms"]),
-                "parking": int(row["parking"]),
-                "property_type": row["property_type"],
-            })
-    return items
+    return _sample_columns().to_dicts()
+
+
+# Projeção declarada: campo de `propriedades.Propriedade` -> chave do candidato.
+# O modelo não tem tipo de imóvel; todos os candidatos do banco usam o default abaixo.
+CANDIDATE_DB_FIELDS = (
+    ('id', 'id'),
+    ('titulo', 'title'),
+    ('city', 'city'),
+    ('endereco', 'neighborhood'),
+    ('area_m2', 'area'),
+    ('quartos', 'bedrooms'),
+    ('banheiros', 'bathrooms'),
+    ('vagas_garagem', 'parking'),
+    ('preco_por_noite', 'price'),
+    ('comodidades', 'amenities'),
+)
+DB_DEFAULT_PROPERTY_TYPE = 'apartment'
+DB_DEFAULT_TIPO = 'Apartamento'
+CANDIDATE_CHUNK_SIZE = 2000
+
+
+def _db_columns(city: Optional[str] = None) -> CandidateColumns:
+    """Carrega candidatos ativos do banco via `values_list`, sem instanciar modelos.
+
+    Lê só as colunas de CANDIDATE_DB_FIELDS, em streaming (`iterator(chunk_size=...)`).
+    Com `city`, a pré-seleção usa o índice de `city_norm`; o filtro exato fica com `city_mask`.
+    """
+    try:
+        from propriedades.models import Propriedade, normalize_city
+    except Exception:
+        return CandidateColumns.from_dicts([])
+
+    db_fields = [f for f, _key in CANDIDATE_DB_FIELDS]
+    keys = [key for _f, key in CANDIDATE_DB_FIELDS]
+    data: Dict[str, list] = {key: [] for key in keys}
+    qs = Propriedade.objects.filter(ativo=True)
+    if city:
+        qs = qs.filter(city_norm=normalize_city(city))
+    qs = qs.values_list(*db_fields)
+    for row in qs.iterator(chunk_size=CANDIDATE_CHUNK_SIZE):
+        for key, value in zip(keys, row):
+            data[key].append(value)
+
+    n = len(data['id'])
+    return CandidateColumns(
+        ids=data['id'],
+        title=data['title'],
+        city=[v or '' for v in data['city']],
+        neighborhood=[v or '' for v in data['neighborhood']],
+        area=[v or 0 for v in data['area']],
+        bedrooms=[v or 0 for v in data['bedrooms']],
+        bathrooms=[v or 0 for v in data['bathrooms']],
+        parking=[v or 0 for v in data['parking']],
+        property_type=[DB_DEFAULT_PROPERTY_TYPE] * n,
+        extra={
+            'tipo': [DB_DEFAULT_TIPO] * n,
+            'price': [float(v or 0) for v in data['price']],
+            'amenities': [list(v or []) for v in data['amenities']],
+        },
+    )
+
+
+def _db_has_candidates() -> bool:
+    try:
+        from propriedades.models import Propriedade
+        return Propriedade.objects.filter(ativo=True).exists()
+    except Exception:
+        return False
 
 
 def _load_candidates_from_db() -> List[Dict]:
@@ -33,104 +207,97 @@ def _load_candidates_from_db() -> List[Dict]:
     Mapeia campos do modelo `propriedades.Propriedade` para o formato esperado
     pelo recommender (id, title, city, neighborhood, area, bedrooms, bathrooms, parking, property_type).
     """
-    try:
-        from propriedades.models import Propriedade
-    except Exception:
-        return []
+    return _db_columns().to_dicts()
 
-    qs = Propriedade.objects.filter(ativo=True)
-    items: List[Dict] = []
-    def _normalize_type(value: str) -> str:
-        if not value:
-            return 'apartment'
-        v = str(value).strip().lower()
-        mapping = {
-            'apartamento': 'apartment',
-            'apartment': 'apartment',
-            'studio': 'studio',
-            'kitnet': 'kitnet',
-            'casa': 'house',
-            'house': 'house',
+
+def en_to_pt_type(v: Optional[str]) -> str:
+    if not v:
+        return 'Apartamento'
+    vv = str(v).strip().lower()
+    mapping = {
+        'apartment': 'Apartamento',
+        'studio': 'Studio',
+        'kitnet': 'Kitnet',
+        'house': 'Casa',
+    }
+    return mapping.get(vv, v)
+
+
+MODEL_FEATURE_KEYS = ("tipo", "cidade", "area_m2", "quartos", "banheiros", "vagas_garagem", "condominio", "iptu")
+
+
+def _model_features(cols: CandidateColumns) -> List[Dict]:
+    """Mapeia candidatos para as features esperadas pelo modelo (PT-BR)."""
+    tipos = cols.extra.get("tipo") or (None,) * len(cols)
+    return [
+        {
+            "tipo": tipos[i] or en_to_pt_type(cols.property_type[i]),
+            "cidade": cols.city[i],
+            "area_m2": float(cols.area[i]) or 0.0,
+            "quartos": int(cols.bedrooms[i]) or 0,
+            "banheiros": int(cols.bathrooms[i]) or 0,
+            "vagas_garagem": int(cols.parking[i]) or 0,
+            "condominio": 0.0,
+            "iptu": 0.0,
         }
-        return mapping.get(v, v)
-
-    def _to_pt_type(value: str) -> str:
-        if not value:
-            return 'Apartamento'
-        v = str(value).strip().lower()
-        mapping = {
-            'apartment': 'Apartamento',
-            'apartamento': 'Apartamento',
-            'studio': 'Studio',
-            'kitnet': 'Kitnet',
-            'house': 'Casa',
-            'casa': 'Casa',
+        for i in range(len(cols))
+    ]
+
+
+def _predict_prices(model, features: List[Dict]):
+    """Prediz uma vez por assinatura de features distinta e replica o preço nos duplicados.
+
+    Listagens de um mesmo prédio costumam diferir só em id/título; o modelo não as distingue.
+    """
+    index: Dict[tuple, int] = {}
+    unique: List[Dict] = []
+    inverse = np.empty(len(features), dtype=np.int64)
+    for i, f in enumerate(features):
+        signature = tuple(f[k] for k in MODEL_FEATURE_KEYS)
+        j = index.get(signature)
+        if j is None:
+            j = index[signature] = len(unique)
+            unique.append(f)
+        inverse[i] = j
+    if hasattr(model, "predict_many"):
+        prices = np.asarray(model.predict_many(unique), dtype=float)
+    else:
+        prices = np.asarray([model.predict(f, return_details=False)[0] for f in unique], dtype=float)
+    return prices[inverse]
+
+
+def score_candidates(model, cols: CandidateColumns, budget: float, city: Optional[str], limit: int = 10) -> List[Dict]:
+    """Pontua candidatos colunares de forma vetorizada e devolve os `limit` melhores."""
+    if not len(cols):
+        return []
+    prices = _predict_prices(model, _model_features(cols))
+    diff = np.abs(prices - budget)
+    closeness = np.maximum(0.0, 1.0 - (diff / max(budget, 1.0)))  # 1 quando igual ao orçamento
+    affordable_bonus = np.where(prices <= budget, 0.2, 0.0)
+    city_bonus = cols.city_mask(city) * 0.1 if city else 0.0
+    scores = np.round(np.minimum(1.5, closeness + affordable_bonus + city_bonus), 4)
+    # mesma ordenação de antes: score desc, depois (-preço <= orçamento), estável na ordem de entrada
+    order = np.lexsort((np.arange(len(cols)), -(-prices <= budget).astype(int), -scores))[:limit]
+    return [
+        {
+            "id": int(cols.ids[i]),
+            "title": cols.title[i],
+            "city": cols.city[i],
+            "predicted_price": float(prices[i]),
+            "score": float(scores[i]),
         }
-        return mapping.get(v, value)
-
-    for p in qs:
-        # mapear mínimos; alguns campos podem não existir exatamente — usar defaults
-        ptype_raw = getattr(p, 'tipo', getattr(p, 'property_type', 'apartment'))
-        items.append({
-            "id": int(getattr(p, 'id')),
-            "title": getattr(p, 'titulo', str(p)),
-            "city": getattr(p, 'city', '') or '',
-            "neighborhood": getattr(p, 'endereco', '') or '',
-            # área e contagens podem não existir; tentar extrair de campos comuns
-            "area": float(getattr(p, 'area_m2', getattr(p, 'area', 0) or 0)),
-            "bedrooms": int(getattr(p, 'quartos', getattr(p, 'bedrooms', 0) or 0)),
-            "bathrooms": int(getattr(p, 'banheiros', getattr(p, 'bathrooms', 0) or 0)),
-            "parking": int(getattr(p, 'vagas_garagem', getattr(p, 'parking', 0) or 0)),
-            "property_type": _normalize_type(ptype_raw),
-            "tipo": getattr(p, 'tipo', None) or _to_pt_type(ptype_raw),
-            # campos específicos do app
-            "price": float(getattr(p, 'preco_por_noite', 0) or 0),
-            "amenities": list(getattr(p, 'comodidades', []) or []),
-        })
-    return items
+        for i in order
+    ]
+
 
 def recommend(model, candidates: Optional[List[Dict]], budget: float, city: Optional[str], limit: int = 10) -> List[Dict]:
     # Fonte de candidatos: prioridade para entrada explícita; depois banco; por fim CSV de amostra
-    items = candidates if candidates else (_load_candidates_from_db() or _load_sample_candidates())
+    if candidates:
+        cols = CandidateColumns.from_dicts(candidates)
+    else:
+        cols = _db_columns(city)
+        if not len(cols) and not _db_has_candidates():
+            cols = _sample_columns()
     if city:
-        items = [x for x in items if x.get("city", "").lower() == city.lower()]
-
-    out = []
-    def en_to_pt_type(v: Optional[str]) -> str:
-        if not v:
-            return 'Apartamento'
-        vv = str(v).strip().lower()
-        mapping = {
-            'apartment': 'Apartamento',
-            'studio': 'Studio',
-            'kitnet': 'Kitnet',
-            'house': 'Casa',
-        }
-        return mapping.get(vv, v)
-    for x in items:
-        # Mapear candidatos para as features esperadas pelo modelo (PT-BR)
-        features_model = {
-            "tipo": x.get("tipo") or en_to_pt_type(x.get("property_type")),
-            "cidade": x.get("city"),
-            "area_m2": x.get("area") or 0.0,
-            "quartos": x.get("bedrooms") or 0,
-            "banheiros": x.get("bathrooms") or 0,
-            "vagas_garagem": x.get("parking") or 0,
-            "condominio": 0.0,
-            "iptu": 0.0,
-        }
-        price, _method, _details = model.predict(features_model, return_details=False)
-        diff = abs(price - budget)
-        closeness = max(0.0, 1.0 - (diff / max(budget, 1.0)))  # 1 quando igual ao orçamento
-        affordable_bonus = 0.2 if price <= budget else 0.0
-        city_bonus = 0.1 if (city and x.get("city", "").lower() == city.lower()) else 0.0
-        score = round(min(1.5, closeness + affordable_bonus + city_bonus), 4)
-        out.append({
-            "id": x["id"],
-            "title": x["title"],
-            "city": x["city"],
-            "predicted_price": float(price),
-            "score": float(score),
-        })
-    out.sort(key=lambda d: (d["score"], -d["predicted_price"] <= budget), reverse=True)
-    return out[:limit]
+        cols = cols.take(np.flatnonzero(cols.city_mask(city)))
+    return score_candidates(model, cols, budget, city, limit=limit)
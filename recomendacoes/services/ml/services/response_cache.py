@@ -0,0 +1,92 @@
+"""Cache de respostas para os endpoints públicos de recomendação.
+
+A chave é a requisição normalizada (orçamento agrupado em faixas, filtros em
+minúsculas, limite) junto de um token das versões do catálogo e do modelo;
+alterações em `Propriedade` (campos de pontuação) ou um novo modelo geram
+chaves novas. O token vai também no cursor da paginação, para as páginas
+seguintes lerem o mesmo ranking da primeira (ver `views._ranked_page`).
+"""
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .versions import catalogue_version, model_version
+
+KEY_PREFIX = 'ml:reco'
+
+
+def _cache():
+    return caches[getattr(settings, 'ML_CACHE_ALIAS', 'default')]
+
+
+def bucket_budget(budget: Optional[float]) -> Optional[float]:
+    """Arredonda o orçamento para a granularidade configurada (0 desativa)."""
+    if budget is None:
+        return None
+    step = float(getattr(settings, 'ML_RESPONSE_CACHE_BUDGET_BUCKET', 50.0) or 0)
+    if step <= 0:
+        return float(budget)
+    return float(round(float(budget) / step) * step)
+
+
+def normalize_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normaliza os dados validados: textos em minúsculas, listas ordenadas, orçamento em faixas."""
+    out: Dict[str, Any] = {}
+    for k, v in data.items():
+        if v is None or v == '' or v == []:
+            continue
+        if k == 'budget':
+            out[k] = bucket_budget(v)
+        elif isinstance(v, str):
+            out[k] = v.strip().lower()
+        elif isinstance(v, (list, tuple)):
+            out[k] = sorted({str(x).strip().lower() for x in v if x})
+        else:
+            out[k] = v
+    return out
+
+
+def versions_token(model) -> str:
+    """Token curto das versões atuais do catálogo e do modelo."""
+    payload = json.dumps([catalogue_version(), model_version(model)], default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def cache_key(endpoint: str, normalized: Dict[str, Any], model, token: Optional[str] = None) -> str:
+    payload = json.dumps(
+        [endpoint, normalized, token or versions_token(model)],
+        sort_keys=True, default=str,
+    )
+    return f"{KEY_PREFIX}:{endpoint}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+def get_or_compute(endpoint: str, normalized: Dict[str, Any], model, compute: Callable[[], Any],
+                   token: Optional[str] = None):
+    """Retorna a resposta em cache ou chama `compute()` e guarda o resultado.
+
+    `token` fixa as versões da chave (padrão: as atuais, ver `versions_token`).
+    """
+    timeout = getattr(settings, 'ML_RESPONSE_CACHE_TIMEOUT', 300)
+    if not timeout:
+        return compute()
+    cache = _cache()
+    key = cache_key(endpoint, normalized, model, token)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    value = compute()
+    cache.set(key, value, timeout)
+    return value
+
+
+def get_pinned(endpoint: str, normalized: Dict[str, Any], model, token: str, compute: Callable[[], Any]):
+    """Resposta guardada com as versões de `token`; None se já expirou (ou o catálogo/modelo mudou antes de guardá-la).
+
+    Sem cache de respostas (timeout 0) não há o que fixar: recalcula com as versões atuais.
+    """
+    if not getattr(settings, 'ML_RESPONSE_CACHE_TIMEOUT', 300):
+        return compute()
+    return _cache().get(cache_key(endpoint, normalized, model, token))
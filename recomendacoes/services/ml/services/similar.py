@@ -0,0 +1,136 @@
+"""Índice de vizinhos mais próximos para o bloco "imóveis semelhantes".
+
+Cada propriedade ativa vira um vetor padronizado (área, quartos, banheiros,
+vagas, log do preço, bits de comodidades e one-hot da cidade) guardado numa
+BallTree do scikit-learn. O índice fica em memória e é reconstruído quando a
+versão do catálogo muda, no máximo a cada ML_SIMILAR_REBUILD_SECONDS; entre
+uma reconstrução e outra, imóveis novos são vetorizados na hora da consulta.
+"""
+import threading
+import time
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .versions import catalogue_version
+
+try:
+    from sklearn.neighbors import BallTree
+    SKLEARN_OK = True
+except Exception:
+    BallTree = None  # type: ignore
+    SKLEARN_OK = False
+
+INDEX_FIELDS = ('id', 'area_m2', 'quartos', 'banheiros', 'vagas_garagem', 'preco_por_noite', 'city', 'comodidades')
+AMENITY_WEIGHT = 0.5
+CITY_WEIGHT = 1.0
+
+
+def _amenity_codes():
+    from propriedades.models import AMENITIES_CHOICES
+
+    return [code for code, _label in AMENITIES_CHOICES]
+
+
+class SimilarIndex:
+    """Vetores padronizados das propriedades ativas e a árvore de busca sobre eles."""
+
+    def __init__(self, rows, version: int):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.amenities = _amenity_codes()
+        self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        self._pos = {int(pid): i for i, pid in enumerate(self.ids)}
+
+        num = self._numeric(rows)
+        with warnings.catch_warnings():
+            # colunas sem nenhum valor (ex.: área nunca preenchida) viram média 0 / desvio 1
+            warnings.simplefilter('ignore', RuntimeWarning)
+            self.mean = np.nan_to_num(np.nanmean(num, axis=0)) if len(rows) else np.zeros(num.shape[1])
+            self.std = np.nan_to_num(np.nanstd(num, axis=0)) if len(rows) else np.ones(num.shape[1])
+        self.std[self.std == 0] = 1.0
+        self.cities = {c: i for i, c in enumerate(sorted({self._city(r[6]) for r in rows} - {''}))}
+
+        self.X = self.vectorize(rows, num)
+        self.tree = BallTree(self.X) if SKLEARN_OK and len(rows) else None
+
+    @staticmethod
+    def _city(value) -> str:
+        return (value or '').strip().lower()
+
+    @staticmethod
+    def _numeric(rows) -> np.ndarray:
+        num = np.array([[r[1], r[2], r[3], r[4], r[5]] for r in rows], dtype=object).reshape(len(rows), 5)
+        num = np.where(num == None, np.nan, num).astype(np.float64)  # noqa: E711
+        num[:, 4] = np.log1p(np.clip(num[:, 4], 0, None))
+        return num
+
+    def vectorize(self, rows, num: Optional[np.ndarray] = None) -> np.ndarray:
+        """Converte linhas no formato de INDEX_FIELDS para o espaço do índice."""
+        num = self._numeric(rows) if num is None else num
+        num = (np.where(np.isnan(num), self.mean, num) - self.mean) / self.std
+        amen = np.zeros((len(rows), len(self.amenities)))
+        city = np.zeros((len(rows), len(self.cities)))
+        codes = {c: j for j, c in enumerate(self.amenities)}
+        for i, r in enumerate(rows):
+            for a in r[7] or []:
+                j = codes.get(str(a).strip().lower())
+                if j is not None:
+                    amen[i, j] = AMENITY_WEIGHT
+            j = self.cities.get(self._city(r[6]))
+            if j is not None:
+                city[i, j] = CITY_WEIGHT
+        return np.hstack([num, amen, city])
+
+    def query(self, row, k: int) -> List[Tuple[int, float]]:
+        """Os `k` vizinhos mais próximos de `row` (excluindo ela mesma): [(id, distância)]."""
+        if not len(self.ids) or k <= 0:
+            return []
+        i = self._pos.get(int(row[0]))
+        vec = self.X[i:i + 1] if i is not None else self.vectorize([row])
+        n = min(k + 1, len(self.ids))
+        if self.tree is not None:
+            dist, idx = self.tree.query(vec, k=n)
+            dist, idx = dist[0], idx[0]
+        else:
+            d = np.sqrt(((self.X - vec) ** 2).sum(axis=1))
+            idx = np.argpartition(d, n - 1)[:n]
+            idx = idx[np.argsort(d[idx], kind='stable')]
+            dist = d[idx]
+        out = [(int(self.ids[j]), float(dd)) for j, dd in zip(idx, dist) if int(self.ids[j]) != int(row[0])]
+        return out[:k]
+
+
+def build_similar_index(version: Optional[int] = None) -> SimilarIndex:
+    from propriedades.models import Propriedade
+
+    version = catalogue_version() if version is None else version
+    rows = list(Propriedade.objects.filter(ativo=True).values_list(*INDEX_FIELDS).iterator(chunk_size=2000))
+    return SimilarIndex(rows, version)
+
+
+_INDEX: Dict[str, Optional[SimilarIndex]] = {'value': None}
+_LOCK = threading.Lock()
+
+
+def get_similar_index() -> SimilarIndex:
+    """Índice em memória; reconstruído quando o catálogo muda (respeitando o intervalo mínimo)."""
+    version = catalogue_version()
+    index = _INDEX['value']
+    min_age = getattr(settings, 'ML_SIMILAR_REBUILD_SECONDS', 60)
+    if index is not None and (index.version == version or time.monotonic() - index.built_at < min_age):
+        return index
+    with _LOCK:
+        index = _INDEX['value']
+        if index is None or (index.version != version and time.monotonic() - index.built_at >= min_age):
+            index = _INDEX['value'] = build_similar_index(version)
+        return index
+
+
+def similar_properties(prop, k: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Ids e distâncias das propriedades mais parecidas com `prop`."""
+    k = k or getattr(settings, 'ML_SIMILAR_K', 6)
+    row = tuple(getattr(prop, f) for f in INDEX_FIELDS)
+    return get_similar_index().query(row, k)
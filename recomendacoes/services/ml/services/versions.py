@@ -0,0 +1,38 @@
+"""Versões usadas para invalidar caches de recomendação.
+
+A versão do catálogo vem de `propriedades.CatalogoVersao` (incrementada pelos
+signals de `Propriedade` quando muda um campo de `SCORING_FIELDS`, ver
+`recomendacoes.signals`, e uma vez por importação), com a leitura guardada
+por alguns segundos no cache do Django. Assim web, worker e comandos de
+manutenção enxergam a mesma versão.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+CATALOGUE_VERSION_KEY = 'ml:catalogue_version'
+
+
+def _cache():
+    return caches[getattr(settings, 'ML_CACHE_ALIAS', 'default')]
+
+
+def catalogue_version() -> int:
+    from propriedades.models import CatalogoVersao
+
+    cache = _cache()
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        version = CatalogoVersao.atual()
+        cache.set(CATALOGUE_VERSION_KEY, version, getattr(settings, 'ML_CATALOGUE_VERSION_TTL', 5))
+    return int(version)
+
+
+def bump_catalogue_version() -> None:
+    from propriedades.models import CatalogoVersao
+
+    CatalogoVersao.incrementar()
+    _cache().delete(CATALOGUE_VERSION_KEY)
+
+
+def model_version(model) -> str:
+    return str(getattr(model, 'version', None) or getattr(model, 'method', 'unknown'))
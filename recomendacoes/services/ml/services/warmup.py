@@ -0,0 +1,98 @@
+"""Aquecimento do processo que serve as recomendações.
+
+O modelo de preço, o catálogo pessoal, o índice de semelhantes e os preços
+previstos ficam na memória de cada processo: só aquecem o servidor se
+`warm_process` rodar dentro dele (ver `WarmupView`, chamado pelo comando
+`warmup --url` no deploy). `refresh_recent_users` atualiza as recomendações
+persistidas no banco e vale para qualquer processo.
+"""
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+
+class WarmupError(Exception):
+    """Uma fase do aquecimento falhou (o nome da fase vai na mensagem)."""
+
+
+def timed(name: str, fn: Callable, timings: Dict[str, float], on_phase: Optional[Callable] = None):
+    """Executa `fn`, guarda a duração em `timings[name]`; erros viram WarmupError."""
+    t = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        raise WarmupError(f'Fase {name} falhou: {e}') from e
+    timings[name] = round(time.perf_counter() - t, 3)
+    if on_phase:
+        on_phase(name, timings[name])
+    return result
+
+
+def warm_process(timings: Optional[Dict[str, float]] = None, on_phase: Optional[Callable] = None):
+    """Carrega modelo, catálogo, índice de semelhantes e preços previstos neste processo.
+
+    Retorna (modelo, catálogo); as durações vão para `timings`.
+    """
+    from favoritos.models import UserPreferenceProfile
+
+    from .model import PriceModel
+    from .personal_catalogue import get_personal_catalogue
+    from .similar import get_similar_index
+
+    timings = {} if timings is None else timings
+
+    def build_catalogue():
+        get_similar_index()
+        return get_personal_catalogue()
+
+    model = timed('load_model', PriceModel.instance, timings, on_phase)
+    catalogue = timed('build_catalogue', build_catalogue, timings, on_phase)
+    timed('predict_prices', lambda: catalogue.prices(model, UserPreferenceProfile.DEFAULT_TIPO), timings, on_phase)
+    return model, catalogue
+
+
+def refresh_recent_users(model, days: int = 7, max_users: int = 1000, limit: Optional[int] = None,
+                         chunk_size: int = 200) -> int:
+    """Recomputa (só se desatualizadas) as recomendações persistidas dos usuários ativos recentemente."""
+    from favoritos.models import Favorito, UserPreferenceProfile, UserRecommendationState
+
+    from ..views import persist_personal_recommendations, personal_model_version, personal_stamp, score_personal_candidates
+    from .versions import catalogue_version
+
+    limit = limit or getattr(settings, 'FAVORITOS_RECOMMENDATIONS_LIMIT', 10)
+    since = timezone.now() - timedelta(days=days)
+    recent = Q(user__last_login__gte=since) | Q(user__favoritos__criado_em__gte=since)
+    profiles = list(
+        UserPreferenceProfile.objects.filter(recent, favorites_count__gt=0).distinct()
+        .order_by('-user__last_login', 'user_id')[:max_users]
+    )
+    max_age = timedelta(seconds=getattr(settings, 'ML_PERSONAL_RECS_MAX_AGE_SECONDS', 6 * 3600))
+    mv, cv, now = personal_model_version(model), catalogue_version(), timezone.now()
+    states = {
+        s.user_id: s for s in UserRecommendationState.objects.filter(
+            source='personal', user_id__in=[p.user_id for p in profiles],
+        )
+    }
+    stale = [
+        p for p in profiles
+        if p.user_id not in states or not states[p.user_id].is_fresh(p.favorites_version, mv, cv, limit, max_age, now)
+    ]
+
+    size = max(1, chunk_size)
+    for i in range(0, len(stale), size):
+        chunk = stale[i:i + size]
+        fav_ids = {}
+        for user_id, prop_id in Favorito.objects.filter(
+            user_id__in=[p.user_id for p in chunk],
+        ).values_list('user_id', 'propriedade_id'):
+            fav_ids.setdefault(user_id, []).append(prop_id)
+        persist_personal_recommendations([
+            (p.user_id, score_personal_candidates(p, fav_ids.get(p.user_id, []), model, limit),
+             personal_stamp(p, model, cv, limit))
+            for p in chunk
+        ])
+    return len(stale)
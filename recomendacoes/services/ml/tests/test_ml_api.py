@@ -0,0 +1,461 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from recomendacoes.services.ml.services.response_cache import bucket_budget, normalize_request
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_normalize_request_buckets_budget_and_lowercases(settings):
+    settings.ML_RESPONSE_CACHE_BUDGET_BUCKET = 100.0
+    params = normalize_request({'budget': 2040.0, 'city': ' Curitiba ', 'amenities': ['TV', 'wifi'], 'limit': 5, 'neighborhood': ''})
+    assert params == {'budget': 2000.0, 'city': 'curitiba', 'amenities': ['tv', 'wifi'], 'limit': 5}
+    assert bucket_budget(2050.0) == 2000.0  # round-half-even
+    settings.ML_RESPONSE_CACHE_BUDGET_BUCKET = 0
+    assert bucket_budget(2040.0) == 2040.0
+
+
+@pytest.mark.django_db
+def test_recommend_repeated_query_is_served_from_cache(client):
+    url = reverse('recomendacoes_ml:recommend')
+    body = {'budget': 2010, 'city': 'Curitiba', 'limit': 3}
+    with patch('recomendacoes.services.ml.views.reco_recommend', return_value=[]) as reco:
+        assert client.post(url, body, content_type='application/json').status_code == 200
+        assert client.post(url, {**body, 'budget': 1990, 'city': 'curitiba'}, content_type='application/json').status_code == 200
+    assert reco.call_count == 1
+    assert reco.call_args.kwargs['budget'] == 2000.0
+
+
+@pytest.mark.django_db
+def test_survey_cache_invalidated_when_catalogue_changes(client):
+    from django.contrib.auth.models import User
+    from propriedades.models import Propriedade
+
+    url = reverse('recomendacoes_ml:survey_recommend')
+    body = {'budget': 2000, 'city': 'Curitiba'}
+    with patch('recomendacoes.services.ml.views._survey_recommend', return_value=[]) as survey:
+        client.post(url, body, content_type='application/json')
+        client.post(url, body, content_type='application/json')
+        owner = User.objects.create_user(username='cache_owner', password='x')
+        Propriedade.objects.create(owner=owner, titulo='Nova casa', preco_por_noite='100.00')
+        client.post(url, body, content_type='application/json')
+    assert survey.call_count == 2
+
+
+@pytest.mark.django_db
+def test_catalogue_version_bumps_only_on_scoring_fields():
+    from django.contrib.auth.models import User
+    from avaliacoes.models import Avaliacao
+    from propriedades.models import CatalogoVersao, Propriedade
+
+    owner = User.objects.create_user(username='versao_owner', password='x')
+    prop = Propriedade.objects.create(owner=owner, titulo='Casa versao', preco_por_noite='100.00', city='Natal')
+    v0 = CatalogoVersao.atual()
+    prop = Propriedade.objects.get(pk=prop.pk)
+    prop.descricao = 'Nova descrição'
+    prop.save()
+    Avaliacao.objects.create(autor=owner, propriedade=prop, nota=4)
+    Propriedade.objects.get(pk=prop.pk).save()
+    assert CatalogoVersao.atual() == v0
+    prop.preco_por_noite = '150.00'
+    prop.save()
+    assert CatalogoVersao.atual() == v0 + 1
+    prop.comodidades = ['wifi']
+    prop.save(update_fields=['comodidades'])
+    assert CatalogoVersao.atual() == v0 + 2
+
+
+@pytest.mark.django_db
+def test_recommend_cursor_pages_slice_one_ranking(client):
+    url = reverse('recomendacoes_ml:recommend')
+    ranked = [{'id': i, 'title': f'Imovel {i}', 'city': 'Curitiba', 'predicted_price': 1000.0, 'score': 1.0} for i in range(5)]
+    with patch('recomendacoes.services.ml.views.reco_recommend', return_value=ranked) as reco:
+        first = client.post(url, {'budget': 1000, 'limit': 2}, content_type='application/json')
+        second = client.post(url, {'budget': 1000, 'limit': 2, 'cursor': first['X-Next-Cursor']}, content_type='application/json')
+        third = client.post(url, {'budget': 1000, 'limit': 2, 'cursor': second['X-Next-Cursor']}, content_type='application/json')
+        other_query = client.post(url, {'budget': 5000, 'limit': 2, 'cursor': first['X-Next-Cursor']}, content_type='application/json')
+    assert reco.call_count == 1
+    assert [x['id'] for x in first.json()] == [0, 1]
+    assert [x['id'] for x in second.json()] == [2, 3]
+    assert [x['id'] for x in third.json()] == [4]
+    assert 'X-Next-Cursor' not in third
+    assert other_query.status_code == 400
+
+
+@pytest.mark.django_db
+def test_recommend_cursor_keeps_ranking_when_catalogue_changes_between_pages(client):
+    from recomendacoes.services.ml.services.versions import bump_catalogue_version
+
+    url = reverse('recomendacoes_ml:recommend')
+    before = [{'id': i, 'title': f'Imovel {i}', 'city': 'Curitiba', 'predicted_price': 1000.0, 'score': 1.0} for i in range(5)]
+    after = [{**before[0], 'id': 99}] + before
+    with patch('recomendacoes.services.ml.views.reco_recommend', side_effect=[before, after]) as reco:
+        first = client.post(url, {'budget': 1000, 'limit': 2}, content_type='application/json')
+        bump_catalogue_version()
+        second = client.post(url, {'budget': 1000, 'limit': 2, 'cursor': first['X-Next-Cursor']}, content_type='application/json')
+        third = client.post(url, {'budget': 1000, 'limit': 2, 'cursor': second['X-Next-Cursor']}, content_type='application/json')
+        fresh = client.post(url, {'budget': 1000, 'limit': 2}, content_type='application/json')
+        cache.clear()
+        expired = client.post(url, {'budget': 1000, 'limit': 2, 'cursor': second['X-Next-Cursor']}, content_type='application/json')
+    ids = [x['id'] for r in (first, second, third) for x in r.json()]
+    assert ids == [0, 1, 2, 3, 4]
+    assert [x['id'] for x in fresh.json()] == [99, 0]
+    assert reco.call_count == 2
+    assert expired.status_code == 400
+
+
+@pytest.mark.django_db
+def test_recommend_explicit_candidates_ranked_once_across_pages(client):
+    url = reverse('recomendacoes_ml:recommend')
+    candidates = [
+        {'id': i, 'title': f'C {i}', 'city': 'Natal', 'area': 50, 'bedrooms': 1, 'bathrooms': 1, 'parking': 0,
+         'property_type': 'apartment'}
+        for i in range(5)
+    ]
+    ranked = [{'id': i, 'title': f'C {i}', 'city': 'Natal', 'predicted_price': 1000.0, 'score': 1.0} for i in range(5)]
+    body = {'budget': 1000, 'limit': 2, 'candidates': candidates}
+    with patch('recomendacoes.services.ml.views.reco_recommend', return_value=ranked) as reco:
+        first = client.post(url, body, content_type='application/json')
+        second = client.post(url, {**body, 'cursor': first['X-Next-Cursor']}, content_type='application/json')
+        third = client.post(url, {**body, 'cursor': second['X-Next-Cursor']}, content_type='application/json')
+    assert reco.call_count == 1
+    assert [x['id'] for x in second.json()] == [2, 3]
+    assert [x['id'] for x in third.json()] == [4]
+
+
+class _FakePriceModel:
+    version = 'fake:1'
+
+    def predict(self, features, return_details=False):
+        return 120.0, 'fake', None
+
+    def predict_many(self, features_list):
+        return [120.0] * len(features_list)
+
+
+@pytest.mark.django_db
+def test_personal_recommendations_reused_until_favorites_change(client):
+    from django.contrib.auth.models import User
+    from favoritos.models import Favorito
+    from propriedades.models import Propriedade
+
+    user = User.objects.create_user(username='leitor', password='x')
+    owner = User.objects.create_user(username='anfitriao', password='x')
+    props = [Propriedade.objects.create(owner=owner, titulo=f'Casa {i}', preco_por_noite='100.00', city='Curitiba') for i in range(4)]
+    Favorito.objects.create(user=user, propriedade=props[0])
+    client.force_login(user)
+    url = reverse('recomendacoes_ml:personal_recommend')
+
+    with patch('recomendacoes.services.ml.views.PriceModel.instance', return_value=_FakePriceModel()):
+        first = client.post(url, {'limit': 3}, content_type='application/json').json()
+        second = client.post(url, {'limit': 3}, content_type='application/json').json()
+        Favorito.objects.create(user=user, propriedade=props[1])
+        third = client.post(url, {'limit': 3}, content_type='application/json').json()
+
+    assert first['status'] == 'ok' and 'cached' not in first
+    assert second['cached'] is True
+    assert [r['id'] for r in second['results']] == [r['id'] for r in first['results']]
+    assert second['results'][0]['reasons'] == first['results'][0]['reasons']
+    assert 'cached' not in third
+    assert props[1].id not in [r['id'] for r in third['results']]
+
+
+@pytest.mark.django_db
+def test_recompute_command_refreshes_only_stale_users(tmp_path, settings):
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from favoritos.models import Favorito, UserRecommendationState
+    from propriedades.models import Propriedade
+
+    settings.ML_RECOMPUTE_CHECKPOINT = str(tmp_path / 'checkpoint.json')
+    owner = User.objects.create_user(username='lote_owner', password='x')
+    props = [Propriedade.objects.create(owner=owner, titulo=f'Lote {i}', preco_por_noite='100.00') for i in range(3)]
+    users = [User.objects.create_user(username=f'lote{i}', password='x') for i in range(3)]
+    for u in users:
+        Favorito.objects.create(user=u, propriedade=props[0])
+
+    with patch('recomendacoes.services.ml.services.model.PriceModel.instance', return_value=_FakePriceModel()):
+        call_command('recompute_recommendations', workers=1, chunk_size=2, stdout=open(os.devnull, 'w'))
+        assert UserRecommendationState.objects.count() == 3
+        first_run = dict(UserRecommendationState.objects.values_list('user_id', 'generated_at'))
+
+        Favorito.objects.create(user=users[1], propriedade=props[1])
+        call_command('recompute_recommendations', workers=1, only_stale=True, stdout=open(os.devnull, 'w'))
+
+    second_run = dict(UserRecommendationState.objects.values_list('user_id', 'generated_at'))
+    changed = {uid for uid in second_run if second_run[uid] != first_run[uid]}
+    assert changed == {users[1].id}
+    assert not os.path.exists(settings.ML_RECOMPUTE_CHECKPOINT)
+
+
+@pytest.mark.django_db
+def test_persist_personal_recommendations_upserts_only_changes():
+    from django.contrib.auth.models import User
+    from favoritos.models import UserRecommendation
+    from propriedades.models import Propriedade
+    from recomendacoes.services.ml.views import persist_personal_recommendations
+
+    user = User.objects.create_user(username='upsert', password='x')
+    owner = User.objects.create_user(username='upsert_owner', password='x')
+    a, b, c = (Propriedade.objects.create(owner=owner, titulo=f'Up {i}', preco_por_noite='100.00') for i in range(3))
+    stamp = {'favorites_version': 1, 'model_version': 'fake:1', 'catalogue_version': 1, 'limit': 2, 'avg_price': 100.0}
+
+    def row(p, score):
+        return {'id': p.id, 'score': score, 'predicted_price': 99.5, 'reasons': ['x']}
+
+    persist_personal_recommendations([(user.id, [row(a, 0.9), row(b, 0.5)], stamp)])
+    before = {r.propriedade_id: r for r in UserRecommendation.objects.filter(user=user)}
+
+    persist_personal_recommendations([(user.id, [row(a, 0.9), row(c, 0.7)], stamp)])
+    after = {r.propriedade_id: r for r in UserRecommendation.objects.filter(user=user)}
+
+    assert set(after) == {a.id, c.id}
+    assert after[a.id].pk == before[a.id].pk
+    assert after[a.id].generated_at == before[a.id].generated_at  # inalterada: não reescrita
+    assert after[c.id].score == 0.7
+
+    persist_personal_recommendations([(user.id, [row(a, 0.95), row(c, 0.7)], stamp)])
+    updated = UserRecommendation.objects.get(user=user, propriedade=a)
+    assert updated.pk == before[a.id].pk and updated.score == 0.95
+
+
+def test_item_similarity_keeps_top_neighbors_by_cosine(tmp_path):
+    from recomendacoes.services.ml.services.item_similarity import (
+        build_item_similarity, load_item_similarity, save_item_similarity,
+    )
+
+    # 10 e 20 aparecem sempre juntos; 30 só divide um usuário com 10
+    interactions = [(1, 10, 1.0), (1, 20, 1.0), (2, 10, 1.0), (2, 20, 2.0), (3, 10, 1.0), (3, 30, 1.0)]
+    sim = build_item_similarity(interactions, top_n=1)
+    ids, sims = sim.neighbors(10)
+    assert ids.tolist() == [20] and sims.dtype.name == 'float32'
+    assert sim.neighbors(99)[0].size == 0
+
+    path = str(tmp_path / 'sim.npz')
+    save_item_similarity(sim, path)
+    loaded = load_item_similarity(path)
+    assert load_item_similarity(path) is loaded
+    assert loaded.scores_for([20]) == pytest.approx(sim.scores_for([20]))
+
+
+@pytest.mark.django_db
+def test_personal_recommendations_blend_item_similarity(tmp_path, settings):
+    from django.contrib.auth.models import User
+    from favoritos.models import Favorito, UserPreferenceProfile
+    from propriedades.models import Propriedade
+    from recomendacoes.services.ml.services import item_similarity
+    from recomendacoes.services.ml.views import score_personal_candidates
+
+    owner = User.objects.create_user(username='cf_owner', password='x')
+    user = User.objects.create_user(username='cf_user', password='x')
+    fav, a, b = (Propriedade.objects.create(owner=owner, titulo=f'CF {i}', preco_por_noite='100.00') for i in range(3))
+    Favorito.objects.create(user=user, propriedade=fav)
+    profile = UserPreferenceProfile.objects.get(user=user)
+
+    base = score_personal_candidates(profile, [fav.id], _FakePriceModel(), 2)
+    assert base[0]['score'] == base[1]['score']
+
+    path = tmp_path / 'sim.npz'
+    item_similarity.save_item_similarity(item_similarity.build_item_similarity([(7, fav.id, 1.0), (7, b.id, 2.0)]), str(path))
+    with patch.object(item_similarity, 'SIMILARITY_PATH', str(path)):
+        blended = score_personal_candidates(profile, [fav.id], _FakePriceModel(), 2)
+    assert blended[0]['id'] == b.id
+    assert blended[0]['score'] > blended[1]['score']
+    assert any('também curtiu' in r for r in blended[0]['reasons'])
+
+
+@pytest.mark.django_db
+def test_similar_properties_endpoint_returns_nearest_neighbours(client, settings):
+    from django.contrib.auth.models import User
+    from propriedades.models import Propriedade
+    from recomendacoes.services.ml.services import similar
+
+    settings.ML_SIMILAR_REBUILD_SECONDS = 0
+    similar._INDEX['value'] = None
+    owner = User.objects.create_user(username='knn_owner', password='x')
+
+    def make(titulo, city, area, quartos, preco, comodidades=()):
+        return Propriedade.objects.create(
+            owner=owner, titulo=titulo, city=city, area_m2=area, quartos=quartos,
+            preco_por_noite=preco, comodidades=list(comodidades),
+        )
+
+    base = make('Base', 'Curitiba', 60, 2, '200.00', ['wifi'])
+    twin = make('Gêmeo', 'Curitiba', 62, 2, '210.00', ['wifi'])
+    far = make('Mansão', 'Recife', 400, 6, '2000.00', ['piscina'])
+    make('Inativo', 'Curitiba', 60, 2, '200.00', ['wifi']).delete()
+
+    resp = client.get(reverse('recomendacoes_ml:similar', args=[base.pk]), {'k': 2})
+    assert resp.status_code == 200
+    assert [r['id'] for r in resp.json()] == [twin.id, far.id]
+
+    detail = client.get(reverse('propriedades:detalhe', args=[base.pk]))
+    assert detail.context['similares'][0] == twin
+
+
+def test_als_ranks_items_from_the_users_taste_cluster():
+    from recomendacoes.services.ml.services.als import train_als
+
+    # usuários 1-3 interagem com 10-13, usuários 4-6 com 20-23
+    interactions = [(u, i, 1.0) for u in (1, 2, 3) for i in (10, 11, 12)]
+    interactions += [(2, 13, 1.0), (3, 13, 1.0)]
+    interactions += [(u, i, 1.0) for u in (4, 5, 6) for i in (20, 21, 22, 23)]
+    model = train_als(interactions, factors=4, iterations=8, workers=2, chunk=2)
+
+    assert model.user_factors.dtype.name == 'float32'
+    top = model.recommend(1, 1, exclude=[10, 11, 12])
+    assert [pid for pid, _s in top] == [13]
+    assert model.recommend(99, 3) == []
+
+
+@pytest.mark.django_db
+def test_mf_recommend_endpoint_skips_favorites_and_inactive(client, tmp_path):
+    from django.contrib.auth.models import User
+    from favoritos.models import Favorito
+    from propriedades.models import Propriedade
+    from recomendacoes.services.ml.services import als
+
+    owner = User.objects.create_user(username='als_owner', password='x')
+    user = User.objects.create_user(username='als_user', password='x')
+    props = [Propriedade.objects.create(owner=owner, titulo=f'ALS {i}', preco_por_noite='100.00') for i in range(3)]
+    Favorito.objects.create(user=user, propriedade=props[0])
+    Propriedade.objects.filter(pk=props[2].pk).update(ativo=False)
+
+    model = als.AlsModel([user.id], [p.id for p in props], [[1.0, 0.0]], [[0.9, 0.0], [0.5, 0.0], [0.8, 0.0]])
+    path = tmp_path / 'als.npz'
+    als.save_als(model, str(path))
+    client.force_login(user)
+    with patch.object(als, 'ALS_PATH', str(path)):
+        out = client.post(reverse('recomendacoes_ml:mf_recommend'), {'limit': 5}, content_type='application/json').json()
+    assert out['status'] == 'ok'
+    assert [r['id'] for r in out['results']] == [props[1].id]
+
+
+@pytest.mark.django_db
+def test_personal_scoring_uses_cached_catalogue_matrix():
+    from django.contrib.auth.models import User
+    from favoritos.models import Favorito, UserPreferenceProfile
+    from propriedades.models import Propriedade
+    from recomendacoes.services.ml.services.personal_catalogue import get_personal_catalogue
+    from recomendacoes.services.ml.views import score_personal_candidates
+
+    owner = User.objects.create_user(username='mat_owner', password='x')
+    user = User.objects.create_user(username='mat_user', password='x')
+    fav = Propriedade.objects.create(owner=owner, titulo='Fav', preco_por_noite='100.00', city='Natal', comodidades=['wifi', 'tv'])
+    for i in range(5):
+        Propriedade.objects.create(owner=owner, titulo=f'Outra {i}', preco_por_noite='100.00', city='Recife')
+    Favorito.objects.create(user=user, propriedade=fav)
+    profile = UserPreferenceProfile.objects.get(user=user)
+    model = _FakePriceModel()
+
+    catalogue = get_personal_catalogue()
+    assert score_personal_candidates(profile, [fav.id], model, 10)[0]['id'] != fav.id
+    assert get_personal_catalogue() is catalogue
+
+    # avaliação e edição fora de SCORING_FIELDS não reconstroem o catálogo
+    from avaliacoes.models import Avaliacao
+
+    Avaliacao.objects.create(autor=user, propriedade=fav, nota=5)
+    fav = Propriedade.objects.get(pk=fav.pk)
+    fav.descricao = 'Reformado'
+    fav.save()
+    cache.clear()  # sem a leitura da versão em cache: relida do banco
+    assert get_personal_catalogue() is catalogue
+
+    # a última linha do catálogo é a melhor: mesma cidade do favorito
+    best = Propriedade.objects.create(owner=owner, titulo='Match', preco_por_noite='100.00', city='Natal', comodidades=['tv', 'wifi'])
+    top = score_personal_candidates(profile, [fav.id], model, 2)
+    assert get_personal_catalogue() is not catalogue
+    assert top[0]['id'] == best.id
+    assert 'Cidade de seus favoritos' in top[0]['reasons']
+    assert fav.id not in [r['id'] for r in score_personal_candidates(profile, [fav.id], model, 100)]
+
+
+@pytest.mark.django_db
+def test_warmup_reports_phases_and_refreshes_recent_users():
+    import io
+    import json
+    from datetime import timedelta
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.utils import timezone
+    from favoritos.models import Favorito, UserRecommendationState
+    from propriedades.models import Propriedade
+
+    owner = User.objects.create_user(username='warm_owner', password='x')
+    props = [Propriedade.objects.create(owner=owner, titulo=f'Warm {i}', preco_por_noite='100.00') for i in range(3)]
+    recent = User.objects.create_user(username='warm_recent', password='x')
+    idle = User.objects.create_user(username='warm_idle', password='x')
+    for u in (recent, idle):
+        Favorito.objects.create(user=u, propriedade=props[0])
+    long_ago = timezone.now() - timedelta(days=60)
+    Favorito.objects.filter(user=idle).update(criado_em=long_ago)
+    User.objects.filter(pk=idle.pk).update(last_login=long_ago)
+
+    def run():
+        out = io.StringIO()
+        with patch('recomendacoes.services.ml.services.model.PriceModel.instance', return_value=_FakePriceModel()):
+            call_command('warmup', json=True, stdout=out)
+        return json.loads(out.getvalue())
+
+    report = run()
+    assert set(report['phases']) == {'load_model', 'build_catalogue', 'predict_prices', 'refresh_recommendations'}
+    assert report['users_refreshed'] == 1 and report['catalogue_size'] == 3
+    assert list(UserRecommendationState.objects.values_list('user_id', flat=True)) == [recent.id]
+    assert run()['users_refreshed'] == 0
+
+
+@pytest.mark.django_db
+def test_warmup_endpoint_warms_the_serving_process(client, settings):
+    import io
+    import json
+
+    from django.contrib.auth.models import User
+    from django.core.management import CommandError, call_command
+    from propriedades.models import Propriedade
+    from recomendacoes.services.ml.services import personal_catalogue
+
+    owner = User.objects.create_user(username='warm_srv', password='x')
+    Propriedade.objects.create(owner=owner, titulo='Servidor', preco_por_noite='100.00')
+    personal_catalogue._CACHE['value'] = None
+    url = reverse('recomendacoes_ml:warmup')
+    settings.ML_WARMUP_TOKEN = 's3cret'
+    with patch('recomendacoes.services.ml.services.model.PriceModel.instance', return_value=_FakePriceModel()):
+        resp = client.post(url, HTTP_X_WARMUP_TOKEN='s3cret', REMOTE_ADDR='203.0.113.7')
+        assert resp.status_code == 200
+        assert resp.json()['catalogue_size'] == 1
+        assert personal_catalogue._CACHE['value'] is not None
+        # loopback não basta (atrás do proxy toda requisição é local); token errado também não
+        assert client.post(url).status_code == 403
+        assert client.post(url, HTTP_X_WARMUP_TOKEN='outro').status_code == 403
+        staff = User.objects.create_user(username='warm_staff', password='x', is_staff=True)
+        client.force_login(staff)
+        assert client.post(url).status_code == 200
+        client.logout()
+        settings.ML_WARMUP_TOKEN = ''
+        assert client.post(url, HTTP_X_WARMUP_TOKEN='').status_code == 403
+        settings.ML_WARMUP_TOKEN = 's3cret'
+
+        # o comando pede ao servidor que se aqueça e só recomputa as recomendações localmente
+        out = io.StringIO()
+        with patch('jobs.management.commands.warmup.Command._warm_server',
+                   return_value={'status': 'ok', 'phases': {'load_model': 0.1}, 'catalogue_size': 1}) as srv:
+            call_command('warmup', json=True, url='http://127.0.0.1:8000' + url, stdout=out)
+    report = json.loads(out.getvalue())
+    assert srv.call_count == 1
+    assert srv.call_args.args[1] == 's3cret'
+    settings.ML_WARMUP_TOKEN = ''
+    with pytest.raises(CommandError):
+        call_command('warmup', json=True, url='http://127.0.0.1:8000' + url, stdout=io.StringIO())
+    assert set(report['phases']) == {'warm_server', 'load_model', 'refresh_recommendations'}
+    assert report['server_phases'] == {'load_model': 0.1} and report['catalogue_size'] == 1
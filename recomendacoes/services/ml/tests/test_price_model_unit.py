@@ -37,3 +37,41 @@ def test_price_model_predict_positive():
     price, method, details = model.predict(test_features, return_details=True)
     assert price > 0
     assert isinstance(method, str)
+
+
+def test_version_and_predictions_follow_the_loaded_artifact(tmp_path, settings, monkeypatch):
+    if PriceModel is None:
+        pytest.skip("PriceModel não disponível para teste")
+    import joblib
+    from sklearn.dummy import DummyRegressor
+    from sklearn.pipeline import Pipeline
+
+    settings.ML_MODEL_RELOAD_CHECK_SECONDS = 0
+    path = tmp_path / 'price_model.joblib'
+
+    def dump(price):
+        joblib.dump(Pipeline([('rf', DummyRegressor(strategy='constant', constant=price).fit([[0]], [price]))]), path)
+
+    def load(self):
+        self.pipeline = joblib.load(path)
+        self.method = 'ml'
+        self.source_path = str(path)
+
+    monkeypatch.setattr(PriceModel, '_load_or_train', load)
+    monkeypatch.setattr(PriceModel, '_instance', None)
+    features = {'tipo': 'Apartamento', 'cidade': 'Natal', 'area_m2': 50}
+
+    dump(1000.0)
+    first = PriceModel.instance()
+    v1 = first.version
+    assert first.predict(features)[0] == 1000.0
+    assert PriceModel.instance() is first
+
+    dump(2000.0)
+    os.utime(path, ns=(first.source_mtime + 10**9, first.source_mtime + 10**9))
+    # a instância antiga continua com a versão do que carregou
+    assert first.version == v1
+    second = PriceModel.instance()
+    assert second is not first
+    assert second.version != v1
+    assert second.predict(features)[0] == 2000.0
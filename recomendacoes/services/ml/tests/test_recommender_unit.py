@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from recomendacoes.services.ml.services import recommender
+
+
+CSV_HEADER = "id,title,city,neighborhood,area,bedrooms,bathrooms,parking,property_type,price\n"
+
+
+class _FlatModel:
+    """Modelo falso: preço proporcional à área."""
+
+    def predict(self, features, return_details=False):
+        return float(features['area_m2']) * 50.0, 'fake', None
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(CSV_HEADER)
+        for r in rows:
+            f.write(r + "\n")
+
+
+def test_sample_columns_cached_until_file_changes(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'sample.csv'
+    _write_csv(csv_path, ["1,Apto A,Curitiba,Centro,50,2,1,0,apartment,2000"])
+    monkeypatch.setattr(recommender, 'DATA_CSV', str(csv_path))
+    monkeypatch.setitem(recommender._SAMPLE_CACHE, 'key', None)
+
+    first = recommender._sample_columns()
+    assert recommender._sample_columns() is first
+    assert len(first) == 1
+
+    _write_csv(csv_path, [
+        "1,Apto A,Curitiba,Centro,50,2,1,0,apartment,2000",
+        "2,Casa B,Curitiba,Batel,120,3,2,2,house,4000",
+    ])
+    st = os.stat(csv_path)
+    os.utime(csv_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    reloaded = recommender._sample_columns()
+    assert reloaded is not first
+    assert [c['id'] for c in recommender._load_sample_candidates()] == [1, 2]
+
+
+def test_recommend_scores_explicit_candidates_in_order():
+    candidates = [
+        {'id': 1, 'title': 'Pequeno', 'city': 'Curitiba', 'area': 20, 'bedrooms': 1, 'bathrooms': 1, 'parking': 0, 'property_type': 'studio'},
+        {'id': 2, 'title': 'Exato', 'city': 'Curitiba', 'area': 40, 'bedrooms': 2, 'bathrooms': 1, 'parking': 0, 'property_type': 'apartment'},
+        {'id': 3, 'title': 'Outra cidade', 'city': 'Recife', 'area': 40, 'bedrooms': 2, 'bathrooms': 1, 'parking': 0, 'property_type': 'apartment'},
+    ]
+    out = recommender.recommend(_FlatModel(), candidates, budget=2000.0, city='curitiba', limit=5)
+    assert [x['id'] for x in out] == [2, 1]
+    assert out[0]['predicted_price'] == 2000.0
+    assert out[0]['score'] == 1.3
+
+
+@pytest.mark.django_db
+def test_db_candidates_use_projection_and_defaults():
+    from django.contrib.auth.models import User
+    from propriedades.models import Propriedade
+
+    owner = User.objects.create_user(username='reco_owner', password='x')
+    p = Propriedade.objects.create(
+        owner=owner, titulo='Apto Projecao', city='Curitiba', endereco='Batel',
+        preco_por_noite='250.00', quartos=2, comodidades=['wifi'],
+    )
+    Propriedade.objects.create(owner=owner, titulo='Inativo', preco_por_noite='100.00', ativo=False)
+
+    items = recommender._load_candidates_from_db()
+    assert items == [{
+        'id': p.id, 'title': 'Apto Projecao', 'city': 'Curitiba', 'neighborhood': 'Batel',
+        'area': 0.0, 'bedrooms': 2, 'bathrooms': 0, 'parking': 0,
+        'property_type': 'apartment', 'tipo': 'Apartamento', 'price': 250.0, 'amenities': ['wifi'],
+    }]
+
+
+def test_recommend_predicts_once_per_feature_signature():
+    class _CountingModel(_FlatModel):
+        calls = 0
+
+        def predict(self, features, return_details=False):
+            type(self).calls += 1
+            return super().predict(features, return_details)
+
+    base = {'city': 'Curitiba', 'area': 40, 'bedrooms': 2, 'bathrooms': 1, 'parking': 0, 'property_type': 'apartment'}
+    candidates = [{**base, 'id': i, 'title': f'Unidade {i}'} for i in range(20)]
+    candidates.append({**base, 'id': 99, 'title': 'Cobertura', 'area': 90})
+
+    out = recommender.recommend(_CountingModel(), candidates, budget=2000.0, city=None, limit=50)
+    assert _CountingModel.calls == 2
+    assert len(out) == 21
+    assert {x['predicted_price'] for x in out} == {2000.0, 4500.0}
+
+
+@pytest.mark.django_db
+def test_db_candidates_prefiltered_by_normalized_city():
+    from django.contrib.auth.models import User
+    from propriedades.models import Propriedade
+
+    owner = User.objects.create_user(username='cidade_owner', password='x')
+    a = Propriedade.objects.create(owner=owner, titulo='A', city='Curitiba', preco_por_noite='100.00')
+    Propriedade.objects.create(owner=owner, titulo='B', city='Recife', preco_por_noite='100.00')
+    assert list(recommender._db_columns('CURITIBA').ids) == [a.id]
+    # cidade sem imóveis no banco: nada de cair no CSV de amostra
+    assert recommender.recommend(_FlatModel(), None, budget=100.0, city='Natal', limit=5) == []
@@ -8,5 +8,8 @@ urlpatterns = [
     path('recommend/', views.RecommendationView.as_view(), name='recommend'),
     path('survey_recommend/', views.SurveyRecommendationView.as_view(), name='survey_recommend'),
     path('retrain/', views.RetrainView.as_view(), name='retrain'),
+    path('warmup/', views.WarmupView.as_view(), name='warmup'),
+    path('similar/<int:pk>/', views.SimilarPropertiesView.as_view(), name='similar'),
     path('personal_recommend/', views.PersonalRecommendationView.as_view(), name='personal_recommend'),
+    path('mf_recommend/', views.MatrixFactorizationRecommendationView.as_view(), name='mf_recommend'),
 ]
@@ -1,7 +1,18 @@
+import hmac
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.permissions import BasePermission, IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 
 from .serializers import (
     PriceInputSerializer,
@@ -10,8 +21,15 @@ from .serializers import (
     RecommendationOutputItemSerializer,
     SurveyInputSerializer,
 )
+from .services.als import load_als
+from .services.item_similarity import load_item_similarity
 from .services.model import PriceModel
+from .services.personal_catalogue import get_personal_catalogue
 from .services.recommender import recommend as reco_recommend
+from .services.similar import similar_properties
+from .services.pagination import decode_cursor, paginate, ranked_limit, request_fingerprint
+from .services.response_cache import get_or_compute, get_pinned, normalize_request, versions_token
+from .services.versions import catalogue_version as current_catalogue_version, model_version
 
 
 class PricePredictionView(APIView):
@@ -42,10 +60,106 @@ class RecommendationView(APIView):
         candidates = serializer.validated_data.get("candidates")
 
         model = PriceModel.instance()
-        items = reco_recommend(model=model, candidates=candidates, budget=budget, city=city, limit=limit)
+        if candidates:
+            # candidatos explícitos: orçamento exato (sem faixas), ranking guardado por fingerprint da requisição
+            params = {"budget": budget, "city": city, "candidates": candidates}
+            fingerprint = request_fingerprint('recommend', params)
+            return _ranked_page(
+                'recommend_candidates', {"fingerprint": fingerprint}, model, fingerprint,
+                serializer.validated_data.get("cursor"), limit,
+                lambda: reco_recommend(model=model, candidates=candidates, budget=budget, city=city, limit=ranked_limit()),
+            )
+        params = normalize_request({"budget": budget, "city": city})
+        fingerprint = request_fingerprint('recommend', params)
+        return _ranked_page(
+            'recommend', params, model, fingerprint, serializer.validated_data.get("cursor"), limit,
+            lambda: reco_recommend(model=model, candidates=None, budget=params["budget"], city=params.get("city"), limit=ranked_limit()),
+        )
+
+
+def _ranked_page(endpoint, params, model, fingerprint, cursor, limit, compute):
+    """Página do ranking de `endpoint`: a primeira fixa as versões atuais, as seguintes leem o mesmo ranking.
+
+    Se o ranking daquelas versões já saiu do cache, o cursor expira (400) em vez de
+    fatiar um ranking diferente, o que pularia ou repetiria itens.
+    """
+    try:
+        offset, token = decode_cursor(cursor, fingerprint)
+    except ValueError as e:
+        raise ValidationError({'cursor': [str(e)]})
+    if token is None:
+        token = versions_token(model)
+        ranked = get_or_compute(endpoint, params, model, compute, token=token)
+    else:
+        ranked = get_pinned(endpoint, params, model, token, compute)
+        if ranked is None:
+            raise ValidationError({'cursor': ['Cursor expirado: recomece a paginação.']})
+    return _page_response(ranked, offset, limit, fingerprint, token)
+
+
+def _page_response(ranked, offset, limit, fingerprint, token=None):
+    """Fatia o ranking e expõe o cursor da próxima página no header `X-Next-Cursor`."""
+    page, next_cursor = paginate(ranked, offset, limit, fingerprint, token)
+    out = RecommendationOutputItemSerializer(page, many=True)
+    resp = Response(out.data, status=status.HTTP_200_OK)
+    if next_cursor:
+        resp['X-Next-Cursor'] = next_cursor
+    return resp
+
+
+def _survey_recommend(model, params):
+    """Filtra candidatos pelas respostas (já normalizadas) do survey e pontua."""
+    budget = params.get('budget')
+    city = params.get('city')
+    neighborhood = params.get('neighborhood')
+    ptype = params.get('property_type')
+    min_area = params.get('min_area')
+    max_area = params.get('max_area')
+    bedrooms = params.get('bedrooms')
+    bathrooms = params.get('bathrooms')
+    parking = params.get('parking')
+    limit = ranked_limit()
+    min_price = params.get('min_price')
+    max_price = params.get('max_price')
+    amenities = set(params.get('amenities') or [])
+
+    # candidatos: banco primeiro; se vazio, CSV de amostra
+    from .services.recommender import _load_candidates_from_db, _load_sample_candidates
+    candidates = _load_candidates_from_db() or _load_sample_candidates()
+
+    # filtrar por preferências do usuário
+    def match(c):
+        if city and c.get('city', '').lower() != city.lower():
+            return False
+        if neighborhood and c.get('neighborhood', '').lower() != neighborhood.lower():
+            return False
+        if ptype and c.get('property_type', '').lower() != ptype.lower():
+            return False
+        if min_area and c.get('area', 0) < min_area:
+            return False
+        if max_area and c.get('area', 0) > max_area:
+            return False
+        if bedrooms is not None and c.get('bedrooms', 0) < bedrooms:
+            return False
+        if bathrooms is not None and c.get('bathrooms', 0) < bathrooms:
+            return False
+        if parking is not None and c.get('parking', 0) < parking:
+            return False
+        # faixa de preço real da propriedade (quando disponível)
+        price = c.get('price')
+        if min_price is not None and isinstance(price, (int, float)) and price < min_price:
+            return False
+        if max_price is not None and isinstance(price, (int, float)) and price > max_price:
+            return False
+        # amenidades: exigir que o conjunto desejado esteja contido nas amenidades do candidato
+        if amenities:
+            cand_am = set([str(x).strip().lower() for x in (c.get('amenities') or [])])
+            if not amenities.issubset(cand_am):
+                return False
+        return True
 
-        out = RecommendationOutputItemSerializer(items, many=True)
-        return Response(out.data, status=status.HTTP_200_OK)
+    filtered = [c for c in candidates if match(c)]
+    return reco_recommend(model=model, candidates=filtered or candidates, budget=budget, city=city, limit=limit)
 
 
 class SurveyRecommendationView(APIView):
@@ -59,63 +173,15 @@ class SurveyRecommendationView(APIView):
         ser = SurveyInputSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
 
-        data = ser.validated_data
-        budget = data.get('budget')
-        city = data.get('city')
-        neighborhood = data.get('neighborhood')
-        ptype = data.get('property_type')
-        min_area = data.get('min_area')
-        max_area = data.get('max_area')
-        bedrooms = data.get('bedrooms')
-        bathrooms = data.get('bathrooms')
-        parking = data.get('parking')
-        limit = data.get('limit', 10)
-        min_price = data.get('min_price')
-        max_price = data.get('max_price')
-        amenities = set([a.strip().lower() for a in (data.get('amenities') or []) if a])
-
-        # candidatos: banco primeiro; se vazio, CSV de amostra
-        from .services.recommender import _load_candidates_from_db, _load_sample_candidates
-        candidates = _load_candidates_from_db() or _load_sample_candidates()
-
-        # filtrar por preferências do usuário
-        def match(c):
-            if city and c.get('city', '').lower() != city.lower():
-                return False
-            if neighborhood and c.get('neighborhood', '').lower() != neighborhood.lower():
-                return False
-            if ptype and c.get('property_type', '').lower() != ptype.lower():
-                return False
-            if min_area and c.get('area', 0) < min_area:
-                return False
-            if max_area and c.get('area', 0) > max_area:
-                return False
-            if bedrooms is not None and c.get('bedrooms', 0) < bedrooms:
-                return False
-            if bathrooms is not None and c.get('bathrooms', 0) < bathrooms:
-                return False
-            if parking is not None and c.get('parking', 0) < parking:
-                return False
-            # faixa de preço real da propriedade (quando disponível)
-            price = c.get('price')
-            if min_price is not None and isinstance(price, (int, float)) and price < min_price:
-                return False
-            if max_price is not None and isinstance(price, (int, float)) and price > max_price:
-                return False
-            # amenidades: exigir que o conjunto desejado esteja contido nas amenidades do candidato
-            if amenities:
-                cand_am = set([str(x).strip().lower() for x in (c.get('amenities') or [])])
-                if not amenities.issubset(cand_am):
-                    return False
-            return True
-
-        filtered = [c for c in candidates if match(c)]
-
+        data = dict(ser.validated_data)
+        limit = data.pop('limit', 10)
+        cursor = data.pop('cursor', None)
+        params = normalize_request(data)
+        fingerprint = request_fingerprint('survey_recommend', params)
         model = PriceModel.instance()
-        items = reco_recommend(model=model, candidates=filtered or candidates, budget=budget, city=city, limit=limit)
-
-        out = RecommendationOutputItemSerializer(items, many=True)
-        return Response(out.data, status=status.HTTP_200_OK)
+        return _ranked_page(
+            'survey_recommend', params, model, fingerprint, cursor, limit, lambda: _survey_recommend(model, params),
+        )
 
 
 class RetrainView(APIView):
@@ -143,107 +209,317 @@ class RetrainView(APIView):
             return Response({'status': 'error', 'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def compute_personal_recommendations_for_user(user, limit: int = 10):
-    """Compute personal recommendations for `user` and persist them.
+class HasWarmupTokenOrIsStaff(BasePermission):
+    """Staff, ou quem enviar `ML_WARMUP_TOKEN` no header `X-Warmup-Token` (pipeline de deploy).
 
-    Returns a dict compatible with the view response: {'status':..., 'results': [...], 'avg_price': ...}
+    O endereço de origem não conta: atrás de um proxy reverso toda requisição chega de 127.0.0.1.
     """
-    try:
-        from favoritos.models import Favorito, UserRecommendation
-        from propriedades.models import Propriedade
-    except Exception:
-        return {'status': 'error', 'detail': 'Imports failed', 'results': [], 'avg_price': 0.0}
 
-    favs = Favorito.objects.filter(user=user).select_related('propriedade')
-    if not favs:
-        return {'status': 'empty', 'detail': 'Nenhum favorito; personalize adicionando alguns.', 'results': [], 'avg_price': 0.0}
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        expected = getattr(settings, 'ML_WARMUP_TOKEN', '')
+        sent = request.headers.get('X-Warmup-Token', '')
+        return bool(expected) and hmac.compare_digest(sent.encode('utf-8'), expected.encode('utf-8'))
 
-    tipos = {}
-    cidades = {}
-    amenities_freq = {}
-    prices = []
-    for f in favs:
-        p = f.propriedade
-        t = (p.quartos, p.banheiros, p.vagas_garagem)
-        tipo = (getattr(p, 'tipo', None) or 'Apartamento')
-        tipos[tipo] = tipos.get(tipo, 0) + 1
-        if p.city:
-            cidades[p.city] = cidades.get(p.city, 0) + 1
-        prices.append(float(p.preco_por_noite))
-        for a in (p.comodidades or []):
-            amenities_freq[a] = amenities_freq.get(a, 0) + 1
-
-    avg_price = sum(prices) / len(prices) if prices else 0.0
-    tipo_pref = max(tipos, key=tipos.get) if tipos else None
-    cidade_pref = max(cidades, key=cidades.get) if cidades else None
-    amenity_top = {a for a, c in amenities_freq.items() if c >= 2}
-
-    # candidatos: ativos não favoritados
-    cand_qs = Propriedade.objects.filter(ativo=True).exclude(id__in=[f.propriedade.id for f in favs])
-    model = PriceModel.instance()
+
+class WarmupView(APIView):
+    """Aquece este processo servidor: modelo, catálogo pessoal, índice de semelhantes e preços previstos.
+
+    Chamado pelo `manage.py warmup --url` no deploy; responde 503 se alguma fase falhar.
+    """
+    permission_classes = [HasWarmupTokenOrIsStaff]
+
+    def post(self, request):
+        from .services.warmup import WarmupError, warm_process
+
+        timings = {}
+        try:
+            _model, catalogue = warm_process(timings)
+        except WarmupError as e:
+            return Response({'status': 'error', 'detail': str(e), 'phases': timings},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({'status': 'ok', 'phases': timings, 'catalogue_size': len(catalogue)})
+
+
+def catalogue_predicted_prices(model, tipo=None):
+    """Preço previsto de cada propriedade ativa (uma predição em lote para o catálogo).
+
+    Não depende do usuário; fica guardado no catálogo em memória por versão do modelo e tipo.
+    """
+    from favoritos.models import UserPreferenceProfile
+
+    catalogue = get_personal_catalogue()
+    prices = catalogue.prices(model, tipo or UserPreferenceProfile.DEFAULT_TIPO)
+    return dict(zip(catalogue.ids.tolist(), prices.tolist()))
+
+
+def score_personal_candidates(profile, fav_ids, model, limit, predicted_prices=None):
+    """Pontua todo o catálogo ativo (menos os favoritos) contra o perfil do usuário; retorna o top `limit`.
+
+    A pontuação é feita com operações vetorizadas sobre o catálogo em memória
+    (`personal_catalogue`); `predicted_prices` (id -> preço) sobrepõe as predições em cache.
+    """
+    catalogue = get_personal_catalogue()
+    n = len(catalogue)
+    if not n or limit <= 0:
+        return []
+    avg_price = profile.avg_price
+    tipo_pref = profile.tipo_pref
+    cidade_pref = profile.cidade_pref
+    amenity_top = profile.top_amenities()
+
+    prices = catalogue.prices(model, tipo_pref)
+    if predicted_prices:
+        prices = prices.copy()
+        for pid, price in predicted_prices.items():
+            i = catalogue.pos.get(pid)
+            if i is not None:
+                prices[i] = price
+    price_fit = np.maximum(0.0, 1.0 - np.abs(prices - avg_price) / max(avg_price, 1.0))
+
+    # o catálogo não tem coluna de tipo: toda propriedade conta como do tipo preferido
+    sim = np.full(n, 0.3 if tipo_pref else 0.0)
+    city_match = np.zeros(n, dtype=bool)
+    if cidade_pref and cidade_pref in catalogue.city_codes:
+        city_match = catalogue.city == catalogue.city_codes[cidade_pref]
+        sim += 0.2 * city_match
+    amen_cols = np.asarray(sorted(catalogue.amenity_codes[a] for a in amenity_top if a in catalogue.amenity_codes),
+                           dtype=np.int64)
+    overlap = catalogue.amenities[:, amen_cols].sum(axis=1) if len(amen_cols) else np.zeros(n, dtype=np.int64)
+    sim += 0.1 * np.minimum(overlap, 3)
+    score = price_fit * 0.5 + sim * 0.5
+
+    # vizinhos dos favoritos pela matriz item-item (co-ocorrência em favoritos/reservas)
+    similarity = load_item_similarity()
+    cf = np.zeros(n)
+    if similarity is not None:
+        for pid, value in similarity.scores_for(fav_ids).items():
+            i = catalogue.pos.get(pid)
+            if i is not None:
+                cf[i] = value
+    excluded = catalogue.positions(fav_ids)
+    cf[excluded] = 0.0
+    cf_max = cf.max()
+    if cf_max > 0:
+        cf /= cf_max
+        cf_weight = float(getattr(settings, 'ML_ITEM_SIMILARITY_WEIGHT', 0.3))
+        score = (1.0 - cf_weight) * score + cf_weight * cf
+    score = np.round(score, 4)
+    score[excluded] = -np.inf
+
+    # top `limit` por score decrescente, empates pela ordem do catálogo (id)
+    k = min(limit, n - len(excluded))
+    if k <= 0:
+        return []
+    threshold = np.partition(score, n - k)[n - k]
+    cand = np.flatnonzero(score >= threshold)
+    top = cand[np.lexsort((cand, -score[cand]))][:k]
+
+    amen_names = sorted(amenity_top, key=lambda a: catalogue.amenity_codes.get(a, -1))
     results = []
-    for p in cand_qs[:500]:
-        features_model = {
-            'tipo': getattr(p, 'tipo', tipo_pref),
-            'cidade': p.city,
-            'area_m2': p.area_m2 or 0,
-            'quartos': p.quartos or 0,
-            'banheiros': p.banheiros or 0,
-            'vagas_garagem': p.vagas_garagem or 0,
-            'condominio': float(p.condominio or 0),
-            'iptu': float(p.iptu or 0),
-        }
-        pred, _method, _details = model.predict(features_model, return_details=False)
-        budget_diff = abs(pred - avg_price)
-        price_fit = max(0.0, 1.0 - (budget_diff / max(avg_price, 1.0)))
-        sim = 0.0
-        overlap = set()
-        if tipo_pref and getattr(p, 'tipo', tipo_pref) == tipo_pref:
-            sim += 0.3
-        if cidade_pref and p.city and p.city == cidade_pref:
-            sim += 0.2
-        if amenity_top:
-            overlap = amenity_top.intersection(set(p.comodidades or []))
-            sim += 0.1 * min(len(overlap), 3)
-        final_score = round(price_fit * 0.5 + sim * 0.5, 4)
+    for i in top.tolist():
         reasons = []
-        if tipo_pref and getattr(p, 'tipo', tipo_pref) == tipo_pref:
+        if tipo_pref:
             reasons.append('Tipo que você favoritou')
-        if cidade_pref and p.city == cidade_pref:
+        if city_match[i]:
             reasons.append('Cidade de seus favoritos')
-        if overlap:
-            reasons.append(f"Amenidades em comum: {', '.join(list(overlap)[:3])}")
-        if price_fit > 0.7:
+        if overlap[i]:
+            common = [a for a in amen_names if a in catalogue.amenity_codes and catalogue.amenities[i, catalogue.amenity_codes[a]]]
+            reasons.append(f"Amenidades em comum: {', '.join(common[:3])}")
+        if price_fit[i] > 0.7:
             reasons.append('Dentro da sua faixa de preço média')
+        if cf[i] >= 0.5:
+            reasons.append('Quem favoritou o mesmo que você também curtiu')
         results.append({
-            'id': p.id,
-            'titulo': p.titulo,
-            'predicted_price': pred,
-            'score': final_score,
+            'id': int(catalogue.ids[i]),
+            'titulo': catalogue.titles[i],
+            'predicted_price': float(prices[i]),
+            'score': float(score[i]),
             'reasons': reasons,
         })
+    return results
+
+
+def persist_personal_recommendations(entries):
+    """Persiste recomendações pessoais de um ou mais usuários numa única transação.
+
+    `entries`: lista de (user_id, top, stamp), onde `stamp` traz as versões
+    gravadas em UserRecommendationState. Só linhas novas ou alteradas são
+    escritas (upsert) e só as que saíram do top são apagadas.
+    """
+    from favoritos.models import UserRecommendation, UserRecommendationState
+
+    if not entries:
+        return
+    now = timezone.now()
+    user_ids = [user_id for user_id, _top, _stamp in entries]
+    cents = Decimal('0.01')
+    upsert = connection.features.supports_update_conflicts_with_target
+    with transaction.atomic():
+        existing = {
+            (user_id, prop_id): (pk, score, price, reasons)
+            for pk, user_id, prop_id, score, price, reasons in UserRecommendation.objects.select_for_update()
+            .filter(user_id__in=user_ids, source='personal')
+            .values_list('id', 'user_id', 'propriedade_id', 'score', 'predicted_price', 'reasons')
+        }
+        keep, new, changed = set(), [], []
+        for user_id, top, _stamp in entries:
+            for r in top:
+                key = (user_id, r['id'])
+                keep.add(key)
+                price = Decimal(str(float(r['predicted_price']))).quantize(cents)
+                old = existing.get(key)
+                if old is not None and (old[1], old[2], old[3]) == (r['score'], price, r['reasons']):
+                    continue
+                rec = UserRecommendation(
+                    user_id=user_id,
+                    propriedade_id=r['id'],
+                    score=r['score'],
+                    predicted_price=price,
+                    source='personal',
+                    reasons=r['reasons'],
+                    generated_at=now,
+                )
+                if old is None:
+                    new.append(rec)
+                else:
+                    rec.pk = old[0]
+                    changed.append(rec)
+
+        dropped = [pk for key, (pk, *_rest) in existing.items() if key not in keep]
+        if dropped:
+            UserRecommendation.objects.filter(pk__in=dropped).delete()
+        rec_fields = ['score', 'predicted_price', 'reasons', 'generated_at']
+        if upsert:
+            for rec in changed:
+                rec.pk = None
+            UserRecommendation.objects.bulk_create(
+                new + changed, update_conflicts=True,
+                unique_fields=['user', 'propriedade', 'source'], update_fields=rec_fields, batch_size=500,
+            )
+        else:
+            UserRecommendation.objects.bulk_create(new, batch_size=500)
+            UserRecommendation.objects.bulk_update(changed, rec_fields, batch_size=500)
+
+        states = [UserRecommendationState(user_id=user_id, source='personal', generated_at=now, **stamp)
+                  for user_id, _top, stamp in entries]
+        state_fields = ['favorites_version', 'model_version', 'catalogue_version', 'limit', 'avg_price', 'generated_at']
+        if upsert:
+            UserRecommendationState.objects.bulk_create(
+                states, update_conflicts=True, unique_fields=['user', 'source'], update_fields=state_fields, batch_size=500,
+            )
+        else:
+            for st in states:
+                UserRecommendationState.objects.update_or_create(
+                    user_id=st.user_id, source=st.source,
+                    defaults={f: getattr(st, f) for f in state_fields},
+                )
+
+
+def compute_personal_recommendations_for_user(user, limit: int = 10, predicted_prices=None):
+    """Compute personal recommendations for `user` and persist them.
+
+    `predicted_prices` (id -> preço) permite reaproveitar predições já feitas para o catálogo.
+    Returns a dict compatible with the view response: {'status':..., 'results': [...], 'avg_price': ...}
+    """
+    try:
+        from favoritos.models import Favorito, UserPreferenceProfile
+    except Exception:
+        return {'status': 'error', 'detail': 'Imports failed', 'results': [], 'avg_price': 0.0}
 
-    # ordenar e limitar
-    results.sort(key=lambda r: r['score'], reverse=True)
-    top = results[:limit]
+    # perfil agregado mantido incrementalmente pelos signals de Favorito
+    profile = UserPreferenceProfile.objects.filter(user=user).first()
+    if profile is None and Favorito.objects.filter(user=user).exists():
+        profile = UserPreferenceProfile.rebuild(user)
+    if profile is None or not profile.favorites_count:
+        return {'status': 'empty', 'detail': 'Nenhum favorito; personalize adicionando alguns.', 'results': [], 'avg_price': 0.0}
+
+    fav_ids = list(Favorito.objects.filter(user=user).values_list('propriedade_id', flat=True))
+    # lido antes do cálculo: uma alteração concorrente no catálogo invalida este resultado
+    catalogue_version = current_catalogue_version()
+    model = PriceModel.instance()
+    top = score_personal_candidates(profile, fav_ids, model, limit, predicted_prices=predicted_prices)
 
-    # Persistir recomendações (limpa antigas da mesma fonte)
     try:
-        UserRecommendation.objects.filter(user=user, source='personal').delete()
-        bulk = [
-            UserRecommendation(
-                user=user,
-                propriedade_id=r['id'],
-                score=r['score'],
-                predicted_price=float(r['predicted_price']),
-                source='personal'
-            ) for r in top
-        ]
-        UserRecommendation.objects.bulk_create(bulk, ignore_conflicts=True)
+        persist_personal_recommendations([(user.pk, top, personal_stamp(profile, model, catalogue_version, limit))])
     except Exception:
         pass
 
-    return {'status': 'ok', 'results': top, 'avg_price': avg_price}
+    return {'status': 'ok', 'results': top, 'avg_price': profile.avg_price}
+
+
+def personal_model_version(model):
+    """Versão do modelo de preço mais a da matriz item-item, se houver uma carregada."""
+    similarity = load_item_similarity()
+    version = model_version(model)
+    return f'{version}+cf:{similarity.version}' if similarity is not None else version
+
+
+def personal_stamp(profile, model, catalogue_version, limit):
+    return {
+        'favorites_version': profile.favorites_version,
+        'model_version': personal_model_version(model),
+        'catalogue_version': catalogue_version,
+        'limit': limit,
+        'avg_price': profile.avg_price,
+    }
+
+
+def get_personal_recommendations_for_user(user, limit: int = 10):
+    """Serve as recomendações persistidas quando ainda válidas; senão recomputa.
+
+    Válidas = geradas há menos de ML_PERSONAL_RECS_MAX_AGE_SECONDS, com `limit`
+    suficiente e mesmas versões de favoritos, modelo e catálogo.
+    """
+    from favoritos.models import UserRecommendationState
+    from favoritos.tasks import persisted_recommendations
+
+    state = (
+        UserRecommendationState.objects.select_related('user__perfil_preferencias')
+        .filter(user=user, source='personal').first()
+    )
+    profile = getattr(state.user, 'perfil_preferencias', None) if state else None
+    if state is not None and profile is not None:
+        max_age = timedelta(seconds=getattr(settings, 'ML_PERSONAL_RECS_MAX_AGE_SECONDS', 6 * 3600))
+        fresh = state.is_fresh(
+            profile.favorites_version, personal_model_version(PriceModel.instance()), current_catalogue_version(),
+            limit, max_age, timezone.now(),
+        )
+        if fresh:
+            results = persisted_recommendations(user, limit=limit)
+            return {'status': 'ok', 'results': results, 'avg_price': state.avg_price, 'cached': True}
+    return compute_personal_recommendations_for_user(user, limit=limit)
+
+
+def similar_property_objects(prop, k=None):
+    """Propriedades ativas mais parecidas com `prop`, na ordem do índice k-NN."""
+    from propriedades.models import Propriedade
+
+    neighbours = similar_properties(prop, k)
+    by_id = Propriedade.objects.filter(ativo=True).in_bulk([pid for pid, _d in neighbours])
+    return [(by_id[pid], dist) for pid, dist in neighbours if pid in by_id]
+
+
+class SimilarPropertiesView(APIView):
+    """Imóveis semelhantes a uma propriedade (vizinhos mais próximos no índice)."""
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        from propriedades.models import Propriedade
+
+        prop = get_object_or_404(Propriedade, pk=pk)
+        try:
+            k = max(1, min(int(request.query_params.get('k', 0)) or getattr(settings, 'ML_SIMILAR_K', 6), 50))
+        except ValueError:
+            raise ValidationError({'k': 'Inteiro inválido.'})
+        return Response([{
+            'id': p.id,
+            'titulo': p.titulo,
+            'city': p.city,
+            'preco_por_noite': float(p.preco_por_noite),
+            'distance': round(dist, 4),
+        } for p, dist in similar_property_objects(prop, k)])
 
 
 class PersonalRecommendationView(APIView):
@@ -258,5 +534,34 @@ class PersonalRecommendationView(APIView):
 
     def post(self, request):
         limit = int(request.data.get('limit', 10))
-        out = compute_personal_recommendations_for_user(request.user, limit=limit)
+        out = get_personal_recommendations_for_user(request.user, limit=limit)
         return Response(out, status=200)
+
+
+class MatrixFactorizationRecommendationView(APIView):
+    """Recomendações pelos fatores latentes do ALS (treinados offline com `train_als`).
+
+    Usuários sem interações no último treino recebem `status: empty`; a
+    recomendação heurística (`personal_recommend`) continua disponível.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        from favoritos.models import Favorito
+        from propriedades.models import Propriedade
+
+        limit = int(request.data.get('limit', 10))
+        als = load_als()
+        if als is None or not als.has_user(request.user.pk):
+            return Response({'status': 'empty', 'detail': 'Sem fatores para este usuário.', 'results': []})
+        fav_ids = list(Favorito.objects.filter(user=request.user).values_list('propriedade_id', flat=True))
+        # folga para descartar propriedades desativadas desde o treino
+        ranked = als.recommend(request.user.pk, limit + getattr(settings, 'ML_ALS_INACTIVE_SLACK', 20), exclude=fav_ids)
+        by_id = Propriedade.objects.filter(ativo=True).in_bulk([pid for pid, _s in ranked])
+        results = [{
+            'id': pid,
+            'titulo': by_id[pid].titulo,
+            'preco_por_noite': float(by_id[pid].preco_por_noite),
+            'score': round(score, 4),
+        } for pid, score in ranked if pid in by_id][:limit]
+        return Response({'status': 'ok', 'results': results})
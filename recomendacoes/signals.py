@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from propriedades.models import Propriedade
+from recomendacoes.services.ml.services.versions import bump_catalogue_version
+
+
+@receiver(post_save, sender=Propriedade)
+def propriedade_saved(sender, instance, **kwargs):
+    """Só mudanças em campos usados pelos recomendadores (SCORING_FIELDS) invalidam os caches."""
+    if getattr(instance, 'catalogo_mudou', True):
+        bump_catalogue_version()
+
+
+@receiver(post_delete, sender=Propriedade)
+def propriedade_deleted(sender, **kwargs):
+    bump_catalogue_version()